@@ -1,38 +1,123 @@
 import requests
+import hashlib
+import io
 import json
-import tempfile
 import wave
-import pyaudio
+try:
+    import pyaudio  # 只用于播放 TTS 音频；无声卡环境（基准测试、服务器）可以不装
+except ImportError:
+    pyaudio = None
 from threading import Thread, Lock
 from ai.keys import OPENAI_API_KEY
 from ai.prompts import create_prompt, INITIAL_RESPONSE
 import time
-import os
+
+import metrics
+from conversationContext import ConversationContext, CONTEXT_BUDGET
+from wavStream import WavStreamParser
 
 # 配置信息
+LLM_API_URL = "https://api.moonshot.cn/v1/chat/completions"
+LLM_MODEL = "moonshot-v1-8k"
 TTS_API_URL = "http://127.0.0.1:9880/tts"
 REF_AUDIO = r"D:\GPT-SoVITS-v2-240821\output\slicer_opt\wwtm.wav_0001287680_0001496640.wav"
 PROMPT_TEXT = "哎呀，后面的人家不太记得了啦，不过这首诗真的超有意境的呢"
+SYSTEM_PROMPT = "你叫小智，是一个智能会议纪要、总结助手，具有很强的逻辑思维和对话总结能力。"
+SUMMARY_PROMPT = ("把下面的会议对话合并进已有摘要，只保留关键事实、结论和待办，"
+                  "不超过 {max_chars} 字，直接输出摘要正文。")
+
+# 连接超时 / 两次收到数据之间的最长间隔（秒）
+LLM_TIMEOUT = (5, 60)
+TTS_TIMEOUT = (5, 30)
+HTTP_POOL_SIZE = 4   # LLM 与并发的 TTS 请求共用的连接池大小
+# 转写停止变化多久后才请求 LLM（秒），期间的新变化重新计时；
+# 一直在变（连续说话）时距第一次变化最多等 MAX_DEBOUNCE_WAIT 秒
+DEBOUNCE = 0.8
+MAX_DEBOUNCE_WAIT = 3.0
+
+LLM_SECONDS = metrics.histogram("llm_request_seconds", "LLM 请求往返耗时")
+LLM_TTFT = metrics.histogram("llm_first_token_seconds", "流式 LLM 从发出请求到收到首个 token 的时间")
+LLM_ERRORS = metrics.counter("llm_errors_total", "LLM 请求失败次数")
+LLM_CANCELLED = metrics.counter("llm_cancelled_total", "因转写更新而作废的 LLM 请求数")
+LLM_SKIPPED = metrics.counter("llm_skipped_total", "转写内容未变、跳过的 LLM 请求数")
+TTS_CHUNK_SIZE = 4096   # 流式 TTS 每次从连接读取的字节数
+TTS_SECONDS = metrics.histogram("tts_request_seconds", "TTS 请求往返耗时")
+TTS_FIRST_AUDIO = metrics.histogram("tts_first_audio_seconds", "从发出 TTS 请求到第一段音频开始播放的时间")
+TTS_ERRORS = metrics.counter("tts_errors_total", "TTS 请求失败次数")
+
+def extract_answer(text):
+    """回复中 [...] 内为要展示的回答；流式接收时 ] 可能还没到，取 [ 之后的全部"""
+    return text.split('[', 1)[1].split(']', 1)[0] if '[' in text else text
+
+
+def iter_sse_deltas(response):
+    """
+    逐个产出 OpenAI 兼容流式接口（server-sent events）里的增量文本。
+    每个事件形如 `data: {"choices": [{"delta": {"content": "..."}}]}`，以 `data: [DONE]` 结束。
+    """
+    for line in response.iter_lines(decode_unicode=False):
+        if not line or not line.startswith(b"data:"):
+            continue  # 空行分隔事件，: 开头的是注释/心跳
+        data = line[5:].strip()
+        if data == b"[DONE]":
+            continue  # 继续读到流结束，连接才能放回连接池复用
+        choices = json.loads(data).get("choices") or [{}]
+        content = (choices[0].get("delta") or {}).get("content")
+        if content:
+            yield content
+
 
 class GPTResponder:
-    def __init__(self):
+    def __init__(self, llm_url=LLM_API_URL, tts_url=TTS_API_URL, play_audio=True,
+                 stream=True, debounce=DEBOUNCE, max_debounce_wait=MAX_DEBOUNCE_WAIT,
+                 context_budget=CONTEXT_BUDGET,
+                 stream_tts=True):
         self.response = INITIAL_RESPONSE
-        self.prev_response = ""
-        self.response_interval = 2
-        self.audio_player = pyaudio.PyAudio()
+        self.prev_response = ""    # 最近一次完整的回复（已送去 TTS 或无需朗读）
+        self.response_interval = 2  # 两次请求开始之间的最小间隔（秒），界面滑块调节
+        self.debounce = debounce
+        self.max_debounce_wait = max_debounce_wait
+        self.llm_url = llm_url
+        self.tts_url = tts_url
+        # stream=True 时按 SSE 逐块接收回复，self.response 随之更新
+        self.stream = stream
+        # stream_tts=True 时 TTS 分块返回，收到 WAV 头后边收边播
+        self.stream_tts = stream_tts
+        self.last_ttft = None      # 最近一次流式请求的首 token 延迟（秒）
+        self.stats = {"requests": 0, "cancelled": 0, "skipped": 0}
+        # 每次发起请求编号加一，只有编号等于当前值的请求结果会被采用
+        self._generation = 0
+        self._current_in_flight = False  # 最新一次请求还没返回
+        self._last_request = None  # 最近一次请求开始的时间（monotonic）
+        # 保护请求编号、response / prev_response 的更新
+        self._request_lock = Lock()
+        self._last_digest = None   # 上一次请求的转写内容哈希
+        # LLM 与 TTS 复用 keep-alive 连接，省掉每次的 TCP / TLS 握手
+        self.http = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=HTTP_POOL_SIZE)
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+        # play_audio=False 时只请求 TTS 不播放（基准测试用本地桩服务时）
+        self.audio_player = pyaudio.PyAudio() if play_audio and pyaudio else None
         self.playback_lock = Lock()
         self.current_stream = None  #你叫“小智”是一个台湾甜妹，俏皮可爱，说话机车，温柔，乐观，有主见，你称呼我为“欢哥” ，是我的好朋友，你总是用最简短的话来和我聊天以及回答我的问题 
-        self.conversation_history = [{"role": "system", "content": "你叫小智，是一个智能会议纪要、总结助手，具有很强的逻辑思维和对话总结能力。"}]
+        # 系统提示 + 滚动摘要 + 最近几轮原文，总量不超过 context_budget 个 token
+        self.context = ConversationContext(SYSTEM_PROMPT, context_budget, summarize=self._summarize)
+
+    @property
+    def conversation_history(self):
+        """下一次请求会带上的历史消息（不含新的用户消息）"""
+        return self.context.messages()
+
+    def clear_history(self):
+        self.context.clear()
+        self._last_digest = None
 
     def _play_audio(self, audio_data):
         """播放音频的内部方法"""
         with self.playback_lock:
             try:
-                with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
-                    f.write(audio_data)
-                    temp_path = f.name
-
-                with wave.open(temp_path, 'rb') as wf:
+                with wave.open(io.BytesIO(audio_data), 'rb') as wf:
                     self.current_stream = self.audio_player.open(
                         format=self.audio_player.get_format_from_width(wf.getsampwidth()),
                         channels=wf.getnchannels(),
@@ -47,8 +132,6 @@ class GPTResponder:
                     
                     self.current_stream.stop_stream()
                     self.current_stream.close()
-                
-                os.unlink(temp_path)
             except Exception as e:
                 print(f"音频播放错误: {e}")
             finally:
@@ -56,41 +139,98 @@ class GPTResponder:
                     self.current_stream.close()
 
     def _tts_request(self, text):
-        """执行TTS请求的核心方法"""
+        """执行TTS请求的核心方法；流式模式下返回首段音频延迟（秒），否则返回 None"""
+        if self.stream_tts:
+            return self._tts_stream(text)
         try:
-            params = {
-                "text": text,
-                "text_lang": "zh",
-                "ref_audio_path": REF_AUDIO,
-                "prompt_lang": "zh",
-                "prompt_text": PROMPT_TEXT,
-                "text_split_method": "cut0",
-                "batch_size": 1,
-                "media_type": "wav",
-                "streaming_mode": "false"
-            }
-            
-            response = requests.get(
-                TTS_API_URL,
-                params=params,
-                timeout=30
-            )
-            
+            with TTS_SECONDS.time():
+                response = self.http.get(
+                    self.tts_url,
+                    params=self._tts_params(text, streaming=False),
+                    timeout=TTS_TIMEOUT
+                )
+
             if response.status_code == 200:
-                Thread(target=self._play_audio, args=(response.content,)).start()
+                if self.audio_player:
+                    Thread(target=self._play_audio, args=(response.content,)).start()
             else:
+                TTS_ERRORS.inc()
                 print(f"TTS请求失败: {response.status_code}")
         except Exception as e:
+            TTS_ERRORS.inc()
             print(f"TTS处理异常: {e}")
 
-    def generate_response_from_transcript(self, transcript):
+    def _tts_params(self, text, streaming):
+        return {
+            "text": text,
+            "text_lang": "zh",
+            "ref_audio_path": REF_AUDIO,
+            "prompt_lang": "zh",
+            "prompt_text": PROMPT_TEXT,
+            "text_split_method": "cut0",
+            "batch_size": 1,
+            "media_type": "wav",
+            "streaming_mode": "true" if streaming else "false"
+        }
+
+    def _tts_stream(self, text):
+        """
+        流式 TTS：分块接收，解析出 WAV 头后把 PCM 直接写进 PyAudio 输出流，不落盘。
+        返回从发出请求到第一段音频写入声卡（不播放时为收到第一段 PCM）的秒数，失败返回 None。
+        """
+        start = time.monotonic()
+        first_audio = None
         try:
-            self.conversation_history.append({"role": "user", "content": transcript})
+            # 播放与接收交替进行，整个请求的耗时没有意义，只记录首段音频延迟
+            with self.http.get(self.tts_url, params=self._tts_params(text, streaming=True),
+                               timeout=TTS_TIMEOUT, stream=True) as response:
+                if response.status_code != 200:
+                    TTS_ERRORS.inc()
+                    print(f"TTS请求失败: {response.status_code}")
+                    return None
+                parser = WavStreamParser()
+                # 同一时间只播放一段回复，后到的等前一段播完
+                with self.playback_lock:
+                    stream = None
+                    try:
+                        for data in response.iter_content(TTS_CHUNK_SIZE):
+                            pcm = parser.feed(data)
+                            if not pcm:
+                                continue
+                            if self.audio_player and stream is None:
+                                stream = self.current_stream = self.audio_player.open(
+                                    format=self.audio_player.get_format_from_width(parser.sample_width),
+                                    channels=parser.channels,
+                                    rate=parser.sample_rate,
+                                    output=True
+                                )
+                            if stream is not None:
+                                stream.write(pcm)
+                            if first_audio is None:
+                                first_audio = time.monotonic() - start
+                                TTS_FIRST_AUDIO.observe(first_audio)
+                    finally:
+                        if stream is not None:
+                            stream.stop_stream()
+                            stream.close()
+            return first_audio
+        except Exception as e:
+            TTS_ERRORS.inc()
+            print(f"TTS处理异常: {e}")
+            return None
 
+    def generate_response_from_transcript(self, transcript, is_current=None):
+        """
+        请求 LLM 并返回要展示的回答，失败返回 ''。
+        is_current() 返回 False 表示已有更新的请求：流式请求立即断开，
+        结果作废、不写入对话历史。
+        """
+        try:
             payload = {
-                "model": "moonshot-v1-8k",
-                "messages": self.conversation_history,
-                "temperature": 0.0
+                "model": LLM_MODEL,
+                "messages": self.context.messages(transcript),
+                "temperature": 0.0,
+                "stream": self.stream
             }
 
             headers = {
@@ -98,47 +238,177 @@ class GPTResponder:
                 "Content-Type": "application/json"
             }
 
-            response = requests.post(
-                "https://api.moonshot.cn/v1/chat/completions",
-                json=payload,
-                headers=headers
-            )
+            with LLM_SECONDS.time():
+                if self.stream:
+                    full_response = self._stream_completion(payload, headers, is_current)
+                else:
+                    response = self.http.post(
+                        self.llm_url,
+                        json=payload,
+                        headers=headers,
+                        timeout=LLM_TIMEOUT
+                    )
+                    if response.status_code != 200:
+                        LLM_ERRORS.inc()
+                        print(f"Error: {response.status_code}, {response.text}")
+                        return ''
+                    full_response = response.json()["choices"][0]["message"]["content"]
 
-            if response.status_code != 200:
-                print(f"Error: {response.status_code}, {response.text}")
+            if full_response is None or (is_current and not is_current()):
                 return ''
+            self.context.add_turn(transcript, full_response)
 
-            full_response = response.json()["choices"][0]["message"]["content"]
-            self.conversation_history.append({"role": "assistant", "content": full_response})
-
-            return full_response.split('[')[1].split(']')[0] if '[' in full_response else full_response
+            return extract_answer(full_response)
 
         except Exception as e:
+            LLM_ERRORS.inc()
             print(f"Request failed: {e}")
             return ''
 
+    def _summarize(self, summary, turns):
+        """后台把移出原文区的轮次并入摘要（非流式请求）；失败返回 None"""
+        dialogue = "\n\n".join(f"用户：{u}\n助手：{a}" for u, a in turns)
+        if summary:
+            dialogue = f"已有摘要：{summary}\n\n{dialogue}"
+        payload = {
+            "model": LLM_MODEL,
+            "messages": [
+                {"role": "system", "content": SUMMARY_PROMPT.format(
+                    max_chars=self.context.summary_budget)},
+                {"role": "user", "content": dialogue},
+            ],
+            "temperature": 0.0
+        }
+        headers = {
+            "Authorization": f"Bearer {OPENAI_API_KEY}",
+            "Content-Type": "application/json"
+        }
+        response = self.http.post(self.llm_url, json=payload, headers=headers, timeout=LLM_TIMEOUT)
+        if response.status_code != 200:
+            print(f"Summary error: {response.status_code}, {response.text}")
+            return None
+        return response.json()["choices"][0]["message"]["content"]
+
+    def _stream_completion(self, payload, headers, is_current=None):
+        """流式请求：边收边更新 self.response（仅限最新请求），返回完整回复；失败或作废返回 None"""
+        start = time.monotonic()
+        with self.http.post(self.llm_url, json=payload, headers=headers,
+                            timeout=LLM_TIMEOUT, stream=True) as response:
+            if response.status_code != 200:
+                LLM_ERRORS.inc()
+                print(f"Error: {response.status_code}, {response.text}")
+                return None
+            parts = []
+            for delta in iter_sse_deltas(response):
+                if is_current and not is_current():
+                    return None  # 关闭响应即断开连接，服务端不再继续生成
+                if not parts:
+                    self.last_ttft = time.monotonic() - start
+                    LLM_TTFT.observe(self.last_ttft)
+                parts.append(delta)
+                answer = extract_answer("".join(parts))
+                if answer.strip():
+                    with self._request_lock:
+                        if is_current is None or is_current():
+                            self.response = answer
+            return "".join(parts)
+
     def respond_to_transcriber(self, transcriber, send_to_gpt_state):
+        """
+        事件驱动：转写安静 debounce 秒（连续变化时最多等 max_debounce_wait 秒），
+        且距上一次请求开始已满 response_interval 秒，再请求 LLM。内容与上次请求相同则跳过；请求进行中又有新内容时
+        旧请求作废，按新内容重新请求。
+        """
+        event = transcriber.transcript_changed_event
         while True:
-            if transcriber.transcript_changed_event.is_set() and send_to_gpt_state[0]:
-                start_time = time.time()
-                transcriber.transcript_changed_event.clear()
-                transcript_string = transcriber.get_transcript()
-                new_response = self.generate_response_from_transcript(transcript_string)
-
-                if new_response and new_response != self.prev_response:
-                    self.prev_response = new_response
-                    self.response = new_response
-                    Thread(target=self._tts_request, args=(new_response,)).start()
-
-                processing_time = time.time() - start_time
-                remaining_time = self.response_interval - processing_time
-                if remaining_time > 0:
-                    time.sleep(remaining_time)
-            else:
-                time.sleep(0.3)
+            event.wait()
+            if not send_to_gpt_state[0]:
+                time.sleep(0.3)  # 暂停期间保留事件，恢复后立即响应
+                continue
+            self._debounce(event)
+            self._wait_interval()
+            event.clear()
+            transcript = transcriber.get_transcript()
+            digest = hashlib.sha1(transcript.encode("utf-8")).hexdigest()
+            if digest == self._last_digest:
+                self.stats["skipped"] += 1
+                LLM_SKIPPED.inc()
+                continue
+            self._last_digest = digest
+            self._start_request(transcript, send_to_gpt_state)
+
+    def _debounce(self, event):
+        """等到转写 debounce 秒内没有新变化，或距第一次变化已过 max_debounce_wait 秒"""
+        deadline = time.monotonic() + max(self.max_debounce_wait, self.debounce)
+        event.clear()
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not event.wait(min(self.debounce, remaining)):
+                return
+            event.clear()
+
+    def _wait_interval(self):
+        """距上一次请求开始不足 response_interval 秒时，等到满（期间的新转写一并带上）"""
+        if self._last_request is None:
+            return
+        delay = self._last_request + self.response_interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _start_request(self, transcript, send_to_gpt_state=None):
+        with self._request_lock:
+            self._last_request = time.monotonic()
+            self._generation += 1
+            generation = self._generation
+            if self._current_in_flight:
+                # 进行中的请求已过时：流式的在下一个数据块处断开，非流式的结果丢弃；
+                # 界面上它的半截回复换回上一次完整的回复
+                self.stats["cancelled"] += 1
+                LLM_CANCELLED.inc()
+                self.response = self.prev_response or INITIAL_RESPONSE
+            self._current_in_flight = True
+            self.stats["requests"] += 1
+        Thread(target=self._respond, args=(transcript, generation, send_to_gpt_state),
+               name="llm-request", daemon=True).start()
+
+    def _respond(self, transcript, generation, send_to_gpt_state=None):
+        """
+        请求线程：只有最新请求的结果会被采用，也只有这里会发起 TTS。
+        send_to_gpt_state[0] 为 False（界面暂停）时只显示不朗读。
+        """
+        is_current = lambda: generation == self._generation
+        new_response = ''
+        try:
+            new_response = self.generate_response_from_transcript(transcript, is_current=is_current)
+        finally:
+            with self._request_lock:
+                if is_current():
+                    self._current_in_flight = False
+                    speak = self._accept(new_response, send_to_gpt_state)
+                else:
+                    speak = ''  # 已有更新的请求，response 由它负责
+        if speak:
+            Thread(target=self._tts_request, args=(speak,), name="tts", daemon=True).start()
+
+    def _accept(self, new_response, send_to_gpt_state):
+        """（持有 _request_lock）采用最新请求的结果，返回要朗读的文本，不需要朗读时返回 ''"""
+        if not new_response:
+            self._last_digest = None  # 失败的内容允许下次重试
+            self.response = self.prev_response or INITIAL_RESPONSE  # 去掉流式失败留下的半截回复
+            return ''
+        self.response = new_response
+        if new_response == self.prev_response:
+            return ''
+        self.prev_response = new_response
+        if send_to_gpt_state is not None and not send_to_gpt_state[0]:
+            return ''
+        return new_response
 
     def update_response_interval(self, interval):
         self.response_interval = interval
 
     def __del__(self):
-        self.audio_player.terminate()
+        if getattr(self, "http", None):
+            self.http.close()
+        if self.audio_player:
+            self.audio_player.terminate()
@@ -0,0 +1,211 @@
+# asrScheduler.py
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+import metrics
+import profiler
+from audioFormat import SAMPLE_RATE
+
+MAX_BATCH = 4      # 单次前向最多合并的片段数
+MAX_WAIT  = 0.02   # 第一个片段到达后、别的音源还有待识别音频时，最多再等多久凑批（秒）
+
+BATCH_SIZE = metrics.histogram("asr_batch_size", "每次前向合并的片段数",
+                               buckets=metrics.SIZE_BUCKETS)
+BATCH_SECONDS = metrics.histogram("asr_batch_seconds", "一次批量前向的耗时")
+BATCH_ERRORS = metrics.counter("asr_errors_total", "批量识别出错次数")
+
+
+class SchedulerClosed(RuntimeError):
+    """调度器已关闭，不再接受识别请求"""
+
+
+class BatchASRScheduler:
+    """
+    放在 BaseASRModel 前面的批处理调度器。
+    各音源线程调用 transcribe_words 提交片段并阻塞等待；调度线程把已到达的片段攒成一批，
+    走一次 transcribe_words_batch，再把结果分发回去。
+    active() 返回还有待识别音频（排队或正在处理）的音源数：只有批外还有这样的音源时
+    才最多再等 MAX_WAIT，只有一个音源说话时请求立即下发。不传时总是等待。
+    对外接口与模型的 transcribe_words 相同，可以直接交给 StreamingDecoder。
+    """
+    def __init__(self, asr_model, max_batch=MAX_BATCH, max_wait=MAX_WAIT, active=None):
+        self.asr_model = asr_model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.active = active
+        self.stats = {"batches": 0, "segments": 0}
+        self._closed = False
+        self._close_lock = threading.Lock()  # 保证关闭标记之后不会再有请求入队
+        self._requests = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="asr-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, pcm, sample_rate=SAMPLE_RATE, language="auto"):
+        fut = Future()
+        with self._close_lock:
+            if self._closed:
+                fut.set_exception(SchedulerClosed())
+                return fut
+            self._requests.put((pcm, sample_rate, language, fut))
+        return fut
+
+    def transcribe_words(self, pcm, sample_rate=SAMPLE_RATE, language="auto"):
+        return self.submit(pcm, sample_rate, language).result()
+
+    def close(self, timeout=None):
+        """停止调度线程；已提交的片段仍会识别完，之后的请求收到 SchedulerClosed"""
+        with self._close_lock:
+            if not self._closed:
+                self._closed = True
+                self._requests.put(None)
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def _expect_more(self, batch):
+        """批外是否还有音源可能马上提交片段，值得等一等"""
+        return self.active is None or self.active() > len(batch)
+
+    def _collect(self):
+        """返回下一批请求；调度器关闭且请求取完时返回 None"""
+        first = self._requests.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                # 已经到达的先全部取走，不用等
+                req = self._requests.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._expect_more(batch):
+                    break
+                try:
+                    req = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if req is None:
+                self._requests.put(None)  # 处理完这一批再退出
+                break
+            batch.append(req)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            # 采样率、语种相同的片段才能放进同一次前向
+            groups = {}
+            for req in batch:
+                groups.setdefault((req[1], req[2]), []).append(req)
+            for (sample_rate, language), reqs in groups.items():
+                self.stats["batches"] += 1
+                self.stats["segments"] += len(reqs)
+                BATCH_SIZE.observe(len(reqs))
+                try:
+                    with BATCH_SECONDS.time(), profiler.torch_section("asr"):
+                        results = self.asr_model.transcribe_words_batch(
+                            [r[0] for r in reqs], sample_rate, language=language
+                        )
+                except Exception as e:
+                    BATCH_ERRORS.inc()
+                    for r in reqs:
+                        r[3].set_exception(e)
+                else:
+                    for r, res in zip(reqs, results):
+                        r[3].set_result(res)
+
+
+class FairASRScheduler(BatchASRScheduler):
+    """
+    多个会话共用一份模型时的调度器：每个会话一个待识别队列，
+    凑批时按轮转顺序每个会话各取一个片段，取过的会话排到末尾，
+    积压多、片段长的会话不会挡住其他会话。
+    各会话通过 session(name) 得到与模型 transcribe_words 相同的接口。
+    """
+    def __init__(self, asr_model, max_batch=MAX_BATCH, max_wait=MAX_WAIT):
+        self._pending = OrderedDict()  # 会话 -> deque[(pcm, sample_rate, language, fut)]
+        self._sessions = set()         # 已打开、还没关闭的会话
+        self._cond = threading.Condition()
+        super().__init__(asr_model, max_batch, max_wait)
+
+    def session(self, name):
+        with self._cond:
+            self._sessions.add(name)
+        return _SessionView(self, name)
+
+    def submit(self, pcm, sample_rate=SAMPLE_RATE, language="auto", session=None):
+        fut = Future()
+        with self._cond:
+            if self._closed:
+                fut.set_exception(SchedulerClosed())
+                return fut
+            self._pending.setdefault(session, deque()).append((pcm, sample_rate, language, fut))
+            self._cond.notify()
+        return fut
+
+    def close_session(self, name):
+        """丢弃会话还没开始识别的片段"""
+        with self._cond:
+            self._sessions.discard(name)
+            reqs = self._pending.pop(name, ())
+        for r in reqs:
+            r[3].cancel()
+
+    def close(self, timeout=None):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def _expect_more(self, batch):
+        # 每个会话同时只有一个片段在等结果，批里没有的会话才可能再提交
+        return len(self._sessions - {r[4] for r in batch}) > 0
+
+    def pending(self):
+        with self._cond:
+            return {name: len(reqs) for name, reqs in self._pending.items()}
+
+    def _take_round(self, batch):
+        for name in list(self._pending):
+            if len(batch) >= self.max_batch:
+                return
+            reqs = self._pending[name]
+            batch.append(reqs.popleft() + (name,))
+            if reqs:
+                self._pending.move_to_end(name)
+            else:
+                del self._pending[name]
+
+    def _collect(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending or self._closed)
+            if not self._pending:
+                return None
+            batch = []
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                if self._pending:
+                    self._take_round(batch)
+                    continue
+                remaining = deadline - time.monotonic()
+                if (remaining <= 0 or self._closed or not self._expect_more(batch)
+                        or not self._cond.wait(remaining)):
+                    break
+            # 已被取消的（会话已关闭）不再识别
+            return [r for r in batch if r[3].set_running_or_notify_cancel()]
+
+
+class _SessionView:
+    """某个会话使用的识别接口，请求带上会话名交给共享调度器"""
+    def __init__(self, scheduler, name):
+        self.scheduler = scheduler
+        self.name = name
+
+    def transcribe_words(self, pcm, sample_rate=SAMPLE_RATE, language="auto"):
+        return self.scheduler.submit(pcm, sample_rate, language, session=self.name).result()
@@ -0,0 +1,322 @@
+# asrServer.py
+"""
+多会话转写服务：进程内只加载一份 ASR / 翻译模型，任意多个客户端通过 HTTP 同时推送音频。
+每个会话有自己的 AudioTranscriber 状态（缓存、流式解码、短语），
+ASR 请求由 FairASRScheduler 在各会话之间轮转凑批，翻译经 TranslationBatcher 合批。
+
+接口（请求/响应均为 JSON，音频为无文件头的 little-endian PCM）：
+    POST /sessions                 {"rate", "width", "channels", "source"} → {"id"}
+    POST /sessions/<id>/audio      PCM 数据；可带 X-Capture-Time（首个样本的 epoch 秒）
+    GET  /sessions/<id>/events     分块传输，每确认一段输出一行 JSON，会话结束后关闭
+    POST /sessions/<id>/end        处理完积压音频、发出最后的分段，返回会话统计
+    GET  /stats                    当前会话数与调度器状态
+
+    python asrServer.py whisper small --mt-backend helsinki --mt-model en-zh --port 8765
+"""
+import argparse
+import json
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import custom_speech_recognition as sr
+from asrScheduler import FairASRScheduler
+from headless import HeadlessRunner
+from startup import load_models
+import metrics
+import precision as prec
+
+DEFAULT_PORT = 8765
+MAX_SESSIONS = 32
+IDLE_TIMEOUT = 60.0    # 会话多久没有收到音频就自动结束（秒）
+FLUSH_TIMEOUT = 30.0   # 结束会话时等待积压处理完的最长时间（秒）
+
+SESSIONS = metrics.gauge("server_sessions", "当前活跃的会话数")
+SESSIONS_TOTAL = metrics.counter("server_sessions_total", "累计创建的会话数")
+SESSIONS_REJECTED = metrics.counter("server_sessions_rejected_total", "因会话数已满被拒绝的次数")
+
+_PATH_RE = re.compile(r"^/sessions/([0-9a-f]+)/(audio|events|end)$")
+
+
+class _EventSink:
+    """HeadlessRunner 的输出：每行 JSON 放进会话的事件队列"""
+    def __init__(self, events):
+        self.events = events
+
+    def write(self, line):
+        self.events.put(line)
+
+    def flush(self):
+        pass
+
+
+class Session:
+    """一个客户端连接的转写状态"""
+    def __init__(self, session_id, server, rate, width, channels, source):
+        self.id = session_id
+        self.rate, self.width, self.channels = rate, width, channels
+        self.events = queue.Queue()
+        # 指标按会话区分：所有会话默认都叫 input，共用标签时队列长度等回调会互相覆盖
+        self.runner = HeadlessRunner(server.asr_model, server.translator, source_name=source,
+                                     vad_backend=server.vad_backend, out=_EventSink(self.events),
+                                     asr_scheduler=server.scheduler.session(session_id),
+                                     label=f"{source}-{session_id}")
+        self.runner.transcriber.start()
+        self.created = time.monotonic()
+        self.last_active = self.created
+        self.ended = threading.Event()
+        self._lock = threading.Lock()
+
+    def feed(self, data, capture_time=None):
+        frame = self.width * self.channels
+        data = data[:len(data) - len(data) % frame]
+        if not data:
+            return
+        with self._lock:
+            self.last_active = time.monotonic()
+            audio = sr.AudioData(data, self.rate, self.width, self.channels)
+            self.runner.feed(audio, capture_time if capture_time is not None else time.time())
+
+    def end(self):
+        """识别完积压的音频并发出最后的分段，然后关闭事件流；重复调用只执行一次"""
+        with self._lock:
+            if self.ended.is_set():
+                return self.stats()
+            self.runner.transcriber.flush(FLUSH_TIMEOUT)
+            self.runner.transcriber.stop(FLUSH_TIMEOUT)
+            self.ended.set()
+            self.events.put(None)
+        return self.stats()
+
+    def stats(self):
+        stats = dict(self.runner.stats)
+        stats["asr"] = self.runner.transcriber.get_stats()[self.runner.label]
+        stats["session_seconds"] = round(time.monotonic() - self.created, 3)
+        return stats
+
+
+class ASRServer:
+    """
+    持有共享模型与调度器，管理会话的创建、超时与结束。
+    translator 为 None 时只输出原文。
+    """
+    def __init__(self, asr_model, translator=None, host="127.0.0.1", port=DEFAULT_PORT,
+                 vad_backend="energy", max_sessions=MAX_SESSIONS, idle_timeout=IDLE_TIMEOUT):
+        self.asr_model = asr_model
+        self.scheduler = FairASRScheduler(asr_model)
+        # 所有会话的翻译请求进同一个微批处理线程，避免多个线程同时 generate 抢 CPU
+        if translator is not None:
+            from translator import TranslationBatcher
+            translator = TranslationBatcher(translator)
+        self.translator = translator
+        self.vad_backend = vad_backend
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions = {}
+        self._lock = threading.Lock()
+        self._session_count = lambda: len(self.sessions)
+        SESSIONS.set_function(self._session_count)
+        handler = type("ASRRequestHandler", (_Handler,), {"server_app": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def create_session(self, rate=16000, width=2, channels=1, source="input"):
+        with self._lock:
+            if len(self.sessions) >= self.max_sessions:
+                SESSIONS_REJECTED.inc()
+                return None
+            session_id = uuid.uuid4().hex[:12]
+            # 占位，模型无关的初始化放在锁外
+            self.sessions[session_id] = None
+        try:
+            session = Session(session_id, self, rate, width, channels, source)
+        except Exception:
+            with self._lock:
+                del self.sessions[session_id]
+            raise
+        with self._lock:
+            self.sessions[session_id] = session
+        SESSIONS_TOTAL.inc()
+        return session
+
+    def get_session(self, session_id):
+        with self._lock:
+            return self.sessions.get(session_id)
+
+    def end_session(self, session_id):
+        session = self.get_session(session_id)
+        if session is None:
+            return None
+        stats = session.end()
+        self.scheduler.close_session(session_id)
+        with self._lock:
+            self.sessions.pop(session_id, None)
+        return stats
+
+    def _reap_idle(self):
+        while True:
+            time.sleep(min(self.idle_timeout / 4.0, 5.0))
+            now = time.monotonic()
+            with self._lock:
+                idle = [sid for sid, s in self.sessions.items()
+                        if s is not None and now - s.last_active > self.idle_timeout]
+            for sid in idle:
+                print(f"[server] session {sid} idle, closing", file=sys.stderr)
+                self.end_session(sid)
+
+    def stats(self):
+        with self._lock:
+            sessions = {sid: s.stats() for sid, s in self.sessions.items() if s is not None}
+        return {"sessions": sessions, "scheduler": dict(self.scheduler.stats),
+                "pending": self.scheduler.pending()}
+
+    def start(self):
+        """后台线程中提供服务，返回自身"""
+        threading.Thread(target=self.httpd.serve_forever, name="server", daemon=True).start()
+        threading.Thread(target=self._reap_idle, name="server-reaper", daemon=True).start()
+        return self
+
+    def serve_forever(self):
+        threading.Thread(target=self._reap_idle, name="server-reaper", daemon=True).start()
+        self.httpd.serve_forever()
+
+    def close(self):
+        for sid in list(self.sessions):
+            self.end_session(sid)
+        self.scheduler.close()
+        SESSIONS.remove_function(self._session_count)
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive；事件流用分块传输
+    server_app = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, obj):
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def do_GET(self):
+        app = self.server_app
+        if self.path == "/stats":
+            return self._send_json(200, app.stats())
+        m = _PATH_RE.match(self.path)
+        if not m or m.group(2) != "events":
+            return self._send_json(404, {"error": "not found"})
+        session = app.get_session(m.group(1))
+        if session is None:
+            return self._send_json(404, {"error": "no such session"})
+        self._stream_events(session)
+
+    def _stream_events(self, session):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            while True:
+                line = session.events.get()
+                if line is None:
+                    break
+                data = line.encode("utf-8")
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.close_connection = True
+
+    def do_POST(self):
+        app = self.server_app
+        body = self._read_body()
+        if self.path == "/sessions":
+            try:
+                params = json.loads(body or b"{}")
+                session = app.create_session(int(params.get("rate", 16000)),
+                                             int(params.get("width", 2)),
+                                             int(params.get("channels", 1)),
+                                             str(params.get("source", "input")))
+            except (ValueError, TypeError) as e:
+                return self._send_json(400, {"error": str(e)})
+            if session is None:
+                return self._send_json(503, {"error": "too many sessions"})
+            return self._send_json(201, {"id": session.id})
+        m = _PATH_RE.match(self.path)
+        if not m or m.group(2) == "events":
+            return self._send_json(404, {"error": "not found"})
+        session_id, action = m.groups()
+        if action == "end":
+            stats = app.end_session(session_id)
+            if stats is None:
+                return self._send_json(404, {"error": "no such session"})
+            return self._send_json(200, stats)
+        session = app.get_session(session_id)
+        if session is None or session.ended.is_set():
+            return self._send_json(404, {"error": "no such session"})
+        capture_time = self.headers.get("X-Capture-Time")
+        session.feed(body, float(capture_time) if capture_time else None)
+        self._send_json(200, {"ok": True})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多会话转写服务：共享一份模型，HTTP 推送音频")
+    parser.add_argument("series", help="ASR 系列 (whisper, funasr)")
+    parser.add_argument("model", help="具体模型 (如 small, paraformer, ...)")
+    parser.add_argument("--mt-backend", choices=["helsinki", "m2m100"],
+                        help="翻译后端；不指定则只输出原文")
+    parser.add_argument("--mt-model", help="语言对 (如 en-zh)")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址，默认 127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"监听端口，默认 {DEFAULT_PORT}")
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS,
+                        help=f"最多同时存在的会话数，默认 {MAX_SESSIONS}")
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT,
+                        help=f"会话无音频多少秒后自动结束，默认 {IDLE_TIMEOUT:g}")
+    parser.add_argument("--vad", default="energy", choices=["energy", "silero", "none"],
+                        help="过滤静音的 VAD，默认 energy")
+    parser.add_argument("--device", default=None, help="推理设备 (cpu / cuda)")
+    parser.add_argument("--no-warmup", action="store_true", help="跳过模型预热")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="在本地该端口提供 Prometheus 格式的 /metrics")
+    prec.add_arguments(parser)
+    args = parser.parse_args()
+    if args.mt_backend and not args.mt_model:
+        parser.error("--mt-backend 需要同时指定 --mt-model")
+    metrics.serve(args.metrics_port)
+
+    asr_model, translator, timer = load_models(
+        args.series, args.model, args.mt_backend, args.mt_model, args.device,
+        warmup=not args.no_warmup, precision=args.precision)
+    print(timer.report(), file=sys.stderr)
+
+    server = ASRServer(asr_model, translator, args.host, args.port, vad_backend=args.vad,
+                       max_sessions=args.max_sessions, idle_timeout=args.idle_timeout)
+    print(f"[server] listening on {server.base_url}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+# audioFormat.py
+"""
+ASR 模型统一的内存输入格式：16 kHz 单声道 float32，取值 [-1, 1]。
+单独成模块、不依赖 torch，缓冲区、解码器、调度器等不必为一个常量加载整套模型。
+"""
+SAMPLE_RATE = 16000
@@ -0,0 +1,80 @@
+# audioMux.py
+import heapq
+import itertools
+import threading
+import time
+
+# 音频块到达后最多等待多久，让其他音源更早采集的块有机会排到前面（秒）
+REORDER_DELAY = 0.02
+
+
+class AudioMultiplexer:
+    """
+    多音源音频复用器，取代轮询式的 audio_merger。
+    录音回调直接 put((who, data, ts))，消费端 get() 在有数据时立即被唤醒；
+    所有音源的块按采集时间戳排序输出。静音开关只影响之后到达的数据，
+    已经进入复用器的块照常送出。
+    """
+    def __init__(self, reorder_delay=REORDER_DELAY):
+        self.reorder_delay = reorder_delay
+        self._heap = []
+        self._seq = itertools.count()
+        self._enabled = {}     # who -> 是否接收
+        self._watermark = {}   # who -> 已收到的最新采集时间
+        self._cond = threading.Condition()
+
+    def add_source(self, who, enabled=True):
+        with self._cond:
+            self._enabled[who] = enabled
+
+    def set_enabled(self, who, enabled):
+        with self._cond:
+            self._enabled[who] = enabled
+            if not enabled:
+                self._watermark.pop(who, None)
+            self._cond.notify_all()
+
+    def is_enabled(self, who):
+        with self._cond:
+            return self._enabled.get(who, True)
+
+    def sources(self):
+        with self._cond:
+            return list(self._enabled)
+
+    def put(self, item):
+        who, data, ts = item
+        with self._cond:
+            if not self._enabled.setdefault(who, True):
+                return
+            self._watermark[who] = ts
+            heapq.heappush(self._heap, (ts, next(self._seq), time.monotonic(), item))
+            self._cond.notify_all()
+
+    def _ready(self):
+        ts, _, arrived, _ = self._heap[0]
+        # 其他启用的音源都已经送来不早于它的数据，后面不会再有更早的块
+        others = [w for who, w in self._watermark.items()
+                  if who != self._heap[0][3][0] and self._enabled.get(who, True)]
+        if all(w >= ts for w in others):
+            return 0.0
+        return arrived + self.reorder_delay - time.monotonic()
+
+    def get(self):
+        with self._cond:
+            while True:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                wait = self._ready()
+                if wait <= 0:
+                    return heapq.heappop(self._heap)[3]
+                self._cond.wait(wait)
+
+    def qsize(self):
+        with self._cond:
+            return len(self._heap)
+
+    def clear(self):
+        with self._cond:
+            self._heap.clear()
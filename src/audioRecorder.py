@@ -4,15 +4,29 @@ import pyaudiowpatch as pyaudio
 import pytz
 from datetime import datetime
 
+from audioFormat import SAMPLE_RATE
+from captureGate import SpeechGate, HOP_DURATION, CAPTURED, VAD_DROPPED
+
 RECORD_TIMEOUT = 2.5
 ENERGY_THRESHOLD = 1000
 DYNAMIC_ENERGY_THRESHOLD = False
+# 语音检测：energy（内置能量/频谱 VAD）、silero（需要模型文件）、none（只用能量阈值）
+VAD_BACKEND = "energy"
 
 class BaseRecorder:
+    # 录音器输出的音频格式（AudioTranscriber 按这些属性解析数据）：
+    # 统一为 16 kHz 单声道 16 bit，与 ASR 模型输入一致
+    SAMPLE_RATE = SAMPLE_RATE
+    SAMPLE_WIDTH = 2
+    channels = 1
+
     def __init__(self, source, source_name):
         self.recorder = sr.Recognizer()
         self.recorder.energy_threshold = ENERGY_THRESHOLD
         self.recorder.dynamic_energy_threshold = DYNAMIC_ENERGY_THRESHOLD
+        self.vad = sr.load_vad(VAD_BACKEND)
+        self.recorder.vad = self.vad
+        self.dropped_phrases = 0  # 被 VAD 判定为无人声而丢弃的片段数
 
         if source is None:
             raise ValueError("audio source can't be None")
@@ -26,16 +40,51 @@ class BaseRecorder:
             self.recorder.adjust_for_ambient_noise(self.source)
         print(f"[INFO] Completed ambient noise adjustment for {device_name}.")
 
-    def record_into_queue(self, audio_queue):
+    def record_into_queue(self, audio_queue, streaming=False, hop_duration=HOP_DURATION):
+        """
+        默认按停顿切分短语后入队；streaming=True 时改用回调式流式采集，
+        每 hop_duration 秒入队一块，时间戳取自音频流时钟。返回停止函数。
+        """
+        if streaming:
+            return self._stream_into_queue(audio_queue, hop_duration)
+
         def record_callback(_, audio:sr.AudioData) -> None:
-            data = audio.get_raw_data()
+            # 采集时一次性转成 16k 单声道，扬声器回环不再以 48k 多声道往下游传
+            data = audio.get_raw_data(convert_rate=self.SAMPLE_RATE,
+                                      convert_width=self.SAMPLE_WIDTH)
+            CAPTURED.inc(len(data) / float(self.SAMPLE_WIDTH * self.SAMPLE_RATE),
+                         source=self.source_name)
+            # 没有人声的片段（噪声、键盘声）不送去识别
+            if self.vad and not self.vad.is_speech(
+                    sr.dsp.to_float32(data, self.SAMPLE_WIDTH), self.SAMPLE_RATE):
+                self.dropped_phrases += 1
+                VAD_DROPPED.inc(source=self.source_name)
+                return
             # 1) 先拿到 UTC naive，然后本地化再转换
             utc_naive = datetime.utcnow()
             utc_aware = pytz.utc.localize(utc_naive)
             ts_cn = utc_aware.astimezone(pytz.timezone("Asia/Shanghai"))
             audio_queue.put((self.source_name, data, ts_cn))
             
-        self.recorder.listen_in_background(self.source, record_callback, phrase_time_limit=RECORD_TIMEOUT)
+        return self.recorder.listen_in_background(self.source, record_callback,
+                                                   phrase_time_limit=RECORD_TIMEOUT,
+                                                   thread_name=f"listen-{self.source_name}")
+
+    def _stream_into_queue(self, audio_queue, hop_duration):
+        gate = SpeechGate(self.vad, self.source_name, self.SAMPLE_RATE)
+        tz = pytz.timezone("Asia/Shanghai")
+
+        def stream_callback(_, audio: sr.AudioData, t) -> None:
+            x = gate.process(audio)
+            if x is None:
+                self.dropped_phrases += 1
+                return
+            ts = datetime.fromtimestamp(t, tz)
+            audio_queue.put((self.source_name, sr.dsp.from_float32(x, self.SAMPLE_WIDTH), ts))
+
+        return self.recorder.stream_in_background(self.source, stream_callback,
+                                                  hop_duration=hop_duration,
+                                                  thread_name=f"capture-{self.source_name}")
 
 class DefaultMicRecorder(BaseRecorder):
     def __init__(self):
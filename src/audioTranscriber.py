@@ -1,129 +1,426 @@
 # AudioTranscriber.py
-import os
-import sys
-import io
-import wave
-import tempfile
+import functools
 import threading
-from datetime import datetime
-import pytz                          # ← 补上
+import time
+from datetime import timedelta
 
-import custom_speech_recognition as sr
-import pyaudiowpatch as pyaudio
+import numpy as np
 
+import metrics
+from custom_speech_recognition import dsp
+from audioFormat import SAMPLE_RATE
+from streamingASR import StreamingDecoder
+from asrScheduler import BatchASRScheduler
+from pipeline import StageQueue, Stage, BLOCK, COALESCE
+from phraseBuffer import PhraseBuffer
 
+
+# 前一块结束到下一块开始的空档超过这么久（秒）就另起一个短语
 PHRASE_TIMEOUT = 3.05
+# 同一短语内前一块结束到下一块开始超过这么久（秒），视为中间有被 VAD 丢掉的静音
+GAP_TOLERANCE = 0.05
 MAX_PHRASES    = 4
+# 单个短语最长多少秒；一直不停顿时强制切段，同时也是每个音源缓存的内存上限
+MAX_PHRASE_SECONDS = 30.0
+
+# 各阶段输入队列的容量与溢出策略
+ASR_QUEUE_SIZE     = 64
+MT_QUEUE_SIZE      = 16
+PUBLISH_QUEUE_SIZE = 64
+# ASR 跟不上时，同一音源积压的音频块最多合并多少块做一次识别
+MAX_COALESCE       = 8
+
+FED_AUDIO = metrics.counter("pipeline_input_seconds_total", "送进转写器的音频秒数", ("source",))
+ASR_SECONDS = metrics.histogram("asr_step_seconds", "一次增量识别（含排队凑批）的耗时", ("source",))
+ASR_AUDIO = metrics.counter("asr_audio_seconds_total", "进入 ASR 缓存的音频秒数", ("source",))
+ASR_RTF = metrics.gauge("asr_realtime_factor", "ASR 累计耗时 / 处理的音频时长", ("source",))
+MT_SECONDS = metrics.histogram("mt_stage_seconds", "翻译阶段一批的耗时")
+
+# 发布队列里的分段条目，与 (音源, 短语编号) 形式的界面条目区分
+_SEGMENT = "segment"
+
+
+def _merge_chunks(old, new, bytes_per_second):
+    """
+    coalesce 策略下合并同一音源首尾相接的两个音频块，时间戳取前一块的；
+    中间有空档（静音被 VAD 丢掉、短语边界）的不合并，否则空档会从时间轴上消失。
+    """
+    gap = (new[1] - old[1]).total_seconds() - len(old[0]) / bytes_per_second
+    if gap > GAP_TOLERANCE:
+        return None
+    return old[0] + new[0], old[1], old[2]
 
 
 class AudioTranscriber:
-    def __init__(self, mic_source, speaker_source, asr_model, translator=None):
+    """
+    采集 → ASR → 翻译 → 发布 四级流水线，每级独立线程、有界队列。
+    原文识别完立即发布上屏，翻译在后台完成后再补上。
+    """
+    def __init__(self, mic_source, speaker_source, asr_model, translator=None,
+                 asr_overflow=BLOCK, mt_overflow=COALESCE, publish_overflow=BLOCK,
+                 extra_sources=None, max_phrase_seconds=MAX_PHRASE_SECONDS,
+                 live_translation=True, asr_scheduler=None, name=None):
         self.asr_model = asr_model
+        # 同一进程里有多个转写器（服务端每个会话一个）时用 name 区分翻译、发布队列的指标
+        suffix = f"-{name}" if name else ""
+        self.max_phrase_seconds = max_phrase_seconds
+        # 所有音源共用一个批处理调度器，同时说话时合并成一次前向；
+        # 多会话服务传入共享调度器的会话接口，各会话的请求一起调度
+        self._owns_scheduler = asr_scheduler is None
+        self.asr_scheduler = asr_scheduler or BatchASRScheduler(asr_model,
+                                                                active=self._active_sources)
         self.translator = translator  # 新增：翻译模块（可选）
-        self.transcript_data = {"You": [], "Speaker": []}
+        # 为 False 时不翻译每次刷新的假设，只翻译确认下来的分段（无界面时使用）
+        self.live_translation = live_translation
+        # 分段监听器：每确认一段文本调用一次 fn(segment)，在发布线程中执行
+        self.segment_listeners = []
+        self._segment_seq = 0
+        self._started = False
         self.transcript_changed_event = threading.Event()
+        # (音源, 短语编号) -> 界面条目，只由发布阶段读写
+        self._phrase_entries = {}
 
         # —— 初始化音源状态
-        self.audio_sources = {
-            "You": {
-                "sample_rate": mic_source.SAMPLE_RATE,
-                "sample_width": mic_source.SAMPLE_WIDTH,
-                "channels":    mic_source.channels,
-                "last_sample": bytes(),
-                "last_spoken": None,
-                "new_phrase":  True,
-                "process_data_func": self.process_mic_data
-            }
-        }
+        self.audio_sources = {}
+        if mic_source:
+            self.audio_sources["You"] = self._new_source("You", mic_source, asr_overflow)
         if speaker_source:
-            self.audio_sources["Speaker"] = {
-                "sample_rate": speaker_source.SAMPLE_RATE,
-                "sample_width": speaker_source.SAMPLE_WIDTH,
-                "channels":    speaker_source.channels,
-                "last_sample": bytes(),
-                "last_spoken": None,
-                "new_phrase":  True,
-                "process_data_func": self.process_speaker_data
-            }
+            self.audio_sources["Speaker"] = self._new_source("Speaker", speaker_source, asr_overflow)
+        # 额外的采集设备：{名称: 音源}
+        for who, source in (extra_sources or {}).items():
+            self.audio_sources[who] = self._new_source(who, source, asr_overflow)
+        self.transcript_data = {who: [] for who in self.audio_sources}
+
+        # —— 流水线：每个音源一个 ASR 阶段，翻译与发布各一个阶段
+        # 同一短语还没来得及翻译的旧假设直接被新假设替换；队列满时只丢进行中短语的假设，
+        # 分段和已结束短语的最终文本不丢，没有可丢的就阻塞
+        self.mt_queue = StageQueue(MT_QUEUE_SIZE, mt_overflow, key=lambda item: item[0],
+                                   name="mt" + suffix, droppable=self._is_interim)
+        self.publish_queue = StageQueue(PUBLISH_QUEUE_SIZE, publish_overflow,
+                                        name="publish" + suffix)
+        self.stages = [
+            Stage(f"asr-{who}", src["queue"],
+                  lambda items, who=who: self._asr_step(who, items),
+                  batch_size=MAX_COALESCE, batched=True)
+            for who, src in self.audio_sources.items()
+        ]
+        # stop 时注销，否则回调一直持有已停止的转写器
+        self._rtf_functions = {
+            who: lambda s=src["stats"]: s["asr_seconds"] / s["audio_seconds"] if s["audio_seconds"] else 0.0
+            for who, src in self.audio_sources.items()
+        }
+        for who, fn in self._rtf_functions.items():
+            ASR_RTF.set_function(fn, source=who)
+        if self.translator:
+            self.stages.append(Stage("mt", self.mt_queue, self._mt_step,
+                                     batch_size=getattr(self.translator, "max_batch", 1),
+                                     batched=True))
+        self.stages.append(Stage("publish", self.publish_queue, self._publish_step))
+
+    def _new_source(self, source_name, source, overflow):
+        bytes_per_second = source.SAMPLE_RATE * source.SAMPLE_WIDTH * source.channels
+        return {
+            "sample_rate": source.SAMPLE_RATE,
+            "sample_width": source.SAMPLE_WIDTH,
+            "channels":    source.channels,
+            "bytes_per_second": bytes_per_second,
+            "buffer":      PhraseBuffer(self.max_phrase_seconds),
+            "buffer_t0":   0.0,    # 缓存第一个样本对应的时间（epoch 秒），用于给分段打时间戳
+            "phrase_samples": 0,   # 当前短语累计的样本数（含已确认丢弃的部分）
+            "last_spoken": None,   # 上一块音频结束的采集时间
+            "decoder":     StreamingDecoder(self.asr_scheduler, language="en"),
+            "queue":       StageQueue(ASR_QUEUE_SIZE, overflow,
+                                      merge=functools.partial(_merge_chunks,
+                                                              bytes_per_second=bytes_per_second),
+                                      name=f"asr-{source_name}"),
+            "phrase_id":   0,
+            "phrase_text": "",     # 当前短语最近一次发布的原文
+            # 界面清空后由 ASR 线程在下一次识别前重置短语状态；编号小于 first_phrase 的结果不再上屏
+            "reset":       threading.Event(),
+            "first_phrase": 0,
+            "stats":       {"chunks": 0, "asr_calls": 0, "coalesced_chunks": 0,
+                            "audio_seconds": 0.0, "asr_seconds": 0.0}
+        }
+
+    def add_segment_listener(self, fn):
+        self.segment_listeners.append(fn)
+
+    def start(self):
+        """启动 ASR / 翻译 / 发布各阶段线程（只启动一次）"""
+        if self._started:
+            return
+        self._started = True
+        for stage in self.stages:
+            stage.start()
+
+    def feed(self, who, data, time_spoken):
+        """把一个音频块送进对应音源的 ASR 队列，记下入队时间用于统计延迟"""
+        src = self.audio_sources.get(who)
+        if src is None:
+            return
+        frame = src["sample_width"] * src["channels"]
+        FED_AUDIO.inc(len(data) / float(frame * src["sample_rate"]), source=who)
+        src["queue"].put((data, time_spoken, time.monotonic()))
 
     def transcribe_audio_queue(self, audio_queue):
+        """采集阶段：启动后续各阶段，并把音频块按音源分发到对应的 ASR 队列"""
+        self.start()
         while True:
-            who, data, time_spoken = audio_queue.get()
-            if who not in self.audio_sources:
-                continue
-
-            # —— 更新缓存
-            self._update_audio_buffer(who, data, time_spoken)
-
-            # —— 写 WAV 做 ASR
-            orig_text, tmp = "", None
-            try:
-                with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as fp:
-                    tmp = fp.name
-                    self.audio_sources[who]["process_data_func"](
-                        self.audio_sources[who]["last_sample"], tmp
-                    )
-                orig_text = self.asr_model.transcribe(tmp, language="en")
-            except Exception as e:
-                print("ASR Error:", e)
-            finally:
-                if tmp and os.path.exists(tmp):
-                    os.unlink(tmp)
-
-            if not orig_text:
-                continue
-
-            # —— 翻译（可选）
-            trans_text = ""
-            if self.translator:
-                trans_text = self.translator.translate(orig_text)
-
-            # —— 更新 transcript
-            ts_str = time_spoken.strftime("%H:%M:%S")
-            self.update_transcript(who, orig_text, trans_text, ts_str)
+            self.feed(*audio_queue.get())
+
+    def flush(self, timeout=None):
+        """
+        输入结束时调用：等积压的音频识别完，把各音源未确认的尾部作为最终分段发出，
+        再等翻译和发布阶段处理完。
+        """
+        for src in self.audio_sources.values():
+            src["queue"].join(timeout)
+        for who in self.audio_sources:
+            if not self._apply_reset(who):
+                self._end_phrase(who)
+        self.mt_queue.join(timeout)
+        self.publish_queue.join(timeout)
+
+    def stop(self, timeout=None):
+        """停止各阶段线程和自己创建的调度器（先 flush 才不会丢掉积压的结果）"""
+        for stage in self.stages:
+            stage.stop(timeout)
+        if self._owns_scheduler:
+            self.asr_scheduler.close(timeout)
+        for who, fn in self._rtf_functions.items():
+            ASR_RTF.remove_function(fn, source=who)
+
+    def _active_sources(self):
+        """还有音频排队或正在识别的音源数，调度器据此决定是否等待凑批"""
+        return sum(1 for src in self.audio_sources.values() if src["queue"].unfinished())
+
+    def _asr_step(self, who, items):
+        """
+        一次取走该音源积压的所有音频块，按短语边界分组，
+        每组只更新一次缓存、只做一次 ASR，让识别追上实时。
+        """
+        self.audio_sources[who]["stats"]["chunks"] += len(items)
+        self._apply_reset(who)
+        group = [items[0]]
+        for item in items[1:]:
+            if self._gap(who, group[-1], item) > PHRASE_TIMEOUT:
+                self._transcribe_chunks(who, group)
+                group = []
+            group.append(item)
+        self._transcribe_chunks(who, group)
+
+    def _transcribe_chunks(self, who, chunks):
+        src = self.audio_sources[who]
+        src["stats"]["asr_calls"] += 1
+        src["stats"]["coalesced_chunks"] += len(chunks) - 1
+        time_spoken = chunks[-1][1]
+        enqueued = min(c[2] for c in chunks)
+
+        # —— 更新缓存：首尾相接的块一起转换，中间有空档的分开写入，空档由缓存补零
+        run = [chunks[0]]
+        for chunk in chunks[1:]:
+            if self._gap(who, run[-1], chunk) > GAP_TOLERANCE:
+                self._update_audio_buffer(who, b"".join(c[0] for c in run), run[0][1])
+                run = []
+            run.append(chunk)
+        self._update_audio_buffer(who, b"".join(c[0] for c in run), run[0][1])
+
+        # —— 内存中增量 ASR：只解码未确认的尾部
+        committed, tentative = "", ""
+        t_asr = time.monotonic()
+        try:
+            committed, tentative, consumed = src["decoder"].step(src["buffer"].view())
+            asr_seconds = time.monotonic() - t_asr
+            src["stats"]["asr_seconds"] += asr_seconds
+            ASR_SECONDS.observe(asr_seconds, source=who)
+            if self.segment_listeners and src["decoder"].newly_committed:
+                self._emit_segment(who, src["decoder"].newly_committed,
+                                   {"queue": t_asr - enqueued, "asr": asr_seconds}, enqueued)
+            n = int(consumed * SAMPLE_RATE)
+            src["buffer"].consume(n)
+            src["buffer_t0"] += n / SAMPLE_RATE
+        except Exception as e:
+            print("ASR Error:", e)
+
+        ts_str = time_spoken.strftime("%H:%M:%S")
+        if src["phrase_samples"] >= self.max_phrase_seconds * SAMPLE_RATE:
+            # 短语过长强制切段：已确认部分留在旧条目，未确认尾部的音频带进新短语
+            self._publish(who, committed.strip(), ts_str)
+            src["decoder"].reset()
+            self._next_phrase(who)
+            src["phrase_samples"] = len(src["buffer"])
+            return
+        self._publish(who, (committed + tentative).strip(), ts_str)
+
+    def _publish(self, who, orig_text, ts_str):
+        """原文立即发布，翻译交给下一阶段（可选）"""
+        if not orig_text:
+            return
+        src = self.audio_sources[who]
+        key = (who, src["phrase_id"])
+        src["phrase_text"] = orig_text
+        self.publish_queue.put((key, orig_text, None, ts_str))
+        if self.translator and self.live_translation:
+            self.mt_queue.put((key, orig_text, None))
+
+    def _next_phrase(self, who, requeue=True):
+        """
+        之后的识别结果另起一条。旧短语最后一次的假设可能已被挤出翻译队列，
+        再入队一次：此时它不再是进行中的假设，不会被丢弃；还在队列里的直接合并，
+        已经翻译过的命中译文缓存。
+        """
+        src = self.audio_sources[who]
+        key, text = (who, src["phrase_id"]), src["phrase_text"]
+        src["phrase_id"] += 1   # 先换编号，_is_interim 随即把旧短语视为已结束
+        src["phrase_text"] = ""
+        if requeue and text and self.translator and self.live_translation:
+            self.mt_queue.put((key, text, None))
+
+    def _is_interim(self, item):
+        """翻译队列中可以丢弃的条目：进行中短语的假设，后面还会有更新的版本"""
+        key, _, segment = item
+        return segment is None and key[1] == self.audio_sources[key[0]]["phrase_id"]
+
+    def _emit_segment(self, who, units, latency, enqueued):
+        """
+        把新确认的单元合成一个分段，经翻译阶段（可选）交给分段监听器。
+        units 的时间相对当前缓存起点。
+        """
+        text = "".join(u[0] for u in units).strip()
+        if not text:
+            return
+        src = self.audio_sources[who]
+        segment = {
+            "source": who,
+            "phrase": src["phrase_id"],
+            "start": src["buffer_t0"] + units[0][1],
+            "end": src["buffer_t0"] + units[-1][2],
+            "text": text,
+            "translation": None,
+            "latency": latency,
+            "emitted_at": time.time(),  # 识别出这段文本的时刻（epoch 秒）
+            "_enqueued": enqueued,
+        }
+        if self.translator:
+            # 分段各自占一个 key，不会在 coalesce 队列里互相覆盖
+            self._segment_seq += 1
+            self.mt_queue.put(((_SEGMENT, self._segment_seq), text, segment))
+        else:
+            self.publish_queue.put((_SEGMENT, segment))
+
+    def _mt_step(self, items):
+        # 队列里积压的几句一起翻译，一次带 padding 的 generate
+        t0 = time.monotonic()
+        trans = self.translator.translate_batch([text for _, text, _ in items])
+        elapsed = time.monotonic() - t0
+        MT_SECONDS.observe(elapsed)
+        for (key, _, segment), trans_text in zip(items, trans):
+            if segment is None:
+                self.publish_queue.put((key, None, trans_text, None))
+            else:
+                segment["translation"] = trans_text
+                segment["latency"]["mt"] = elapsed
+                self.publish_queue.put((_SEGMENT, segment))
+
+    def _publish_step(self, item):
+        if item[0] == _SEGMENT:
+            segment = item[1]
+            segment["latency"]["total"] = time.monotonic() - segment.pop("_enqueued")
+            for fn in self.segment_listeners:
+                fn(segment)
+            return
+        self.update_transcript(*item)
+
+    def _gap(self, who, prev, item):
+        """两个音频块之间的空档（秒）：前一块结束到后一块开始"""
+        duration = len(prev[0]) / self.audio_sources[who]["bytes_per_second"]
+        return (item[1] - prev[1]).total_seconds() - duration
 
     def _update_audio_buffer(self, who, data, time_spoken):
+        """time_spoken 为 data 第一个样本的采集时间"""
         src = self.audio_sources[who]
         if (src["last_spoken"] and
             (time_spoken - src["last_spoken"]).total_seconds() > PHRASE_TIMEOUT):
-            src["last_sample"] = bytes()  # 新段清空缓存
-            src["new_phrase"]  = True
+            self._end_phrase(who)  # 新段清空缓存
+        pcm = self._to_model_input(who, data)  # 只转换新到的数据
+        if not len(src["buffer"]):
+            src["buffer_t0"] = time_spoken.timestamp()
         else:
-            src["new_phrase"]  = False
-        src["last_sample"] += data
-        src["last_spoken"]  = time_spoken
-
-    def process_mic_data(self, data, temp_file_name):
-        audio_data = sr.AudioData(
-            data,
-            self.audio_sources["You"]["sample_rate"],
-            self.audio_sources["You"]["sample_width"]
-        )
-        wav = io.BytesIO(audio_data.get_wav_data())
-        with open(temp_file_name, "wb") as f:
-            f.write(wav.read())
-
-    def process_speaker_data(self, data, temp_file_name):
-        with wave.open(temp_file_name, "wb") as wf:
-            wf.setnchannels(self.audio_sources["Speaker"]["channels"])
-            p = pyaudio.PyAudio()
-            wf.setsampwidth(p.get_sample_size(pyaudio.paInt16))
-            wf.setframerate(self.audio_sources["Speaker"]["sample_rate"])
-            wf.writeframes(data)
-
-    def update_transcript(self, who, orig_text, trans_text, ts_str):
+            # 短语内被 VAD 丢掉的静音补零，缓存与采集时间轴保持一致，分段时间戳才准确
+            gap = time_spoken.timestamp() - (src["buffer_t0"] + len(src["buffer"]) / SAMPLE_RATE)
+            if gap > GAP_TOLERANCE:
+                pcm = np.concatenate((np.zeros(int(round(gap * SAMPLE_RATE)), np.float32), pcm))
+        dropped = src["buffer"].dropped
+        src["buffer"].append(pcm)
+        # 超过上限时最旧的样本被丢掉，缓存起点随之后移
+        src["buffer_t0"] += (src["buffer"].dropped - dropped) / SAMPLE_RATE
+        src["phrase_samples"] += len(pcm)
+        src["stats"]["audio_seconds"] += len(pcm) / SAMPLE_RATE
+        ASR_AUDIO.inc(len(pcm) / SAMPLE_RATE, source=who)
+        src["last_spoken"] = time_spoken + timedelta(seconds=len(data) / src["bytes_per_second"])
+
+    def _end_phrase(self, who, emit=True):
+        """结束当前短语：界面上的条目保留，之后的识别结果另起一条"""
+        src = self.audio_sources[who]
+        units = src["decoder"].tentative_units
+        if emit and units and self.segment_listeners:
+            # 短语结束后不会再有新假设，未确认的尾部直接作为最终结果
+            self._emit_segment(who, units, {"queue": 0.0, "asr": 0.0}, time.monotonic())
+        src["buffer"].clear()
+        src["phrase_samples"] = 0
+        src["decoder"].reset()
+        self._next_phrase(who, requeue=emit)
+
+    def _to_model_input(self, who, data):
+        """
+        PCM → 16 kHz 单声道 float32。
+        录音器已在采集时转成 16k 单声道，这里只剩一次类型转换；其他格式的音源再混缩、重采样。
+        """
+        src = self.audio_sources[who]
+        pcm = dsp.downmix(dsp.to_float32(data, src["sample_width"]), src["channels"])
+        if src["sample_rate"] != SAMPLE_RATE:
+            pcm = dsp.resample(pcm, src["sample_rate"], SAMPLE_RATE)
+        return pcm
+
+    def update_transcript(self, phrase_key, orig_text=None, trans_text=None, ts_str=None):
+        """
+        每个短语对应一条条目，已确认前缀 + 未确认尾部一起原地刷新。
+        原文和译文分别到达，为 None 的字段保持不变。
+        """
+        who = phrase_key[0]
+        if phrase_key[1] < self.audio_sources[who]["first_phrase"]:
+            return  # 清空之前的短语迟到的结果
         lst = self.transcript_data[who]
-        entry = (orig_text, trans_text, ts_str)
-        if self.audio_sources[who]["new_phrase"] or not lst:
+        entry = self._phrase_entries.get(phrase_key)
+        if entry is None:
+            if orig_text is None:  # 条目已经被挤出界面，迟到的译文直接丢弃
+                return
+            entry = [orig_text, trans_text or "", ts_str]
+            self._phrase_entries[phrase_key] = entry
             lst.append(entry)
         else:
-            lst[-1] = entry
+            if orig_text is not None:
+                entry[0], entry[2] = orig_text, ts_str
+            if trans_text is not None:
+                entry[1] = trans_text
 
         if len(lst) > MAX_PHRASES:
             lst[:] = lst[-MAX_PHRASES:]
+            alive = {id(e) for e in lst}
+            for k in [k for k, e in self._phrase_entries.items()
+                      if k[0] == who and id(e) not in alive]:
+                del self._phrase_entries[k]
 
         self.transcript_changed_event.set()
 
+    def get_stats(self):
+        """
+        各音源收到的音频块数、实际 ASR 调用次数、被合并掉的块数、
+        送进识别的音频秒数、ASR 累计耗时、因超上限丢弃的样本数
+        """
+        return {who: dict(src["stats"], dropped_samples=src["buffer"].dropped)
+                for who, src in self.audio_sources.items()}
+
     def get_transcript_entries(self):
         merged = []
         for who, lst in self.transcript_data.items():
@@ -138,8 +435,25 @@ class AudioTranscriber:
         return "\n".join(lines)
 
     def clear_transcript_data(self):
-        self.transcript_data = {"You": [], "Speaker": []}
+        """
+        界面线程调用：立即清空显示，丢掉还没识别的音频。
+        缓存和解码器只归各音源的 ASR 线程使用，这里只做标记，由 _apply_reset 在 ASR 线程里重置。
+        """
+        self.transcript_data = {who: [] for who in self.audio_sources}
+        self._phrase_entries = {}
         for src in self.audio_sources.values():
-            src["last_sample"] = bytes()
-            src["last_spoken"] = None
-            src["new_phrase"]  = True
+            src["queue"].clear()
+            # 当前短语（重置后会换编号）还在路上的结果也不再上屏
+            src["first_phrase"] = src["phrase_id"] + 1
+            src["reset"].set()
+
+    def _apply_reset(self, who):
+        """在 ASR 线程中执行界面请求的重置；没有待执行的重置时返回 False"""
+        src = self.audio_sources[who]
+        if not src["reset"].is_set():
+            return False
+        src["reset"].clear()
+        self._end_phrase(who, emit=False)
+        src["last_spoken"] = None
+        src["first_phrase"] = src["phrase_id"]
+        return True
@@ -0,0 +1,245 @@
+# batchTranscribe.py
+"""
+离线批量转写：遍历目录下的录音，分发到多个进程并行识别（可选翻译），
+每个文件输出 SRT 和/或 JSONL。每个进程只加载一份模型，线程数可配置；
+输出先写临时文件再改名，中断后重新运行会跳过已完成的文件。
+
+    python batchTranscribe.py whisper small ./meetings ./out --workers 4 --threads 2
+    python batchTranscribe.py funasr paraformer-speech_68m ./meetings ./out --mt-backend m2m100 --mt-model zh-en
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import custom_speech_recognition as sr
+from custom_speech_recognition import dsp
+from transcriberModels import SAMPLE_RATE, LONG_BATCH, load_asr_model
+import precision as prec
+
+AUDIO_EXTS = (".wav", ".aif", ".aiff")  # AudioFile 支持的格式
+# 字幕条目的切分条件
+CUE_MAX_SECONDS = 6.0
+CUE_MAX_GAP = 0.8
+_SENTENCE_END = tuple("。！？.!?")
+
+# 每个工作进程各自持有的模型，由 _init_worker 加载
+_worker = {}
+
+
+def read_audio(path):
+    """用 AudioFile 读取整个文件，返回 16 kHz 单声道 float32"""
+    with sr.AudioFile(path) as source:
+        data = source.stream.read(-1)
+        pcm = dsp.to_float32(data, source.SAMPLE_WIDTH)
+        rate = source.SAMPLE_RATE
+    return dsp.resample(pcm, rate, SAMPLE_RATE) if rate != SAMPLE_RATE else pcm
+
+
+def make_cues(units):
+    """把识别单元合并成字幕条目：句末标点、停顿过长或条目过长时切开"""
+    cues, cur = [], None
+    for text, start, end in units:
+        if cur and (start - cur["end"] > CUE_MAX_GAP or end - cur["start"] > CUE_MAX_SECONDS):
+            cues.append(cur)
+            cur = None
+        if cur is None:
+            cur = {"start": start, "end": end, "text": text}
+        else:
+            cur["end"], cur["text"] = end, cur["text"] + text
+        if cur["text"].rstrip().endswith(_SENTENCE_END):
+            cues.append(cur)
+            cur = None
+    if cur:
+        cues.append(cur)
+    for cue in cues:
+        cue["text"] = cue["text"].strip()
+    return [c for c in cues if c["text"]]
+
+
+def _srt_time(t):
+    ms = int(round(t * 1000))
+    h, ms = divmod(ms, 3600000)
+    m, ms = divmod(ms, 60000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+
+
+def format_srt(cues):
+    blocks = []
+    for i, cue in enumerate(cues, 1):
+        lines = [str(i), f"{_srt_time(cue['start'])} --> {_srt_time(cue['end'])}", cue["text"]]
+        if cue.get("translation"):
+            lines.append(cue["translation"])
+        blocks.append("\n".join(lines) + "\n")
+    return "\n".join(blocks)
+
+
+def format_jsonl(cues):
+    return "".join(json.dumps({"start": round(c["start"], 3), "end": round(c["end"], 3),
+                               "text": c["text"], "translation": c.get("translation")},
+                              ensure_ascii=False) + "\n"
+                   for c in cues)
+
+
+FORMATTERS = {"srt": format_srt, "jsonl": format_jsonl}
+
+
+def output_paths(path, in_dir, out_dir, formats):
+    """输出沿用输入的相对目录结构，扩展名替换为 .srt / .jsonl"""
+    stem = os.path.splitext(os.path.relpath(path, in_dir))[0]
+    return {fmt: os.path.join(out_dir, f"{stem}.{fmt}") for fmt in formats}
+
+
+def _write_atomic(path, text):
+    # 先写临时文件再改名，中断时不会留下半个输出被误判为已完成
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".part"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _init_worker(series, model_name, mt_backend, mt_model, threads, device, batch_size,
+                 precision):
+    """进程初始化：限制线程数，加载一份 ASR（和翻译）模型供该进程处理的所有文件复用"""
+    import torch
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # 已经初始化过线程池
+    _worker["asr"] = load_asr_model(series, model_name, device, precision)
+    _worker["batch_size"] = batch_size
+    _worker["translator"] = None
+    if mt_backend:
+        from translator import Translator
+        _worker["translator"] = Translator(mt_backend, mt_model, precision=precision)
+
+
+def _process_file(path, outputs, language):
+    """工作进程中处理一个文件，返回 (音频秒数, 字幕条数, 耗时)"""
+    start = time.monotonic()
+    pcm = read_audio(path)
+    cues = make_cues(_worker["asr"].transcribe_long(pcm, language=language,
+                                                    batch_size=_worker["batch_size"]))
+    translator = _worker["translator"]
+    if translator and cues:
+        for cue, trans in zip(cues, translator.translate_batch([c["text"] for c in cues])):
+            cue["translation"] = trans
+    for fmt, out_path in outputs.items():
+        _write_atomic(out_path, FORMATTERS[fmt](cues))
+    return len(pcm) / float(SAMPLE_RATE), len(cues), time.monotonic() - start
+
+
+def find_audio_files(in_dir):
+    files = []
+    for root, _, names in os.walk(in_dir):
+        for name in names:
+            if name.lower().endswith(AUDIO_EXTS):
+                files.append(os.path.join(root, name))
+    return sorted(files)
+
+
+def run_batch(series, model_name, in_dir, out_dir, formats=("srt", "jsonl"),
+              mt_backend=None, mt_model=None, workers=None, threads=1,
+              language="auto", device="cpu", resume=True, batch_size=LONG_BATCH,
+              precision="fp32"):
+    """
+    并行转写 in_dir 下的所有录音，返回汇总统计。
+    resume=True 时跳过所有输出都已存在的文件。
+    """
+    files = find_audio_files(in_dir)
+    jobs = []
+    for path in files:
+        outputs = output_paths(path, in_dir, out_dir, formats)
+        if resume and all(os.path.exists(p) for p in outputs.values()):
+            continue
+        jobs.append((path, outputs))
+    # 大文件先发，避免最后只剩一个进程在跑长文件
+    jobs.sort(key=lambda job: os.path.getsize(job[0]), reverse=True)
+    stats = {"files": len(files), "skipped": len(files) - len(jobs), "done": 0,
+             "failed": 0, "audio_seconds": 0.0, "wall_seconds": 0.0}
+    if not jobs:
+        return stats
+
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) // threads)
+    workers = min(workers, len(jobs))
+    start = time.monotonic()
+    # spawn：子进程不继承父进程的 torch 线程池状态
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(series, model_name, mt_backend, mt_model,
+                                       threads, device, batch_size, precision)) as pool:
+        futures = {pool.submit(_process_file, path, outputs, language): path
+                   for path, outputs in jobs}
+        try:
+            for fut in as_completed(futures):
+                path = futures[fut]
+                try:
+                    seconds, n_cues, elapsed = fut.result()
+                except Exception as e:
+                    stats["failed"] += 1
+                    print(f"[batch] Error: {path}: {e}", file=sys.stderr)
+                    continue
+                stats["done"] += 1
+                stats["audio_seconds"] += seconds
+                print(f"[batch] {stats['done'] + stats['failed']}/{len(jobs)} {path} "
+                      f"{seconds:.1f}s audio, {n_cues} cues, RTF {elapsed / max(seconds, 1e-6):.3f}",
+                      file=sys.stderr)
+        except KeyboardInterrupt:
+            # 已完成的文件都已落盘，下次运行会跳过
+            for fut in futures:
+                fut.cancel()
+            raise
+    stats["wall_seconds"] = time.monotonic() - start
+    if stats["audio_seconds"]:
+        stats["rtf"] = stats["wall_seconds"] / stats["audio_seconds"]
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线批量转写目录下的录音")
+    parser.add_argument("series", help="ASR 系列 (whisper, funasr)")
+    parser.add_argument("model", help="具体模型 (如 small, paraformer, ...)")
+    parser.add_argument("input_dir", help="录音目录（递归查找 wav/aiff）")
+    parser.add_argument("output_dir", help="输出目录，保持与输入相同的子目录结构")
+    parser.add_argument("--mt-backend", choices=["helsinki", "m2m100"],
+                        help="翻译后端；不指定则只输出原文")
+    parser.add_argument("--mt-model", help="语言对 (如 en-zh)")
+    parser.add_argument("--format", default="srt,jsonl",
+                        help="输出格式，逗号分隔：srt, jsonl（默认两者都输出）")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="进程数，默认 CPU 核数 / threads")
+    parser.add_argument("--threads", type=int, default=1,
+                        help="每个进程的 torch 线程数，默认 1")
+    parser.add_argument("--language", default="auto", help="识别语言，默认自动")
+    parser.add_argument("--device", default="cpu", help="推理设备，默认 cpu")
+    parser.add_argument("--batch-size", type=int, default=LONG_BATCH,
+                        help=f"每次前向识别的窗口数，默认 {LONG_BATCH}")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="不跳过已有输出，全部重新转写")
+    prec.add_arguments(parser)
+    args = parser.parse_args()
+
+    formats = [f.strip() for f in args.format.split(",") if f.strip()]
+    unknown = [f for f in formats if f not in FORMATTERS]
+    if unknown or not formats:
+        parser.error(f"不支持的输出格式: {', '.join(unknown) or args.format}")
+    if args.mt_backend and not args.mt_model:
+        parser.error("--mt-backend 需要同时指定 --mt-model")
+
+    stats = run_batch(args.series, args.model, args.input_dir, args.output_dir,
+                      formats=formats, mt_backend=args.mt_backend, mt_model=args.mt_model,
+                      workers=args.workers, threads=args.threads, language=args.language,
+                      device=args.device, resume=not args.no_resume,
+                      batch_size=args.batch_size, precision=args.precision)
+    print(json.dumps(stats, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
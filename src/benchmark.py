@@ -0,0 +1,286 @@
+# benchmark.py
+"""
+端到端基准测试：录音文件按 1× / N× 实时速度回放，走真实的
+AudioTranscriber → Translator → GPTResponder 路径，LLM 和 TTS 由本地桩服务代替。
+每个 ASR/MT 组合在独立进程中运行（峰值内存互不影响），结果写成 JSON，便于跨提交比较。
+
+    python benchmark.py --mic ../fixtures/meeting_en.wav --asr whisper:small --mt helsinki:en-zh
+    python benchmark.py --speaker talk.wav --asr whisper:base --asr funasr:paraformer-speech_68m \\
+        --mt m2m100:en-zh --speed 4 --output bench.json
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+# precisionOptions 不依赖 torch，主进程不需要加载 torch
+from precisionOptions import PRECISIONS
+
+PERCENTILES = (50, 95, 99)
+DRAIN_TIMEOUT = 120.0   # 回放结束后等待流水线处理完的最长时间（秒）
+
+
+def summarize(values):
+    """延迟样本 → {n, mean, p50, p95, p99, max}，单位秒"""
+    if not values:
+        return {"n": 0}
+    arr = np.asarray(values, dtype=np.float64)
+    out = {"n": len(values), "mean": round(float(arr.mean()), 4),
+           "max": round(float(arr.max()), 4)}
+    for p in PERCENTILES:
+        out[f"p{p}"] = round(float(np.percentile(arr, p)), 4)
+    return out
+
+
+def peak_rss_mb():
+    """当前进程的峰值常驻内存（MB）"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为 KB，macOS 为字节
+        return round(peak / (1024.0 * 1024.0 if sys.platform == "darwin" else 1024.0), 1)
+    except ImportError:
+        import psutil
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / (1024.0 * 1024.0), 1)
+
+
+def _timed(fn, samples):
+    def wrapper(*args, **kwargs):
+        start = time.monotonic()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            samples.append(time.monotonic() - start)
+    return wrapper
+
+
+def run_case(asr_spec, mt_spec, fixtures, speed=1.0, hop=0.2, llm_delay=0.0,
+             tts_delay=0.0, response_interval=2, vad_backend="energy", device=None,
+             warmup=True, precision="fp32", llm_token_delay=0.0, llm_stream=True,
+             tts_stream=True, tts_chunk_delay=0.0):
+    """
+    在当前进程里跑一个 ASR/MT 组合，返回结果字典。
+    asr_spec / mt_spec 形如 "whisper:small" / "helsinki:en-zh"，mt_spec 为 None 时不翻译。
+    fixtures: {音源名: 录音文件}，音源名沿用 "You" / "Speaker"。
+    """
+    from startup import load_models
+    from audioTranscriber import AudioTranscriber
+    from audioMux import AudioMultiplexer, REORDER_DELAY
+    from aiResponder import GPTResponder
+    from replaySource import ReplayRecorder
+    from stubServers import StubLLMServer, StubTTSServer
+
+    result = {"asr": asr_spec, "mt": mt_spec, "speed": speed, "hop": hop, "warmup": warmup,
+              "precision": precision}
+
+    # —— 模型加载与预热（各步骤耗时见 load）
+    series, model_name = asr_spec.split(":", 1)
+    mt_backend, mt_model = mt_spec.split(":", 1) if mt_spec else (None, None)
+    asr_model, translator, timer = load_models(series, model_name, mt_backend, mt_model,
+                                               device, warmup=warmup, precision=precision)
+    result["load"] = {f"{step}_seconds": round(sec, 3) for step, sec in timer.steps.items()}
+    result["load"]["total_seconds"] = round(timer.total(), 3)
+    result["rss_after_load_mb"] = peak_rss_mb()
+
+    # —— 桩服务与回答器
+    llm = StubLLMServer(delay=llm_delay, token_delay=llm_token_delay).start()
+    tts = StubTTSServer(delay=tts_delay, chunk_delay=tts_chunk_delay).start()
+    responder = GPTResponder(llm_url=llm.url, tts_url=tts.url, play_audio=False,
+                             stream=llm_stream, stream_tts=tts_stream)
+    responder.response_interval = response_interval
+    llm_rtt, llm_ttft, tts_rtt, tts_first_audio = [], [], [], []
+    generate = _timed(responder.generate_response_from_transcript, llm_rtt)
+
+    def generate_and_record(transcript, **kwargs):
+        responder.last_ttft = None
+        try:
+            return generate(transcript, **kwargs)
+        finally:
+            if responder.last_ttft is not None:
+                llm_ttft.append(responder.last_ttft)
+
+    responder.generate_response_from_transcript = generate_and_record
+    tts_request = _timed(responder._tts_request, tts_rtt)
+
+    def tts_and_record(text):
+        # 流式模式返回首段音频延迟；整段模式下首段音频即整个请求完成
+        first_audio = tts_request(text)
+        if first_audio is not None:
+            tts_first_audio.append(first_audio)
+        elif not tts_stream:
+            tts_first_audio.append(tts_rtt[-1])
+        return first_audio
+
+    responder._tts_request = tts_and_record
+
+    # —— 回放音源 → 复用器 → 转写器，与 main.py 的接法相同
+    recorders = {who: ReplayRecorder(path, who, speed=speed, vad_backend=vad_backend)
+                 for who, path in fixtures.items()}
+    audio_mux = AudioMultiplexer()
+    for who in recorders:
+        audio_mux.add_source(who)
+    transcriber = AudioTranscriber(
+        recorders.get("You"), recorders.get("Speaker"), asr_model, translator,
+        extra_sources={who: rec for who, rec in recorders.items()
+                       if who not in ("You", "Speaker")})
+
+    to_text, to_translation = [], []
+
+    def on_segment(segment):
+        # 以这段文本最后一个样本被采集的时刻为起点
+        spoken = recorders[segment["source"]].capture_time(segment["end"])
+        to_text.append(segment["emitted_at"] - spoken)
+        if segment["translation"] is not None:
+            to_translation.append(time.time() - spoken)
+
+    transcriber.add_segment_listener(on_segment)
+    threading.Thread(target=transcriber.transcribe_audio_queue, args=(audio_mux,),
+                     name="mux-dispatch", daemon=True).start()
+    threading.Thread(target=responder.respond_to_transcriber, args=(transcriber, [True]),
+                     name="responder", daemon=True).start()
+
+    start = time.monotonic()
+    for rec in recorders.values():
+        rec.record_into_queue(audio_mux, streaming=True, hop_duration=hop)
+    for rec in recorders.values():
+        rec.done.wait()
+    replay_end = time.monotonic()
+    # 复用器排空后还要等最后一块交到 ASR 队列
+    while audio_mux.qsize():
+        time.sleep(0.01)
+    time.sleep(REORDER_DELAY * 5)
+    transcriber.flush(DRAIN_TIMEOUT)
+    end = time.monotonic()
+    # 最后一次转写变化也给回答器一个周期
+    time.sleep(min(response_interval, 5) + 0.5)
+
+    audio_seconds = max(rec.duration for rec in recorders.values())
+    stats = transcriber.get_stats()
+    asr_seconds = sum(s["asr_seconds"] for s in stats.values())
+    result.update({
+        "audio_seconds": round(audio_seconds, 3),
+        "wall_seconds": round(end - start, 3),
+        "drain_seconds": round(end - replay_end, 3),
+        # 回放完所需时间 / 音频时长；N× 回放时小于 1 说明跟得上
+        "rtf": round((end - start) / audio_seconds, 4),
+        # ASR 实际计算时间 / 送进 ASR 的音频时长
+        "asr_rtf": round(asr_seconds / max(sum(s["audio_seconds"] for s in stats.values()), 1e-6), 4),
+        "latency": {
+            "speech_to_text": summarize(to_text),
+            "speech_to_translation": summarize(to_translation),
+            "llm_rtt": summarize(llm_rtt),
+            "llm_ttft": summarize(llm_ttft),
+            "tts_rtt": summarize(tts_rtt),
+            "tts_first_audio": summarize(tts_first_audio),
+        },
+        "requests": {"llm": llm.requests, "tts": tts.requests},
+        # 发起 / 因转写更新作废 / 内容未变跳过的 LLM 请求数
+        "responder": dict(responder.stats),
+        "context": dict(responder.context.stats, tokens=responder.context.tokens()),
+        # 连接数远小于请求数说明 keep-alive 生效
+        "connections": {"llm": llm.connections, "tts": tts.connections},
+        "peak_rss_mb": peak_rss_mb(),
+        "transcriber": stats,
+    })
+    if translator:
+        result["mt_cache"] = translator.cache.stats()
+    llm.close()
+    tts.close()
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端延迟/吞吐基准测试")
+    parser.add_argument("--mic", help="作为麦克风（You）回放的录音文件")
+    parser.add_argument("--speaker", help="作为扬声器回环（Speaker）回放的录音文件")
+    parser.add_argument("--asr", action="append", required=True,
+                        help="ASR 组合 系列:模型，可重复，如 whisper:small")
+    parser.add_argument("--mt", action="append",
+                        help="翻译组合 后端:语言对，可重复，如 helsinki:en-zh；不指定则不翻译")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放倍速，默认 1（实时）")
+    parser.add_argument("--hop", type=float, default=0.2, help="每块音频时长（秒）")
+    parser.add_argument("--llm-delay", type=float, default=0.0, help="LLM 桩服务的固定延迟（秒）")
+    parser.add_argument("--llm-token-delay", type=float, default=0.0,
+                        help="LLM 桩服务流式输出时每块之间的间隔（秒）")
+    parser.add_argument("--no-llm-stream", action="store_true", help="LLM 请求不使用流式输出")
+    parser.add_argument("--tts-delay", type=float, default=0.0, help="TTS 桩服务的固定延迟（秒）")
+    parser.add_argument("--tts-chunk-delay", type=float, default=0.0,
+                        help="TTS 桩服务流式输出时每块之间的间隔（秒）")
+    parser.add_argument("--no-tts-stream", action="store_true", help="TTS 请求不使用流式输出")
+    parser.add_argument("--vad", default="energy", choices=["energy", "silero", "none"])
+    parser.add_argument("--device", default=None, help="推理设备 (cpu / cuda)")
+    parser.add_argument("--no-warmup", action="store_true",
+                        help="跳过模型预热，测量首句延迟的冷启动情况")
+    parser.add_argument("--precision", action="append", choices=PRECISIONS,
+                        help="CPU 推理精度，可重复，如 --precision fp32 --precision int8")
+    parser.add_argument("--output", help="结果 JSON 文件，默认输出到 stdout")
+    args = parser.parse_args()
+
+    fixtures = {}
+    if args.mic:
+        fixtures["You"] = args.mic
+    if args.speaker:
+        fixtures["Speaker"] = args.speaker
+    if not fixtures:
+        parser.error("至少需要 --mic 或 --speaker 之一")
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "fixtures": fixtures,
+        },
+        "cases": [],
+    }
+    # 每个组合一个新进程：模型加载时间、峰值内存不受前一个组合影响
+    ctx = multiprocessing.get_context("spawn")
+    for asr_spec in args.asr:
+        for mt_spec in (args.mt or [None]):
+            for precision in (args.precision or ["fp32"]):
+                print(f"[bench] {asr_spec} + {mt_spec or '-'} ({precision}) ...", file=sys.stderr)
+                with ProcessPoolExecutor(1, mp_context=ctx) as pool:
+                    try:
+                        case = pool.submit(run_case, asr_spec, mt_spec, fixtures, args.speed,
+                                           args.hop, args.llm_delay, args.tts_delay,
+                                           vad_backend=args.vad, device=args.device,
+                                           warmup=not args.no_warmup,
+                                           precision=precision,
+                                           llm_token_delay=args.llm_token_delay,
+                                           llm_stream=not args.no_llm_stream,
+                                           tts_stream=not args.no_tts_stream,
+                                           tts_chunk_delay=args.tts_chunk_delay).result()
+                    except Exception as e:
+                        print(f"[bench] Error: {asr_spec} + {mt_spec}: {e}", file=sys.stderr)
+                        case = {"asr": asr_spec, "mt": mt_spec, "precision": precision,
+                                "error": str(e)}
+                report["cases"].append(case)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
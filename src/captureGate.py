@@ -0,0 +1,52 @@
+# captureGate.py
+"""
+流式采集的公共处理：每块音频混缩、有状态重采样为 16 kHz 单声道 float32，
+再由 VAD 决定是否送往识别，最后一块人声之后再多送 VAD_HANGOVER 秒，避免切掉尾音。
+麦克风/扬声器录音器、headless 输入和文件回放共用。
+"""
+from custom_speech_recognition import dsp
+from audioFormat import SAMPLE_RATE
+import metrics
+
+# 流式采集：每块时长，以及最后一块人声之后继续送出的时长
+HOP_DURATION = 0.2
+VAD_HANGOVER = 0.5
+
+CAPTURED = metrics.counter("capture_seconds_total", "采集到的音频秒数（VAD 过滤前）", ("source",))
+VAD_DROPPED = metrics.counter("capture_vad_dropped_total", "被 VAD 判定为无人声而丢弃的块数", ("source",))
+
+
+class SpeechGate:
+    """
+    一个音源的采集门控，只在采集线程里调用。
+    process(audio) 返回可以送去识别的 16 kHz float32；这一块没有人声且已过拖尾时返回 None。
+    vad 为 None 时不过滤。重采样器在第一块到达、知道输入采样率后创建。
+    """
+    def __init__(self, vad, source_name, sample_rate=SAMPLE_RATE, hangover=VAD_HANGOVER):
+        self.vad = vad
+        self.source_name = source_name
+        self.sample_rate = sample_rate
+        self.hangover = hangover
+        self.dropped = 0  # 被 VAD 丢弃的块数
+        self._resampler = None
+        self._hangover_left = 0.0
+
+    def process(self, audio):
+        x = dsp.downmix(dsp.to_float32(audio.frame_data, audio.sample_width), audio.channels)
+        # 有状态重采样，块与块之间没有边界失真
+        if self._resampler is None:
+            self._resampler = dsp.Resampler(audio.sample_rate, self.sample_rate)
+        x = self._resampler.process(x)
+        duration = len(x) / float(self.sample_rate)
+        CAPTURED.inc(duration, source=self.source_name)
+        if self.vad is None:
+            return x
+        if self.vad.is_speech(x, self.sample_rate, min_speech_ms=self.vad.frame_ms):
+            self._hangover_left = self.hangover
+        elif self._hangover_left > 0:
+            self._hangover_left -= duration
+        else:
+            self.dropped += 1
+            VAD_DROPPED.inc(source=self.source_name)
+            return None
+        return x
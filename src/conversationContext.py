@@ -0,0 +1,131 @@
+# conversationContext.py
+"""
+按 token 预算管理的对话历史：系统提示 + 滚动摘要 + 最近若干轮原文。
+超出预算时最旧的轮次移出原文区，由后台线程调用 summarize 并入摘要，
+请求体大小与会议时长无关。
+"""
+import re
+import threading
+from collections import deque
+
+CONTEXT_BUDGET = 3000    # 每次请求的消息总 token 上限（moonshot-v1-8k，给回复留足空间）
+SUMMARY_SHARE = 0.25     # 摘要最多占预算的比例
+MAX_PENDING_TURNS = 64   # 摘要一直失败时最多保留多少轮待合并，更旧的直接丢弃
+MESSAGE_OVERHEAD = 4     # 每条消息 role 等格式开销
+
+_CJK_RE = re.compile(r"[\u3000-\u303f\u3400-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+
+def estimate_tokens(text):
+    """粗略估计 token 数：中日文每字约 1 个，其他字符约 4 个一个；不依赖具体模型的分词器"""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _message_tokens(message):
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD
+
+
+class ConversationContext:
+    """
+    summarize(previous_summary, turns) -> 新摘要，turns 为 [(user, assistant)]；
+    在后台线程中调用，失败时返回 None，这些轮次留到下次再合并。
+    """
+    def __init__(self, system_prompt, budget=CONTEXT_BUDGET, summarize=None):
+        self.system_prompt = system_prompt
+        self.budget = budget
+        self.summary_budget = int(budget * SUMMARY_SHARE)
+        self.summarize = summarize
+        self.summary = ""
+        self.turns = deque()     # 原文保留的最近轮次 [(user, assistant)]
+        self._pending = []       # 已移出原文区、等待并入摘要的轮次
+        self._epoch = 0          # clear() 后作废进行中的摘要结果
+        self._summarizing = False
+        self._lock = threading.Lock()
+        self.stats = {"folded_turns": 0, "summaries": 0, "summary_errors": 0}
+
+    def messages(self, user_content=None):
+        """
+        本次请求要发送的消息列表（含新的用户消息）。
+        装不下时先把最旧的轮次移去摘要，保证总量不超过预算。
+        """
+        user = {"role": "user", "content": user_content} if user_content is not None else None
+        with self._lock:
+            self._fold(_message_tokens(user) if user else 0)
+            messages = [{"role": "system", "content": self.system_prompt}]
+            if self.summary:
+                messages.append({"role": "system", "content": f"之前对话的摘要：{self.summary}"})
+            for u, a in self.turns:
+                messages.append({"role": "user", "content": u})
+                messages.append({"role": "assistant", "content": a})
+        if user:
+            messages.append(user)
+        return messages
+
+    def add_turn(self, user_content, assistant_content):
+        with self._lock:
+            self.turns.append((user_content, assistant_content))
+            self._fold(0)
+
+    def tokens(self):
+        """当前历史（不含新用户消息）的估计 token 数"""
+        with self._lock:
+            return self._tokens()
+
+    def clear(self):
+        with self._lock:
+            self.summary = ""
+            self.turns.clear()
+            self._pending = []
+            self._epoch += 1
+
+    def _tokens(self):
+        total = estimate_tokens(self.system_prompt) + MESSAGE_OVERHEAD
+        if self.summary:
+            total += estimate_tokens(self.summary) + MESSAGE_OVERHEAD
+        for u, a in self.turns:
+            total += estimate_tokens(u) + estimate_tokens(a) + 2 * MESSAGE_OVERHEAD
+        return total
+
+    def _fold(self, reserve):
+        """持有锁时调用：最旧的轮次移到待摘要列表，直到加上 reserve 不超预算"""
+        while self.turns and self._tokens() + reserve > self.budget:
+            self._pending.append(self.turns.popleft())
+            self.stats["folded_turns"] += 1
+        if len(self._pending) > MAX_PENDING_TURNS:
+            del self._pending[:len(self._pending) - MAX_PENDING_TURNS]
+        if self._pending and self.summarize and not self._summarizing:
+            self._summarizing = True
+            threading.Thread(target=self._summarize_pending, name="context-summary",
+                             daemon=True).start()
+
+    def _summarize_pending(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._summarizing = False
+                    return
+                epoch, summary, batch = self._epoch, self.summary, list(self._pending)
+            try:
+                new_summary = self.summarize(summary, batch)
+            except Exception as e:
+                print(f"Summary failed: {e}")
+                new_summary = None
+            with self._lock:
+                if epoch != self._epoch:
+                    continue  # 期间被 clear()，结果作废
+                if not new_summary:
+                    self.stats["summary_errors"] += 1
+                    self._summarizing = False  # 下次有轮次移出时再试
+                    return
+                self.summary = self._clip(new_summary.strip())
+                done = {id(t) for t in batch}
+                self._pending = [t for t in self._pending if id(t) not in done]
+                self.stats["summaries"] += 1
+
+    def _clip(self, summary):
+        """摘要超出 summary_budget 时按比例截掉末尾"""
+        tokens = estimate_tokens(summary)
+        if tokens <= self.summary_budget:
+            return summary
+        return summary[:int(len(summary) * self.summary_budget / tokens)]
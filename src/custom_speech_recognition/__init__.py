@@ -4,13 +4,17 @@
 """
 import io
 import collections
-import audioop
 import math
+import queue
+import threading
 import time
+from . import dsp
 from .audio import AudioData
 from .exceptions import WaitTimeoutError
+from .vad import BaseVAD, EnergyVAD, SileroVAD, load_vad
 
-__all__ = ['Microphone', 'AudioFile', 'Recognizer', 'AudioData', 'WaitTimeoutError']
+__all__ = ['Microphone', 'AudioFile', 'RawAudioFile', 'Recognizer', 'AudioData', 'WaitTimeoutError',
+           'BaseVAD', 'EnergyVAD', 'SileroVAD', 'load_vad']
 
 # ====================== AudioSource 骨架 ======================
 class AudioSource:
@@ -75,6 +79,44 @@ class Microphone(AudioSource):
             self.stream = None
             self.audio.terminate()
 
+    def start_stream(self, on_data):
+        """
+        非阻塞回调模式：PortAudio 每交付一块数据就调用 on_data(data, t)，
+        t 为该块第一个样本的墙钟时间（由 PortAudio 的流时钟换算，没有时钟时退回收到时间）。
+        on_data 在音频线程里执行，只应做入队之类的轻量操作。
+        """
+        assert self.stream is None
+        self.audio = self.pyaudio_module.PyAudio()
+        offset = [None]  # 流时钟 → 墙钟 的偏移量
+
+        def _callback(in_data, frame_count, time_info, status):
+            now = time.time() - frame_count / float(self.SAMPLE_RATE)
+            adc = (time_info or {}).get("input_buffer_adc_time") or 0.0
+            if adc and offset[0] is None:
+                offset[0] = now - adc
+            on_data(in_data, offset[0] + adc if adc else now)
+            return None, self.pyaudio_module.paContinue
+
+        try:
+            self.stream = self.audio.open(
+                input_device_index=self.device_index,
+                channels=self.channels,
+                format=self.format,
+                rate=self.SAMPLE_RATE,
+                frames_per_buffer=self.CHUNK,
+                input=True,
+                stream_callback=_callback
+            )
+            self.stream.start_stream()
+        except Exception:
+            self.audio.terminate()
+            self.stream = None
+            raise
+        return self
+
+    def stop_stream(self):
+        self.__exit__()
+
 # ====================== AudioFile（可选） ======================
 class AudioFile(AudioSource):
     def __init__(self, filename_or_fileobject):
@@ -87,11 +129,17 @@ class AudioFile(AudioSource):
         self.CHUNK = 4096
 
     def __enter__(self):
-        import wave, aifc, audioop
+        import wave
+        try:
+            import aifc  # Python 3.13 起已移除，只影响 AIFF
+        except ImportError:
+            aifc = None
         try:
             self.audio_reader = wave.open(self.filename_or_fileobject, 'rb')
             little_endian = True
         except (wave.Error, EOFError):
+            if aifc is None:
+                raise ValueError("仅支持 WAV")
             try:
                 self.audio_reader = aifc.open(self.filename_or_fileobject, 'rb')
                 little_endian = False
@@ -105,8 +153,8 @@ class AudioFile(AudioSource):
         return self
 
     def __exit__(self, *args):
-        if hasattr(self.filename_or_fileobject, 'read'):
-            self.audio_reader.close()
+        # wave/aifc 只关闭自己按路径打开的文件，调用方传入的文件对象仍由调用方关闭
+        self.audio_reader.close()
         self.stream = None
         self.DURATION = None
 
@@ -117,11 +165,60 @@ class AudioFileStream:
     def read(self, size=-1):
         frames = self.reader.readframes(size)
         if not self.little_endian and self.reader.getsampwidth() != 1:
-            frames = audioop.byteswap(frames, self.reader.getsampwidth())
+            frames = dsp.byteswap(frames, self.reader.getsampwidth())
         if self.reader.getnchannels() != 1:
-            frames = audioop.tomono(frames, self.reader.getsampwidth(), 1, 1)
+            frames = dsp.tomono(frames, self.reader.getsampwidth(), self.reader.getnchannels())
         return frames
 
+class RawAudioFile(AudioSource):
+    """
+    无文件头的 PCM 数据（little-endian 有符号整数），可以是文件名或 stdin 之类的流。
+    多声道在读取时混缩为单声道，对外表现与 AudioFile 相同。
+    """
+    def __init__(self, filename_or_fileobject, sample_rate, sample_width=2, channels=1):
+        self.filename_or_fileobject = filename_or_fileobject
+        self.SAMPLE_RATE = sample_rate
+        self.SAMPLE_WIDTH = sample_width
+        self.input_channels = channels
+        self.CHUNK = 4096
+        self.stream = None
+        self._fp = None
+
+    def __enter__(self):
+        if hasattr(self.filename_or_fileobject, 'read'):
+            self._fp = self.filename_or_fileobject
+        else:
+            self._fp = open(self.filename_or_fileobject, 'rb')
+        self.stream = RawAudioStream(self._fp, self.SAMPLE_WIDTH, self.input_channels)
+        return self
+
+    def __exit__(self, *args):
+        if not hasattr(self.filename_or_fileobject, 'read'):
+            self._fp.close()
+        self.stream = None
+
+class RawAudioStream:
+    def __init__(self, fp, sample_width, channels):
+        self.fp = fp
+        self.sample_width = sample_width
+        self.channels = channels
+    def read(self, size=-1):
+        frame = self.sample_width * self.channels
+        if size < 0:
+            data = self.fp.read()
+        else:
+            # 管道一次可能读不满，读到够数或 EOF 为止
+            want, parts = size * frame, []
+            while want > 0:
+                part = self.fp.read(want)
+                if not part:
+                    break
+                parts.append(part)
+                want -= len(part)
+            data = b"".join(parts)
+        data = data[:len(data) - len(data) % frame]
+        return dsp.tomono(data, self.sample_width, self.channels)
+
 # ====================== Recognizer（仅录音） ======================
 class Recognizer:
     def __init__(self):
@@ -133,6 +230,28 @@ class Recognizer:
         self.non_speaking_duration = 0.5
         self.phrase_threshold = 0.3
         self.operation_timeout = None
+        # 设置 VAD 后按帧级语音概率判断是否在说话，否则退回单一能量阈值
+        self.vad = None
+        self._vad_pending = b""
+        self._vad_speaking = False
+
+    def _to_float(self, buf, source):
+        return dsp.downmix(dsp.to_float32(buf, source.SAMPLE_WIDTH), getattr(source, "channels", 1))
+
+    def _is_speech(self, buf, source):
+        if self.vad is None:
+            return dsp.rms(buf, source.SAMPLE_WIDTH) > self.energy_threshold
+        # 读取块可能比一帧还短（扬声器回环每次只读几个样本），攒够整帧再判断，期间沿用上次结果
+        self._vad_pending += buf
+        frame_bytes = (self.vad.frame_size(source.SAMPLE_RATE) * source.SAMPLE_WIDTH
+                       * getattr(source, "channels", 1))
+        usable = len(self._vad_pending) - len(self._vad_pending) % frame_bytes
+        if usable:
+            probs = self.vad.frame_probs(self._to_float(self._vad_pending[:usable], source),
+                                         source.SAMPLE_RATE)
+            self._vad_pending = self._vad_pending[usable:]
+            self._vad_speaking = bool(probs.mean() > self.vad.threshold)
+        return self._vad_speaking
 
     def adjust_for_ambient_noise(self, source, duration=1):
         assert isinstance(source, AudioSource) and source.stream is not None
@@ -141,7 +260,9 @@ class Recognizer:
         while elapsed < duration:
             elapsed += secs
             buf = source.stream.read(source.CHUNK)
-            energy = audioop.rms(buf, source.SAMPLE_WIDTH)
+            if self.vad is not None:
+                self.vad.update_noise(self._to_float(buf, source), source.SAMPLE_RATE)
+            energy = dsp.rms(buf, source.SAMPLE_WIDTH)
             damp = self.dynamic_energy_adjustment_damping ** secs
             target = energy * self.dynamic_energy_ratio
             self.energy_threshold = self.energy_threshold * damp + target * (1 - damp)
@@ -164,10 +285,10 @@ class Recognizer:
             frames.append(buf)
             if len(frames) > non_speaking_buffer_count:
                 frames.popleft()
-            energy = audioop.rms(buf, source.SAMPLE_WIDTH)
-            if energy > self.energy_threshold:
+            if self._is_speech(buf, source):
                 break
-            if self.dynamic_energy_threshold:
+            if self.dynamic_energy_threshold and self.vad is None:
+                energy = dsp.rms(buf, source.SAMPLE_WIDTH)
                 damp = self.dynamic_energy_adjustment_damping ** secs
                 target = energy * self.dynamic_energy_ratio
                 self.energy_threshold = self.energy_threshold * damp + target * (1 - damp)
@@ -182,8 +303,7 @@ class Recognizer:
             if len(buf) == 0: break
             frames.append(buf)
             phrase_count += 1
-            energy = audioop.rms(buf, source.SAMPLE_WIDTH)
-            if energy > self.energy_threshold:
+            if self._is_speech(buf, source):
                 pause_count = 0
             else:
                 pause_count += 1
@@ -197,9 +317,10 @@ class Recognizer:
         for _ in range(pause_count - non_speaking_buffer_count):
             frames.pop()
         frame_data = b''.join(frames)
-        return AudioData(frame_data, source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+        return AudioData(frame_data, source.SAMPLE_RATE, source.SAMPLE_WIDTH,
+                         getattr(source, "channels", 1))
 
-    def listen_in_background(self, source, callback, phrase_time_limit=None):
+    def listen_in_background(self, source, callback, phrase_time_limit=None, thread_name=None):
         assert isinstance(source, AudioSource)
         running = [True]
         def threaded_listen():
@@ -212,11 +333,93 @@ class Recognizer:
                     else:
                         if running[0]:
                             callback(self, audio)
-        import threading
-        listener_thread = threading.Thread(target=threaded_listen, daemon=True)
+        listener_thread = threading.Thread(target=threaded_listen, daemon=True,
+                                           name=thread_name or f"listen-{id(source):x}")
         listener_thread.start()
         def stopper(wait_for_stop=True):
             running[0] = False
             if wait_for_stop:
                 listener_thread.join()
-        return stopper
\ No newline at end of file
+        return stopper
+
+    def stream_in_background(self, source, callback, hop_duration=0.2, realtime=True, on_end=None,
+                             thread_name=None, speed=1.0):
+        """
+        低延迟的流式采集：不等停顿，每 hop_duration 秒输出一块定长音频，
+        callback(recognizer, AudioData, t) 中 t 为这一块第一个样本的采集时间（epoch 秒）。
+        Microphone 走 PortAudio 非阻塞回调；AudioFile 由后台线程读取，
+        realtime=True 时按 speed 倍速回放（和真实采集一样，每块等最后一个样本“录完”才送出），
+        False 时尽快读完，便于无声卡环境测试。文件的 t 为媒体时间（打开时刻 + 偏移），与 speed 无关。
+        on_end() 在最后一块回调之后调用（文件读完或已停止）。
+        thread_name 为分发线程的名字（读文件的线程加 -reader 后缀），便于按线程做性能分析。
+        """
+        assert isinstance(source, AudioSource)
+        running = [True]
+        chunks = queue.SimpleQueue()  # (data, t)；None 表示输入结束
+
+        def dispatch():
+            pending, t0, emitted = bytearray(), None, 0
+            while True:
+                item = chunks.get()
+                if item is None:
+                    break
+                data, t = item
+                if t0 is None:  # AudioFile 打开后才知道格式，收到第一块再计算
+                    t0 = t
+                    rate = source.SAMPLE_RATE
+                    channels = getattr(source, "channels", 1)
+                    hop_frames = max(1, int(rate * hop_duration))
+                    hop_bytes = hop_frames * source.SAMPLE_WIDTH * channels
+                pending += data
+                # 时间戳按样本数从第一块推算，不受线程调度抖动影响
+                while len(pending) >= hop_bytes and running[0]:
+                    hop = bytes(pending[:hop_bytes])
+                    del pending[:hop_bytes]
+                    ts = t0 + emitted / float(rate)
+                    emitted += hop_frames
+                    callback(self, AudioData(hop, rate, source.SAMPLE_WIDTH, channels), ts)
+            if pending and running[0]:  # 文件末尾不足一块的尾巴
+                callback(self, AudioData(bytes(pending), rate, source.SAMPLE_WIDTH, channels),
+                         t0 + emitted / float(rate))
+            if on_end:
+                on_end()
+
+        def read_file():
+            try:
+                with source as s:
+                    hop_frames = max(1, int(s.SAMPLE_RATE * hop_duration))
+                    start, sent = time.time(), 0
+                    while running[0]:
+                        data = s.stream.read(hop_frames)
+                        if not data:
+                            break
+                        t = start + sent / float(s.SAMPLE_RATE)
+                        sent += len(data) // s.SAMPLE_WIDTH
+                        if realtime:
+                            delay = start + sent / float(s.SAMPLE_RATE) / speed - time.time()
+                            if delay > 0:
+                                time.sleep(delay)
+                        chunks.put((data, t))
+            finally:
+                chunks.put(None)  # 打开失败也要让分发线程退出
+
+        thread_name = thread_name or f"capture-{id(source):x}"
+        dispatcher = threading.Thread(target=dispatch, daemon=True, name=thread_name)
+        dispatcher.start()
+        if isinstance(source, Microphone):
+            source.start_stream(lambda data, t: chunks.put((data, t)))
+            reader = None
+        else:
+            reader = threading.Thread(target=read_file, daemon=True, name=f"{thread_name}-reader")
+            reader.start()
+
+        def stopper(wait_for_stop=True):
+            running[0] = False
+            if reader is None:
+                source.stop_stream()
+                chunks.put(None)
+            elif wait_for_stop:
+                reader.join()
+            if wait_for_stop:
+                dispatcher.join()
+        return stopper
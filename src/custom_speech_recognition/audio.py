@@ -1,24 +1,30 @@
 import io
 import wave
-import audioop
+from . import dsp
 
 class AudioData:
     """
     最小化 AudioData，只保留 get_raw_data / get_wav_data，
     供 AudioTranscriber.py 生成 wav 文件。
+    多声道数据在取出时统一混缩为单声道。
     """
-    def __init__(self, frame_data, sample_rate, sample_width):
+    def __init__(self, frame_data, sample_rate, sample_width, channels=1):
         self.frame_data = frame_data
         self.sample_rate = sample_rate
         self.sample_width = sample_width
+        self.channels = channels
 
     def get_raw_data(self, convert_rate=None, convert_width=None):
         data = self.frame_data
-        if convert_rate is not None and convert_rate != self.sample_rate:
-            data, _ = audioop.ratecv(data, self.sample_width, 1,
-                                       self.sample_rate, convert_rate, None)
+        resample = convert_rate is not None and convert_rate != self.sample_rate
+        if self.channels != 1 or resample:
+            # 混缩与重采样在浮点域一次完成
+            x = dsp.downmix(dsp.to_float32(data, self.sample_width), self.channels)
+            if resample:
+                x = dsp.resample(x, self.sample_rate, convert_rate)
+            data = dsp.from_float32(x, self.sample_width)
         if convert_width is not None and convert_width != self.sample_width:
-            data = audioop.lin2lin(data, self.sample_width, convert_width)
+            data = dsp.convert_width(data, self.sample_width, convert_width)
         return data
 
     def get_wav_data(self, convert_rate=None, convert_width=None):
@@ -31,4 +37,4 @@ class AudioData:
                 wf.setsampwidth(width)
                 wf.setframerate(rate)
                 wf.writeframes(raw)
-            return buf.getvalue()
\ No newline at end of file
+            return buf.getvalue()
@@ -0,0 +1,160 @@
+"""
+向量化的 NumPy 音频处理，取代 audioop（Python 3.13 已移除）。
+所有函数都按整块数据一次算完，不再逐帧调用 C 扩展。
+"""
+from math import gcd
+
+import numpy as np
+
+# 每个相位的半边零点数与 Kaiser 窗参数，足够 ASR 使用
+_HALF_ZEROS = 16
+_KAISER_BETA = 8.0
+_BLOCK = 4096  # 重采样时每次向量化计算的输出点数，限制临时内存
+
+
+def to_int(buf, width):
+    """PCM bytes → 有符号整数数组（8 位按 audioop 约定视为有符号）"""
+    if width == 1:
+        return np.frombuffer(buf, dtype=np.int8)
+    if width == 2:
+        return np.frombuffer(buf, dtype="<i2")
+    if width == 3:
+        b = np.frombuffer(buf, dtype=np.uint8)[:len(buf) - len(buf) % 3].reshape(-1, 3)
+        x = (b[:, 0].astype(np.int32) | (b[:, 1].astype(np.int32) << 8)
+             | (b[:, 2].astype(np.int32) << 16))
+        return np.where(x >= 1 << 23, x - (1 << 24), x)
+    if width == 4:
+        return np.frombuffer(buf, dtype="<i4")
+    raise ValueError(f"不支持的采样宽度: {width}")
+
+
+def from_int(x, width):
+    """有符号整数数组 → PCM bytes"""
+    if width == 1:
+        return x.astype(np.int8).tobytes()
+    if width == 2:
+        return x.astype("<i2").tobytes()
+    if width == 3:
+        x = x.astype("<i4")
+        return x.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    if width == 4:
+        return x.astype("<i4").tobytes()
+    raise ValueError(f"不支持的采样宽度: {width}")
+
+
+def to_float32(buf, width=2):
+    """PCM bytes → [-1, 1] 的 float32 数组"""
+    x = to_int(buf, width).astype(np.float32)
+    x *= 1.0 / (1 << (8 * width - 1))
+    return x
+
+
+def from_float32(x, width=2):
+    """[-1, 1] 的浮点数组 → PCM bytes，超出范围的截断"""
+    full = 1 << (8 * width - 1)
+    return from_int(np.clip(np.round(x * full), -full, full - 1), width)
+
+
+def rms(buf, width):
+    """与 audioop.rms 相同：整数样本的均方根"""
+    x = to_int(buf, width)
+    if len(x) == 0:
+        return 0
+    return int(np.sqrt(np.mean(np.square(x, dtype=np.float64))))
+
+
+def byteswap(buf, width):
+    if width == 1:
+        return buf
+    b = np.frombuffer(buf, dtype=np.uint8)[:len(buf) - len(buf) % width]
+    return b.reshape(-1, width)[:, ::-1].tobytes()
+
+
+def downmix(x, channels):
+    """交织的多声道数组 → 单声道（各声道取平均）"""
+    if channels == 1:
+        return x
+    x = x[:len(x) - len(x) % channels].reshape(-1, channels)
+    return x.mean(axis=1, dtype=np.float32)
+
+
+def tomono(buf, width, channels):
+    """交织的多声道 PCM bytes → 单声道 PCM bytes"""
+    if channels == 1:
+        return buf
+    return from_int(np.round(downmix(to_int(buf, width), channels)), width)
+
+
+def convert_width(buf, width, new_width):
+    """与 audioop.lin2lin 相同：按位移在不同采样宽度间转换"""
+    if width == new_width:
+        return buf
+    x = to_int(buf, width).astype(np.int64) << (8 * (4 - width))
+    return from_int(x >> (8 * (4 - new_width)), new_width)
+
+
+class Resampler:
+    """
+    有状态的多相 FIR 重采样器（上采样 L、下采样 M）。
+    连续调用 process 时保留历史样本，块与块之间没有边界失真，适合流式采集。
+    """
+    def __init__(self, from_rate, to_rate):
+        g = gcd(int(from_rate), int(to_rate))
+        self.L, self.M = int(to_rate) // g, int(from_rate) // g
+        r = max(self.L, self.M)
+        n = 2 * _HALF_ZEROS * r + 1
+        center = (n - 1) / 2.0
+        t = np.arange(n) - center
+        cutoff = 0.5 / r * 0.95   # 相对上采样率的截止频率，留一点过渡带
+        h = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(n, _KAISER_BETA)
+        h *= self.L / h.sum()     # 补偿插零带来的幅度损失
+        self.K = -(-n // self.L)  # 每个相位的抽头数
+        h = np.concatenate([h, np.zeros(self.K * self.L - n)])
+        # taps[p, k] = h[p + k*L]
+        self._taps = h.reshape(self.K, self.L).T.astype(np.float32)
+        self._center = int(center)
+        self.reset()
+
+    def reset(self):
+        self._hist = np.zeros(self.K - 1, dtype=np.float32)
+        # 下一个输出在上采样域中的位置（相对于 _hist 起点），从滤波器中心开始以抵消群延迟
+        self._t = (self.K - 1) * self.L + self._center
+
+    def process(self, x):
+        x = np.asarray(x, dtype=np.float32)
+        if self.L == self.M:
+            return x
+        buf = np.concatenate([self._hist, x])
+        t_end = len(buf) * self.L
+        ts = np.arange(self._t, t_end, self.M, dtype=np.int64)
+        out = np.empty(len(ts), dtype=np.float32)
+        k = np.arange(self.K)
+        for b in range(0, len(ts), _BLOCK):
+            tb = ts[b:b + _BLOCK]
+            idx = (tb // self.L)[:, None] - k[None, :]
+            out[b:b + _BLOCK] = np.einsum("nk,nk->n", self._taps[tb % self.L], buf[idx])
+        # 保留最后 K-1 个样本作为下一块的历史
+        self._t = (ts[-1] + self.M if len(ts) else self._t) - (len(buf) - (self.K - 1)) * self.L
+        self._hist = buf[len(buf) - (self.K - 1):]
+        return out
+
+    def flush(self):
+        """输入结束时补零，把滤波器中还没输出的尾部样本取出来"""
+        return self.process(np.zeros(self._center // self.L + 1, dtype=np.float32))
+
+
+def resample(x, from_rate, to_rate):
+    """一次性重采样整段浮点数组，输出长度为 round(len(x) * to / from)"""
+    if from_rate == to_rate:
+        return np.asarray(x, dtype=np.float32)
+    r = Resampler(from_rate, to_rate)
+    n_out = int(round(len(x) * r.L / r.M))
+    out = np.concatenate([r.process(x), r.flush()])
+    if len(out) < n_out:
+        out = np.concatenate([out, np.zeros(n_out - len(out), dtype=np.float32)])
+    return out[:n_out]
+
+
+def ratecv(buf, width, from_rate, to_rate):
+    """PCM bytes 的采样率转换，取代 audioop.ratecv"""
+    return from_float32(resample(to_float32(buf, width), from_rate, to_rate), width)
@@ -0,0 +1,171 @@
+"""
+帧级语音活动检测（VAD）。
+按 10–30 ms 一帧给出语音概率，用来决定短语边界、过滤掉没有人声的片段。
+内置向量化的能量 + 频谱检测器，可选 Silero 神经网络 VAD。
+"""
+import os
+import sys
+
+import numpy as np
+
+from . import dsp
+
+FRAME_MS = 20            # 每帧时长
+SPEECH_THRESHOLD = 0.5   # 帧语音概率阈值
+MIN_SPEECH_MS = 120      # 一段音频至少含这么多语音帧才算“有人说话”
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class BaseVAD:
+    """VAD 统一接口：输入 float32 单声道音频，输出每帧语音概率"""
+    frame_ms = FRAME_MS
+    threshold = SPEECH_THRESHOLD
+
+    def frame_size(self, sample_rate):
+        return int(sample_rate * self.frame_ms / 1000)
+
+    def frame_probs(self, pcm, sample_rate):
+        raise NotImplementedError
+
+    def update_noise(self, pcm, sample_rate):
+        """用已知的环境噪声校准（可选）"""
+
+    def speech_frames(self, pcm, sample_rate):
+        return self.frame_probs(pcm, sample_rate) > self.threshold
+
+    def is_speech(self, pcm, sample_rate, min_speech_ms=MIN_SPEECH_MS):
+        n = int(np.count_nonzero(self.speech_frames(pcm, sample_rate)))
+        return n * self.frame_ms >= min_speech_ms
+
+    def speech_segments(self, pcm, sample_rate, min_silence_ms=300, pad_ms=100):
+        """
+        语音段 [(start, end)]，单位为样本。
+        短于 min_silence_ms 的静音不切开，每段两端各留 pad_ms 余量。
+        """
+        speech = self.speech_frames(pcm, sample_rate)
+        if not speech.any():
+            return []
+        fs = self.frame_size(sample_rate)
+        # 找出语音帧的起止位置（上升沿/下降沿）
+        edges = np.diff(np.concatenate([[0], speech.astype(np.int8), [0]]))
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        gap = max(1, min_silence_ms // self.frame_ms)
+        pad = pad_ms // self.frame_ms
+        segments = []
+        for s, e in zip(starts, ends):
+            if segments and s - segments[-1][1] < gap:
+                segments[-1][1] = e
+            else:
+                segments.append([s, e])
+        n = len(pcm)
+        return [(int(max(0, (s - pad) * fs)), int(min(n, (e + pad) * fs))) for s, e in segments]
+
+
+class EnergyVAD(BaseVAD):
+    """
+    向量化的能量/频谱检测器：
+    - 相对自适应噪声底的信噪比
+    - 80–4000 Hz 语音频带能量占比（排除低频隆隆声和高频嘶声）
+    - 频谱平坦度（键盘声、风扇等宽带噪声接近平坦，人声有明显共振峰）
+    三者的 sigmoid 乘积作为语音概率。
+    """
+    def __init__(self, snr_db=8.0, frame_ms=FRAME_MS, threshold=SPEECH_THRESHOLD,
+                 noise_adapt=0.9):
+        self.snr_db = snr_db
+        self.frame_ms = frame_ms
+        self.threshold = threshold
+        self.noise_adapt = noise_adapt
+        self.noise_db = None
+
+    def _frames(self, pcm, sample_rate):
+        fs = self.frame_size(sample_rate)
+        n = len(pcm) // fs
+        return pcm[:n * fs].reshape(n, fs)
+
+    def _energy_db(self, frames):
+        return 10.0 * np.log10(np.mean(np.square(frames, dtype=np.float32), axis=1) + 1e-10)
+
+    def update_noise(self, pcm, sample_rate):
+        frames = self._frames(pcm, sample_rate)
+        if len(frames):
+            self._track_noise(self._energy_db(frames), force=True)
+
+    def _track_noise(self, energy, force=False):
+        # 噪声底取低分位数，慢速跟踪，避免被持续说话抬高
+        floor = float(np.percentile(energy, 10))
+        if self.noise_db is None or force:
+            self.noise_db = floor if self.noise_db is None else min(self.noise_db, floor)
+        else:
+            a = self.noise_adapt
+            self.noise_db = a * self.noise_db + (1 - a) * min(floor, self.noise_db + 3.0)
+        self.noise_db = max(self.noise_db, -80.0)
+
+    def frame_probs(self, pcm, sample_rate):
+        frames = self._frames(pcm, sample_rate)
+        if not len(frames):
+            return np.zeros(0, dtype=np.float32)
+        energy = self._energy_db(frames)
+        self._track_noise(energy)
+
+        spec = np.square(np.abs(np.fft.rfft(frames * np.hanning(frames.shape[1]), axis=1)))
+        freqs = np.fft.rfftfreq(frames.shape[1], 1.0 / sample_rate)
+        band = (freqs >= 80) & (freqs <= 4000)
+        band_ratio = spec[:, band].sum(axis=1) / (spec.sum(axis=1) + 1e-10)
+        band_spec = spec[:, band] + 1e-10
+        flatness = np.exp(np.mean(np.log(band_spec), axis=1)) / np.mean(band_spec, axis=1)
+
+        p = (_sigmoid((energy - self.noise_db - self.snr_db) / 2.0)
+             * _sigmoid((band_ratio - 0.6) * 10.0)
+             * _sigmoid((0.45 - flatness) * 15.0))
+        return p.astype(np.float32)
+
+
+class SileroVAD(BaseVAD):
+    """
+    可选的 Silero 神经网络 VAD（需要 torch 和 models/silero_vad.jit）。
+    模型按 16 kHz、每 512 个样本（32 ms）一帧打分。
+    """
+    frame_ms = 32
+
+    def __init__(self, model_path=None, threshold=SPEECH_THRESHOLD):
+        try:
+            import torch
+        except ImportError:
+            raise ImportError("SileroVAD 需要安装 torch")
+        if model_path is None:
+            base = getattr(sys, '_MEIPASS', os.path.abspath(os.path.dirname(os.path.dirname(__file__))))
+            model_path = os.path.join(base, "models", "silero_vad.jit")
+        self.torch = torch
+        self.model = torch.jit.load(model_path, map_location="cpu")
+        self.model.eval()
+        self.threshold = threshold
+
+    def frame_probs(self, pcm, sample_rate):
+        if sample_rate != 16000:
+            pcm = dsp.resample(pcm, sample_rate, 16000)
+        n = len(pcm) // 512
+        if not n:
+            return np.zeros(0, dtype=np.float32)
+        frames = self.torch.from_numpy(np.ascontiguousarray(pcm[:n * 512])).reshape(n, 512)
+        with self.torch.no_grad():
+            probs = [float(self.model(f.unsqueeze(0), 16000)) for f in frames]
+        return np.asarray(probs, dtype=np.float32)
+
+    def frame_size(self, sample_rate):
+        return int(sample_rate * 512 / 16000)
+
+
+def load_vad(name="energy", **kwargs):
+    """工厂方法：energy（内置）/ silero（可选）/ none"""
+    name = (name or "none").lower()
+    if name == "energy":
+        return EnergyVAD(**kwargs)
+    elif name == "silero":
+        return SileroVAD(**kwargs)
+    elif name == "none":
+        return None
+    else:
+        raise ValueError(f"Unknown VAD: {name}")
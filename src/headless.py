@@ -0,0 +1,181 @@
+# headless.py
+"""
+无界面入口：从 stdin 或文件读取 PCM/WAV，走 AudioTranscriber 的 ASR → 翻译流水线，
+每确认一段文本就向 stdout 输出一行 JSON。不依赖声卡和 UI，可在 Linux 服务器上运行。
+
+    ffmpeg -i talk.mp3 -f s16le -ac 1 -ar 16000 - | python headless.py whisper small --format pcm
+    python headless.py whisper small --input talk.wav --mt-backend helsinki --mt-model en-zh --realtime
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import custom_speech_recognition as sr
+from custom_speech_recognition import dsp
+from audioFormat import SAMPLE_RATE
+from audioTranscriber import AudioTranscriber
+from captureGate import SpeechGate, HOP_DURATION
+from startup import load_models
+import metrics
+import precision as prec
+import profiler
+
+
+class StreamFormat:
+    """送进转写器的音频格式：采集线程已重采样为 16 kHz 单声道 int16"""
+    SAMPLE_RATE = SAMPLE_RATE
+    SAMPLE_WIDTH = 2
+    channels = 1
+
+
+def open_source(path, fmt, rate, width, channels):
+    """
+    按格式创建输入音源；auto 时根据 RIFF 头判断是 WAV 还是裸 PCM。
+    文件按路径交给音源，读取时打开、读完关闭。
+    """
+    if path == "-":
+        source = sys.stdin.buffer
+        if fmt == "auto":
+            fmt = "wav" if source.peek(4)[:4] == b"RIFF" else "pcm"
+    else:
+        source = path
+        if fmt == "auto":
+            with open(path, "rb") as fp:
+                fmt = "wav" if fp.read(4) == b"RIFF" else "pcm"
+    if fmt == "wav":
+        return sr.AudioFile(source)
+    return sr.RawAudioFile(source, rate, width, channels)
+
+
+class HeadlessRunner:
+    """
+    把一个音源接到 AudioTranscriber，分段结果写成 JSON lines。
+    时间戳相对输入开头（秒）；latency 为各阶段耗时：
+    queue（音频块入队到开始识别）、asr、mt、total（入队到输出）。
+    label 为音源在转写器内部和指标里的名称，默认同 source_name；
+    同一进程里有多个 runner 时（服务端的会话）各自取不同的 label，指标互不覆盖。
+    """
+    def __init__(self, asr_model, translator=None, source_name="input",
+                 vad_backend="energy", out=sys.stdout, asr_scheduler=None, label=None):
+        self.source_name = source_name
+        self.label = label or source_name
+        self.out = out
+        self.vad = sr.load_vad(vad_backend)
+        self.gate = SpeechGate(self.vad, self.label)
+        self.transcriber = AudioTranscriber(
+            None, None, asr_model, translator,
+            extra_sources={self.label: StreamFormat},
+            live_translation=False,
+            asr_scheduler=asr_scheduler,
+            name=label,
+        )
+        self.transcriber.add_segment_listener(self._write_segment)
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._t0 = None
+        self.stats = {"audio_seconds": 0.0, "segments": 0, "wall_seconds": 0.0}
+
+    def _on_audio(self, recognizer, audio, t):
+        """采集线程回调"""
+        self.feed(audio, t)
+
+    def feed(self, audio, t):
+        """一块 AudioData（t 为首个样本的 epoch 时间）重采样到 16k、VAD 过滤后送进转写器"""
+        if self._t0 is None:
+            self._t0 = t
+        x = self.gate.process(audio)
+        frame = audio.sample_width * audio.channels
+        self.stats["audio_seconds"] += len(audio.frame_data) / float(frame * audio.sample_rate)
+        if x is None:
+            return
+        ts = datetime.fromtimestamp(t, timezone.utc)
+        self.transcriber.feed(self.label, dsp.from_float32(x), ts)
+
+    def _write_segment(self, segment):
+        record = {
+            "source": self.source_name,
+            "phrase": segment["phrase"],
+            "start": round(segment["start"] - self._t0, 3),
+            "end": round(segment["end"] - self._t0, 3),
+            "text": segment["text"],
+            "translation": segment["translation"],
+            "latency": {k: round(v, 4) for k, v in segment["latency"].items()},
+        }
+        with self._lock:
+            self.out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.out.flush()
+        self.stats["segments"] += 1
+
+    def run(self, source, realtime=False, hop_duration=HOP_DURATION):
+        """处理完整个输入后返回统计信息；RTF = 处理耗时 / 音频时长"""
+        start = time.monotonic()
+        self.transcriber.start()
+        stopper = sr.Recognizer().stream_in_background(
+            source, self._on_audio, hop_duration=hop_duration,
+            realtime=realtime, on_end=self._done.set)
+        try:
+            self._done.wait()
+        except KeyboardInterrupt:
+            stopper(wait_for_stop=False)
+        self.transcriber.flush()
+        self.stats["wall_seconds"] = time.monotonic() - start
+        audio = self.stats["audio_seconds"]
+        self.stats["rtf"] = self.stats["wall_seconds"] / audio if audio else None
+        self.stats["asr"] = self.transcriber.get_stats()[self.label]
+        return self.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="无界面转写：PCM/WAV 输入 → JSON lines 输出")
+    parser.add_argument("series", help="ASR 系列 (whisper, funasr)")
+    parser.add_argument("model", help="具体模型 (如 small, paraformer, ...)")
+    parser.add_argument("--mt-backend", choices=["helsinki", "m2m100"],
+                        help="翻译后端；不指定则只输出原文")
+    parser.add_argument("--mt-model", help="语言对 (如 en-zh)")
+    parser.add_argument("--input", default="-", help="输入文件，- 表示 stdin（默认）")
+    parser.add_argument("--format", choices=["auto", "wav", "pcm"], default="auto",
+                        help="输入格式；pcm 为无文件头的 little-endian 整数 PCM")
+    parser.add_argument("--rate", type=int, default=16000, help="pcm 输入的采样率")
+    parser.add_argument("--width", type=int, default=2, help="pcm 输入的采样字节数")
+    parser.add_argument("--channels", type=int, default=1, help="pcm 输入的声道数")
+    parser.add_argument("--realtime", action="store_true",
+                        help="按真实速度回放输入；默认尽快处理")
+    parser.add_argument("--hop", type=float, default=HOP_DURATION,
+                        help="每块音频的时长（秒），默认 0.2")
+    parser.add_argument("--vad", default="energy", choices=["energy", "silero", "none"],
+                        help="过滤静音的 VAD，默认 energy")
+    parser.add_argument("--source", default="input", help="输出里的音源名称")
+    parser.add_argument("--device", default=None, help="推理设备 (cpu / cuda)")
+    parser.add_argument("--no-warmup", action="store_true", help="跳过模型预热")
+    prec.add_arguments(parser)
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="在本地该端口提供 Prometheus 格式的 /metrics")
+    parser.add_argument("--metrics-log", type=float, default=None,
+                        help="每隔多少秒向 stderr 打印一行指标摘要")
+    profiler.add_arguments(parser)
+    args = parser.parse_args()
+    profiler.configure_from_args(args)
+    metrics.serve(args.metrics_port)
+    if args.metrics_log:
+        metrics.MetricsLogger(args.metrics_log, out=lambda line: print(line, file=sys.stderr)).start()
+
+    if args.mt_backend and not args.mt_model:
+        parser.error("--mt-backend 需要同时指定 --mt-model")
+    asr_model, translator, timer = load_models(
+        args.series, args.model, args.mt_backend, args.mt_model, args.device,
+        warmup=not args.no_warmup, precision=args.precision)
+    print(timer.report(), file=sys.stderr)
+
+    runner = HeadlessRunner(asr_model, translator, source_name=args.source,
+                            vad_backend=args.vad)
+    source = open_source(args.input, args.format, args.rate, args.width, args.channels)
+    stats = runner.run(source, realtime=args.realtime, hop_duration=args.hop)
+    # 统计信息写到 stderr，不影响 stdout 上的 JSON lines
+    print(json.dumps(stats, ensure_ascii=False), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# loadGenerator.py
+"""
+asrServer 的压测客户端：同时开 N 个会话，各自按 1× / N× 实时速度回放 WAV，
+统计每段文本从“说完”到客户端收到的延迟，得到并发会话数与延迟的关系。
+
+    python loadGenerator.py --url http://127.0.0.1:8765 --wav ../fixtures/meeting_en.wav --sessions 1,2,4,8
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+from benchmark import summarize, _git_commit
+from replaySource import load_fixture
+from audioFormat import SAMPLE_RATE as TARGET_SAMPLE_RATE
+from captureGate import HOP_DURATION
+from custom_speech_recognition import dsp
+
+REQUEST_TIMEOUT = 30.0
+
+
+class ClientSession:
+    """一个模拟客户端：创建会话、读取事件流、按节奏推送音频"""
+    def __init__(self, base_url, pcm, speed=1.0, hop=HOP_DURATION, name="input"):
+        self.base_url = base_url.rstrip("/")
+        self.pcm = pcm
+        self.speed = speed
+        self.hop = hop
+        self.name = name
+        self.http = requests.Session()   # 音频块走同一个 keep-alive 连接
+        self.latencies = []
+        self.segments = []
+        self.stats = None
+        self.error = None
+        self._start_wall = None
+        self._events_done = threading.Event()
+
+    def _read_events(self, session_id):
+        try:
+            with requests.get(f"{self.base_url}/sessions/{session_id}/events",
+                              stream=True, timeout=(REQUEST_TIMEOUT, None)) as resp:
+                for line in resp.iter_lines():
+                    if not line:
+                        continue
+                    segment = json.loads(line)
+                    # end 是相对首个样本的媒体时间，换算成这段话被“说完”的时刻
+                    spoken = self._start_wall + segment["end"] / self.speed
+                    self.latencies.append(time.time() - spoken)
+                    self.segments.append(segment)
+        except (requests.RequestException, ValueError) as e:
+            self.error = self.error or f"events: {e}"
+        finally:
+            self._events_done.set()
+
+    def run(self):
+        try:
+            resp = self.http.post(f"{self.base_url}/sessions", timeout=REQUEST_TIMEOUT,
+                                  json={"rate": TARGET_SAMPLE_RATE, "width": 2, "channels": 1,
+                                        "source": self.name})
+            resp.raise_for_status()
+            session_id = resp.json()["id"]
+            self._start_wall = time.time()
+            threading.Thread(target=self._read_events, args=(session_id,),
+                             name=f"load-events-{session_id}", daemon=True).start()
+
+            data = dsp.from_float32(self.pcm)
+            step = int(self.hop * TARGET_SAMPLE_RATE)
+            start = time.monotonic()
+            for i, offset in enumerate(range(0, len(self.pcm), step)):
+                # 按媒体时间推进；时间戳同样用媒体时间，服务端的短语切分与 1× 时一致
+                media = offset / float(TARGET_SAMPLE_RATE)
+                delay = start + media / self.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                self.http.post(f"{self.base_url}/sessions/{session_id}/audio",
+                               data=data[offset * 2:(offset + step) * 2],
+                               headers={"X-Capture-Time": repr(self._start_wall + media)},
+                               timeout=REQUEST_TIMEOUT).raise_for_status()
+            resp = self.http.post(f"{self.base_url}/sessions/{session_id}/end",
+                                  timeout=REQUEST_TIMEOUT * 4)
+            resp.raise_for_status()
+            self.stats = resp.json()
+            self._events_done.wait(REQUEST_TIMEOUT)
+        except requests.RequestException as e:
+            self.error = str(e)
+        finally:
+            self.http.close()
+
+
+def run_level(base_url, pcms, sessions, speed=1.0, hop=HOP_DURATION):
+    """同时运行 sessions 个客户端（轮流使用各个录音），返回这一并发级别的汇总"""
+    clients = [ClientSession(base_url, pcms[i % len(pcms)], speed, hop, name=f"client{i}")
+               for i in range(sessions)]
+    threads = [threading.Thread(target=c.run, name=f"load-{i}", daemon=True)
+               for i, c in enumerate(clients)]
+    start = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.monotonic() - start
+    audio = sum(len(c.pcm) for c in clients) / float(TARGET_SAMPLE_RATE)
+    return {
+        "sessions": sessions,
+        "speed": speed,
+        "wall_seconds": round(wall, 3),
+        "audio_seconds": round(audio, 3),
+        # 所有会话的音频总时长 / 墙钟时间：服务端实际承担的实时倍数
+        "throughput_x_realtime": round(audio / wall, 3) if wall else None,
+        "segments": sum(len(c.segments) for c in clients),
+        "latency": summarize([x for c in clients for x in c.latencies]),
+        "per_session_p95": [summarize(c.latencies).get("p95") for c in clients],
+        "errors": [c.error for c in clients if c.error],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多会话转写服务压测：并发会话数 vs 延迟")
+    parser.add_argument("--url", default="http://127.0.0.1:8765", help="asrServer 地址")
+    parser.add_argument("--wav", action="append", required=True,
+                        help="回放的录音文件，可重复；会话轮流使用")
+    parser.add_argument("--sessions", default="1,2,4,8",
+                        help="要测试的并发会话数，逗号分隔，默认 1,2,4,8")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放倍速，默认 1（实时）")
+    parser.add_argument("--hop", type=float, default=HOP_DURATION, help="每块音频时长（秒）")
+    parser.add_argument("--output", help="结果 JSON 文件，默认输出到 stdout")
+    args = parser.parse_args()
+
+    pcms = [load_fixture(path) for path in args.wav]
+    levels = [int(n) for n in args.sessions.split(",") if n.strip()]
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "url": args.url,
+            "wav": args.wav,
+        },
+        "levels": [],
+    }
+    for n in levels:
+        print(f"[load] {n} sessions ...", file=sys.stderr)
+        level = run_level(args.url, pcms, n, args.speed, args.hop)
+        print(f"[load] {n} sessions: p50 {level['latency'].get('p50')}s "
+              f"p95 {level['latency'].get('p95')}s, {len(level['errors'])} errors", file=sys.stderr)
+        report["levels"].append(level)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
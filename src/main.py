@@ -1,18 +1,20 @@
 # main.py
 
 import threading
-import queue
-import time
 import subprocess
 import argparse
 import tkinter as tk
 import customtkinter as ctk
 
-from translator import Translator
-from aiResponder import GPTResponder
+from aiResponder import GPTResponder, DEBOUNCE
+from conversationContext import CONTEXT_BUDGET
 from audioRecorder import DefaultMicRecorder, DefaultSpeakerRecorder
 from audioTranscriber import AudioTranscriber
-from transcriberModels import load_asr_model
+from audioMux import AudioMultiplexer
+from startup import StartupTimer, load_models
+import metrics
+import precision as prec
+import profiler
 
 def write_in_textbox(textbox, text):
     textbox.delete("1.0", "end")
@@ -45,21 +47,16 @@ def update_response_UI(responder, textbox,
         interval = int(slider.get())
         responder.response_interval = interval
         slider_label.configure(text=f"Update interval: {interval} seconds")
-        if send_to_gpt_state[0] and resp and resp != responder.prev_response:
-            responder.prev_response = resp
-            responder._tts_request(resp)
+        # TTS 由 responder 在完整回复到达时发起，界面只负责显示
     textbox.after(300, update_response_UI,
                    responder, textbox,
                    slider_label, slider,
                    freeze_state, send_to_gpt_state)
 
-def clear_context(transcriber, mic_queue, speaker_queue, responder):
+def clear_context(transcriber, audio_mux, responder):
     transcriber.clear_transcript_data()
-    with mic_queue.mutex:
-        mic_queue.queue.clear()
-    with speaker_queue.mutex:
-        speaker_queue.queue.clear()
-    responder.history.clear()
+    audio_mux.clear()
+    responder.clear_history()
 
 def create_ui_components(root):
     ctk.set_appearance_mode("dark")
@@ -124,16 +121,21 @@ def create_ui_components(root):
             mic_btn, spkr_btn,
             clear_btn)
 
-def main():
-    # 检查 ffmpeg
+def check_ffmpeg():
     try:
         subprocess.run(["ffmpeg","-version"],
                        stdout=subprocess.DEVNULL,
                        stderr=subprocess.DEVNULL)
     except FileNotFoundError:
-        print("请先安装 ffmpeg")
-        return
+        return False
+    return True
 
+def calibrate_recorders():
+    # 两个设备依次校准（PortAudio 打开设备不保证线程安全），整体与模型加载并行
+    return DefaultMicRecorder(), DefaultSpeakerRecorder()
+
+def main():
+    timer = StartupTimer()
     parser = argparse.ArgumentParser()
     parser.add_argument("series", help="ASR 系列 (whisper, funasr, wenet)")
     parser.add_argument("model", help="具体模型 (如 small, paraformer, ...)")
@@ -142,67 +144,76 @@ def main():
                         help="翻译后端: helsinki 或 m2m100")
     parser.add_argument("mt_model_name",
                         help="语言对 (如 en-zh, zh-en, en-ja 等)")
+    parser.add_argument("--streaming", action="store_true",
+                        help="流式采集：不等停顿，按固定间隔送出音频块，延迟更低")
+    parser.add_argument("--hop", type=float, default=0.2,
+                        help="流式采集每块的时长（秒），默认 0.2")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="在本地该端口提供 Prometheus 格式的 /metrics")
+    parser.add_argument("--metrics-log", type=float, default=None,
+                        help="每隔多少秒打印一行指标摘要")
+    parser.add_argument("--no-warmup", action="store_true",
+                        help="跳过模型预热（启动更快，首句延迟更高）")
+    parser.add_argument("--no-llm-stream", action="store_true",
+                        help="LLM 回复整段返回后再显示（默认流式逐字显示）")
+    parser.add_argument("--no-tts-stream", action="store_true",
+                        help="TTS 音频整段下载后再播放（默认收到 WAV 头即开始播放）")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE,
+                        help=f"转写停止变化多少秒后再请求 LLM，默认 {DEBOUNCE}")
+    parser.add_argument("--context-budget", type=int, default=CONTEXT_BUDGET,
+                        help=f"每次 LLM 请求的对话历史 token 上限，更早的内容折叠成摘要，默认 {CONTEXT_BUDGET}")
+    prec.add_arguments(parser)
+    profiler.add_arguments(parser)
     args = parser.parse_args()
+    metrics.serve(args.metrics_port, args.metrics_log)
+    prof = profiler.configure_from_args(args)
 
-    # 加载 ASR 模型
-    asr_model = load_asr_model(args.series, args.model)
-
-    # 准备录音队列
-    mic_queue     = queue.Queue()
-    speaker_queue = queue.Queue()
-    audio_queue   = queue.Queue()
-
-    mic_rec = DefaultMicRecorder()
-    mic_rec.record_into_queue(mic_queue)
-    time.sleep(0.5)
-    spk_rec = DefaultSpeakerRecorder()
-    spk_rec.record_into_queue(speaker_queue)
-
-    # 合并音频数据到 audio_queue
-    mic_enabled     = [True]
-    speaker_enabled = [True]
-    def audio_merger():
-        while True:
-            try:
-                who, data, ts = speaker_queue.get(timeout=0.05)
-                if speaker_enabled[0]:
-                    audio_queue.put((who, data, ts))
-            except queue.Empty:
-                pass
-            try:
-                who, data, ts = mic_queue.get(timeout=0.05)
-                if mic_enabled[0]:
-                    audio_queue.put((who, data, ts))
-            except queue.Empty:
-                pass
-
-    threading.Thread(target=audio_merger, daemon=True).start()
-
-    # 初始化翻译器
-    translator = Translator(args.mt_backend, args.mt_model_name)
+    # 缺 ffmpeg 时直接退出，不必先花几十秒加载模型
+    if not timer.run("ffmpeg_check", check_ffmpeg):
+        print("请先安装 ffmpeg")
+        return
+
+    # ASR / 翻译模型加载、预热与环境噪声校准并行进行
+    asr_model, translator, timer = load_models(
+        args.series, args.model, args.mt_backend, args.mt_model_name,
+        warmup=not args.no_warmup, timer=timer, precision=args.precision,
+        extra_tasks={"noise_calibration": calibrate_recorders})
+    mic_rec, spk_rec = timer.results["noise_calibration"]
+
+    # 录音回调直接写入复用器，按采集时间排序后交给转写器
+    audio_mux = AudioMultiplexer()
+    metrics.gauge("capture_mux_depth", "复用器中等待排序的音频块数").set_function(audio_mux.qsize)
+    for rec in (mic_rec, spk_rec):
+        audio_mux.add_source(rec.source_name)
+        rec.record_into_queue(audio_mux, streaming=args.streaming, hop_duration=args.hop)
 
     # 初始化转写器
     transcriber = AudioTranscriber(
-        mic_rec.source,
-        spk_rec.source,
+        mic_rec,
+        spk_rec,
         asr_model,
         translator
     )
     threading.Thread(
         target=transcriber.transcribe_audio_queue,
-        args=(audio_queue,),
+        args=(audio_mux,),
+        name="mux-dispatch",
         daemon=True
     ).start()
 
     # 初始化 GPTResponder
-    responder = GPTResponder()
+    responder = GPTResponder(stream=not args.no_llm_stream, debounce=args.debounce,
+                             context_budget=args.context_budget,
+                             stream_tts=not args.no_tts_stream)
     send_to_gpt_state = [True]
     threading.Thread(
         target=responder.respond_to_transcriber,
         args=(transcriber, send_to_gpt_state),
+        name="responder",
         daemon=True
     ).start()
 
+    print(timer.report())
     print("READY")
 
     # 构建 UI 并绑定事件
@@ -214,7 +225,7 @@ def main():
      clear_btn) = create_ui_components(root)
 
     clear_btn.configure(command=lambda:
-        clear_context(transcriber, mic_queue, speaker_queue, responder)
+        clear_context(transcriber, audio_mux, responder)
     )
 
     # Freeze 按钮
@@ -232,16 +243,22 @@ def main():
 
     # Mic 开关
     def toggle_mic():
-        mic_enabled[0] = not mic_enabled[0]
-        mic_btn.configure(text="Mic: ON" if mic_enabled[0] else "Mic: OFF")
+        enabled = not audio_mux.is_enabled(mic_rec.source_name)
+        audio_mux.set_enabled(mic_rec.source_name, enabled)
+        mic_btn.configure(text="Mic: ON" if enabled else "Mic: OFF")
     mic_btn.configure(command=toggle_mic)
 
     # Speaker 开关
     def toggle_speaker():
-        speaker_enabled[0] = not speaker_enabled[0]
-        spkr_btn.configure(text="Spkr: ON" if speaker_enabled[0] else "Spkr: OFF")
+        enabled = not audio_mux.is_enabled(spk_rec.source_name)
+        audio_mux.set_enabled(spk_rec.source_name, enabled)
+        spkr_btn.configure(text="Spkr: ON" if enabled else "Spkr: OFF")
     spkr_btn.configure(command=toggle_speaker)
 
+    # F9 开关采样分析
+    root.bind("<F9>", lambda _: threading.Thread(target=prof.toggle, name="profiler-toggle",
+                                                 daemon=True).start())
+
     # 初始化滑条标签
     slider_label.configure(text=f"Update interval: {int(slider.get())} seconds")
 
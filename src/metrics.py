@@ -0,0 +1,316 @@
+# metrics.py
+"""
+进程内指标：计数器、仪表、直方图（带标签），线程安全。
+流水线各阶段直接往全局 REGISTRY 里记录；可选地通过本地 HTTP 端点以
+Prometheus 文本格式导出，或由后台线程定期打印一行摘要。
+"""
+import bisect
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 延迟类直方图的默认桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 批大小、队列长度等计数类直方图的桶
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+LOG_INTERVAL = 30.0
+
+
+def _label_key(labelnames, labels):
+    if set(labels) != set(labelnames):
+        raise ValueError(f"标签应为 {labelnames}，收到 {tuple(labels)}")
+    return tuple(str(labels[n]) for n in labelnames)
+
+
+def _format_labels(labelnames, key, extra=None):
+    pairs = list(zip(labelnames, key)) + (extra or [])
+    if not pairs:
+        return ""
+    body = ",".join('{}="{}"'.format(n, v.replace("\\", "\\\\").replace('"', '\\"'))
+                    for n, v in pairs)
+    return "{" + body + "}"
+
+
+def _format_value(v):
+    if v == math.inf:
+        return "+Inf"
+    return repr(float(v))
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, help="", labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    """只增不减的累计值，如处理的音频秒数、错误次数"""
+    type = "counter"
+
+    def inc(self, amount=1.0, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(self.labelnames, labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, v) for key, v in self._values.items()]
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值；set_function 注册的函数在导出时才调用（如队列长度）"""
+    type = "gauge"
+
+    def __init__(self, name, help="", labelnames=()):
+        super().__init__(name, help, labelnames)
+        self._functions = {}
+
+    def set(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def set_function(self, fn, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._functions[key] = fn
+
+    def remove_function(self, fn, **labels):
+        """注销 set_function 注册的 fn，不再持有它引用的对象；已被别的函数覆盖时不动"""
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            if self._functions.get(key) == fn:
+                del self._functions[key]
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, fn in functions.items():
+            try:
+                values[key] = float(fn())
+            except Exception:
+                continue  # 对象已失效等情况，跳过这一项
+        return [(self.name, key, v) for key, v in values.items()]
+
+
+class Histogram(_Metric):
+    """固定桶直方图，记录分布、总和与次数；分位数按桶线性插值估计"""
+    type = "histogram"
+
+    def __init__(self, name, help="", labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def time(self, **labels):
+        """with hist.time(stage="mt"): ... 记录代码块耗时"""
+        return _Timer(self, labels)
+
+    def snapshot(self, **labels):
+        """(每桶计数, 总和, 次数)"""
+        with self._lock:
+            entry = self._values.get(_label_key(self.labelnames, labels))
+            if entry is None:
+                return [0] * (len(self.buckets) + 1), 0.0, 0
+            return list(entry[0]), entry[1], entry[2]
+
+    def quantile(self, q, **labels):
+        counts, _, total = self.snapshot(**labels)
+        return self._quantile(counts, total, q)
+
+    def _quantile(self, counts, total, q):
+        if not total:
+            return None
+        rank, seen = q * total, 0
+        for i, c in enumerate(counts):
+            if seen + c >= rank and c:
+                lo = self.buckets[i - 1] if i > 0 else 0.0
+                hi = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lo + (hi - lo) * (rank - seen) / c
+            seen += c
+        return self.buckets[-1]
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(e[0]), e[1], e[2]) for key, e in self._values.items()]
+        out = []
+        for key, counts, total, n in items:
+            cum = 0
+            for bound, c in zip(self.buckets + (math.inf,), counts):
+                cum += c
+                out.append((self.name + "_bucket", key, cum, [("le", _format_value(bound))]))
+            out.append((self.name + "_sum", key, total))
+            out.append((self.name + "_count", key, n))
+        return out
+
+
+class _Timer:
+    def __init__(self, hist, labels):
+        self.hist = hist
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.monotonic() - self.start, **self.labels)
+
+
+class Registry:
+    """按名字注册指标；同名重复注册返回已有对象，各模块可以在导入时各自声明"""
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"指标 {name} 已注册为 {metric.type}")
+            return metric
+
+    def counter(self, name, help="", labelnames=()):
+        return self._get(Counter, name, help, labelnames)
+
+    def gauge(self, name, help="", labelnames=()):
+        return self._get(Gauge, name, help, labelnames)
+
+    def histogram(self, name, help="", labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help, labelnames, buckets=buckets)
+
+    def metrics(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    def render(self):
+        """Prometheus 文本格式"""
+        lines = []
+        for metric in self.metrics():
+            lines += metric._header()
+            for sample in metric.samples():
+                name, key, value = sample[:3]
+                extra = sample[3] if len(sample) > 3 else None
+                lines.append(f"{name}{_format_labels(metric.labelnames, key, extra)} "
+                             f"{_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """
+        单行摘要：直方图给出次数和 p50/p95，计数器和仪表给出当前值。
+        没有数据的指标省略。
+        """
+        parts = []
+        for metric in self.metrics():
+            if isinstance(metric, Histogram):
+                with metric._lock:
+                    items = [(key, list(e[0]), e[2]) for key, e in metric._values.items()]
+                for key, counts, n in items:
+                    p50 = metric._quantile(counts, n, 0.5)
+                    p95 = metric._quantile(counts, n, 0.95)
+                    parts.append(f"{metric.name}{_format_labels(metric.labelnames, key)}"
+                                 f" n={n} p50={p50:.3g} p95={p95:.3g}")
+            else:
+                for name, key, value in metric.samples():
+                    parts.append(f"{name}{_format_labels(metric.labelnames, key)}={value:.4g}")
+        return " ".join(parts)
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+class MetricsServer:
+    """本地 HTTP 端点，GET /metrics 返回 Prometheus 文本格式"""
+    def __init__(self, port, host="127.0.0.1", registry=REGISTRY):
+        registry_ = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry_.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever,
+                                        name="metrics-http", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class MetricsLogger:
+    """后台线程每 interval 秒打印一行指标摘要"""
+    def __init__(self, interval=LOG_INTERVAL, registry=REGISTRY, out=print):
+        self.interval = interval
+        self.registry = registry
+        self.out = out
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-log", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            line = self.registry.summary()
+            if line:
+                self.out(f"[metrics] {line}")
+
+    def close(self):
+        self._stop.set()
+
+
+def serve(port=None, log_interval=None, host="127.0.0.1"):
+    """按命令行参数启动导出方式；两者都不指定时只在进程内收集"""
+    started = []
+    if port is not None:
+        started.append(MetricsServer(port, host).start())
+    if log_interval:
+        started.append(MetricsLogger(log_interval).start())
+    return started
@@ -0,0 +1,57 @@
+# phraseBuffer.py
+import numpy as np
+
+from audioFormat import SAMPLE_RATE
+
+
+class PhraseBuffer:
+    """
+    预分配、有上限的环形缓冲区，存放一个音源当前短语的 16 kHz float32 音频。
+    数据在 [0, cap) 和 [cap, 2cap) 各写一份（镜像环），任何时候当前内容都是
+    底层数组上连续的一段，view() 不需要拷贝；追加只写新数据，与短语长度无关。
+    """
+    def __init__(self, max_seconds, sample_rate=SAMPLE_RATE):
+        self.capacity = int(max_seconds * sample_rate)
+        self._data = np.zeros(2 * self.capacity, dtype=np.float32)
+        self._start = 0
+        self._len = 0
+        self.dropped = 0  # 因超过上限被挤掉的样本数
+
+    def __len__(self):
+        return self._len
+
+    def free(self):
+        return self.capacity - self._len
+
+    def append(self, x):
+        n = len(x)
+        if n > self.capacity:  # 单块比整个缓冲区还长，只保留最新的部分
+            self.dropped += n - self.capacity
+            x, n = x[-self.capacity:], self.capacity
+        overflow = n - self.free()
+        if overflow > 0:       # 硬上限：挤掉最旧的样本
+            self.consume(overflow)
+            self.dropped += overflow
+        cap = self.capacity
+        pos = (self._start + self._len) % cap
+        first = min(n, cap - pos)
+        self._data[pos:pos + first] = x[:first]
+        self._data[pos + cap:pos + cap + first] = x[:first]
+        if first < n:
+            self._data[:n - first] = x[first:]
+            self._data[cap:cap + n - first] = x[first:]
+        self._len += n
+
+    def view(self):
+        """当前内容的零拷贝视图，下次 append/consume 之前有效"""
+        return self._data[self._start:self._start + self._len]
+
+    def consume(self, n):
+        """丢掉最前面的 n 个样本"""
+        n = max(0, min(n, self._len))
+        self._start = (self._start + n) % self.capacity
+        self._len -= n
+
+    def clear(self):
+        self._start = 0
+        self._len = 0
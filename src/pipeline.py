@@ -0,0 +1,214 @@
+# pipeline.py
+import threading
+import time
+from collections import deque
+
+import metrics
+
+# 队列满时的处理策略
+BLOCK       = "block"        # 生产者阻塞，形成背压
+DROP_OLDEST = "drop_oldest"  # 丢掉最旧的一条（可丢弃的条目中）
+COALESCE    = "coalesce"     # 与队列中同 key 的条目合并；找不到可合并的再丢最旧的可丢弃条目
+
+QUEUE_DEPTH = metrics.gauge("pipeline_queue_depth", "阶段输入队列当前长度", ("queue",))
+QUEUE_WAIT = metrics.histogram("pipeline_queue_wait_seconds", "条目在队列中等待的时间", ("queue",))
+QUEUE_DROPPED = metrics.counter("pipeline_queue_dropped_total", "因队列满被丢弃的条目数", ("queue",))
+QUEUE_COALESCED = metrics.counter("pipeline_queue_coalesced_total", "被合并进已有条目的次数", ("queue",))
+STAGE_SECONDS = metrics.histogram("pipeline_stage_seconds", "阶段处理一次（一批）的耗时", ("stage",))
+STAGE_ERRORS = metrics.counter("pipeline_stage_errors_total", "阶段处理出错次数", ("stage",))
+
+
+class QueueClosed(Exception):
+    """队列已关闭且取空"""
+
+
+class StageQueue:
+    """
+    流水线阶段之间的有界队列。
+    key(item) 决定哪些条目可以合并，merge(old, new) 返回合并后的条目，
+    返回 None 表示这两条不能合并；不传 merge 时新条目直接替换旧条目。
+    droppable(item) 为 False 的条目队列满时不会被丢弃；没有可丢弃的条目时 put 阻塞，
+    与 BLOCK 相同。不传时所有条目都可丢弃。
+    传入 name 时导出队列长度、等待时间、丢弃与合并次数等指标；close 时注销队列长度回调。
+    """
+    def __init__(self, maxsize=0, policy=BLOCK, key=None, merge=None, name=None,
+                 droppable=None):
+        if policy not in (BLOCK, DROP_OLDEST, COALESCE):
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.key = key
+        self.merge = merge
+        self.droppable = droppable
+        self.name = name
+        self.stats = {"put": 0, "dropped": 0, "coalesced": 0}
+        self._items = deque()
+        self._put_times = deque()  # 与 _items 一一对应的入队时间，合并时保留较早的
+        self._unfinished = 0  # 已入队但还没处理完的条目数，供 join 使用
+        self._closed = False
+        self._cond = threading.Condition()
+        if name:
+            QUEUE_DEPTH.set_function(self.qsize, queue=name)
+
+    def put(self, item):
+        with self._cond:
+            if self._closed:
+                return
+            self.stats["put"] += 1
+            if self.policy == COALESCE and self._coalesce(item):
+                self._cond.notify_all()
+                return
+            if self.maxsize > 0:
+                while len(self._items) >= self.maxsize and not self._closed:
+                    if self.policy == BLOCK or not self._drop_oldest():
+                        self._cond.wait()
+                if self._closed:
+                    return
+            self._items.append(item)
+            self._put_times.append(time.monotonic())
+            self._unfinished += 1
+            self._cond.notify_all()
+
+    def _drop_oldest(self):
+        """丢掉最旧的一条可丢弃条目；没有可丢弃的返回 False"""
+        for i, old in enumerate(self._items):
+            if self.droppable is None or self.droppable(old):
+                del self._items[i]
+                del self._put_times[i]
+                self.stats["dropped"] += 1
+                self._unfinished -= 1
+                if self.name:
+                    QUEUE_DROPPED.inc(queue=self.name)
+                return True
+        return False
+
+    def _coalesce(self, item):
+        # 只和最近一条同 key 的条目合并，保持同 key 条目之间的先后顺序
+        k = self.key(item) if self.key else None
+        for i in range(len(self._items) - 1, -1, -1):
+            old = self._items[i]
+            if (self.key(old) if self.key else None) != k:
+                continue
+            merged = self.merge(old, item) if self.merge else item
+            if merged is None:
+                return False
+            self._items[i] = merged
+            self.stats["coalesced"] += 1
+            if self.name:
+                QUEUE_COALESCED.inc(queue=self.name)
+            return True
+        return False
+
+    def get(self):
+        with self._cond:
+            self._wait_items()
+            item = self._items.popleft()
+            self._observe_wait(self._put_times.popleft())
+            self._cond.notify_all()
+            return item
+
+    def get_batch(self, max_items):
+        """阻塞到至少有一条，然后一次取走最多 max_items 条"""
+        with self._cond:
+            self._wait_items()
+            items = []
+            for _ in range(min(max_items, len(self._items))):
+                items.append(self._items.popleft())
+                self._observe_wait(self._put_times.popleft())
+            self._cond.notify_all()
+            return items
+
+    def _wait_items(self):
+        while not self._items:
+            if self._closed:
+                raise QueueClosed(self.name)
+            self._cond.wait()
+
+    def close(self):
+        """关闭队列：之后的 put 被忽略，消费者取完剩余条目后收到 QueueClosed"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self.name:
+            QUEUE_DEPTH.remove_function(self.qsize, queue=self.name)
+
+    def _observe_wait(self, put_time):
+        if self.name:
+            QUEUE_WAIT.observe(time.monotonic() - put_time, queue=self.name)
+
+    def task_done(self, n=1):
+        with self._cond:
+            self._unfinished -= n
+            self._cond.notify_all()
+
+    def join(self, timeout=None):
+        """等到所有已入队的条目都处理完；超时返回 False"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._unfinished <= 0, timeout)
+
+    def unfinished(self):
+        """已入队但还没处理完的条目数（含正在处理的）"""
+        with self._cond:
+            return self._unfinished
+
+    def qsize(self):
+        with self._cond:
+            return len(self._items)
+
+    def clear(self):
+        with self._cond:
+            self._unfinished -= len(self._items)
+            self._items.clear()
+            self._put_times.clear()
+            self._cond.notify_all()
+
+
+class Stage:
+    """
+    流水线的一个阶段：独立的工作线程不断从输入队列取条目交给 handler。
+    batched=True 时 handler 收到的总是列表（最多 batch_size 条，batch_size 可以为 1）；
+    不指定时 batch_size > 1 即按批处理。
+    """
+    def __init__(self, name, in_queue, handler, workers=1, batch_size=1, batched=None):
+        self.name = name
+        self.in_queue = in_queue
+        self.handler = handler
+        self.workers = workers
+        self.batch_size = max(1, batch_size)
+        self.batched = batch_size > 1 if batched is None else batched
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            name = self.name if self.workers == 1 else f"{self.name}-{i}"
+            t = threading.Thread(target=self._run, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout=None):
+        """关闭输入队列，等工作线程处理完剩余条目后退出"""
+        self.in_queue.close()
+        for t in self._threads:
+            if t is not threading.current_thread():
+                t.join(timeout)
+
+    def _run(self):
+        while True:
+            try:
+                if self.batched:
+                    item = self.in_queue.get_batch(self.batch_size)
+                else:
+                    item = self.in_queue.get()
+            except QueueClosed:
+                return
+            start = time.monotonic()
+            try:
+                self.handler(item)
+            except Exception as e:
+                STAGE_ERRORS.inc(stage=self.name)
+                print(f"[{self.name}] Error:", e)
+            finally:
+                STAGE_SECONDS.observe(time.monotonic() - start, stage=self.name)
+                self.in_queue.task_done(len(item) if self.batched else 1)
@@ -0,0 +1,184 @@
+# precision.py
+"""
+CPU 低精度推理：
+- int8：Linear 层动态量化（权重 int8，激活运行时量化），量化后的 state_dict 缓存到磁盘，
+  下次启动直接建出量化后的结构再载入，不读 fp32 权重、不做随机初始化、也不重新量化；
+- bf16：CPU 支持 bf16 指令（AVX512-BF16 / AMX）时使用，不支持时退回 fp32。
+只作用于 CPU，GPU 上仍按原来的 fp32 / fp16 运行。
+"""
+import os
+import sys
+import threading
+from contextlib import contextmanager, nullcontext
+
+import torch
+import torch.nn as nn
+
+from precisionOptions import PRECISIONS, DEFAULT_PRECISION
+
+
+def _default_cache_dir():
+    # 打包后 _MEIPASS 只读，缓存放在可执行文件旁边
+    if getattr(sys, "frozen", False):
+        base = os.path.dirname(sys.executable)
+    else:
+        base = os.path.abspath(os.path.dirname(__file__))
+    return os.path.join(base, "models", "quantized")
+
+
+CACHE_DIR = _default_cache_dir()
+
+
+def bf16_supported():
+    """CPU 是否有原生 bf16 运算（oneDNN 的判断）"""
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def resolve(precision, device):
+    """
+    检查并确定实际使用的精度：非 CPU 设备、CPU 不支持 bf16 时退回 fp32。
+    """
+    precision = (precision or DEFAULT_PRECISION).lower()
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision}（可选 {', '.join(PRECISIONS)}）")
+    if precision != "fp32" and str(device).split(":")[0] != "cpu":
+        print(f"[precision] {precision} 只用于 CPU，{device} 上保持原精度")
+        return "fp32"
+    if precision == "bf16" and not bf16_supported():
+        print("[precision] 当前 CPU 不支持 bf16，退回 fp32")
+        return "fp32"
+    return precision
+
+
+def _plain_linears(module):
+    """
+    whisper 自定义的 Linear 是 nn.Linear 的子类，quantize_dynamic 按类型精确匹配，
+    先换成共享同一权重的 nn.Linear（fp32 下前向完全相同）。
+    """
+    for name, child in module.named_children():
+        if isinstance(child, nn.Linear) and type(child) is not nn.Linear:
+            plain = nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+            plain.weight = child.weight
+            plain.bias = child.bias
+            setattr(module, name, plain)
+        else:
+            _plain_linears(child)
+    return module
+
+
+def quantize_int8(model):
+    """Linear 层动态量化为 int8，其余层保持 fp32"""
+    model.eval()
+    return torch.quantization.quantize_dynamic(_plain_linears(model), {nn.Linear},
+                                               dtype=torch.qint8)
+
+
+def _int8_structure(module):
+    """
+    与 quantize_int8 结果相同的空结构：Linear（含子类）直接换成未填权重的动态量化 Linear，
+    权重随后从缓存载入，省掉量化计算。
+    """
+    try:
+        from torch.ao.nn.quantized.dynamic import Linear as DynamicLinear
+    except ImportError:  # torch < 1.13
+        from torch.nn.quantized.dynamic import Linear as DynamicLinear
+    for name, child in module.named_children():
+        if isinstance(child, nn.Linear):
+            setattr(module, name, DynamicLinear(child.in_features, child.out_features,
+                                                bias_=child.bias is not None, dtype=torch.qint8))
+        else:
+            _int8_structure(child)
+    return module
+
+
+_INIT_FUNCTIONS = ("uniform_", "normal_", "trunc_normal_", "constant_", "ones_", "zeros_",
+                   "xavier_uniform_", "xavier_normal_", "kaiming_uniform_", "kaiming_normal_")
+
+
+_init_lock = threading.Lock()
+
+
+@contextmanager
+def skip_init():
+    """
+    建模型结构时跳过 torch.nn.init 的随机初始化（权重随后整体载入），只分配内存。
+    替换的是全局函数：ASR 与 MT 并行加载时加锁，保证换回的是原函数。
+    """
+    with _init_lock:
+        saved = {name: getattr(nn.init, name) for name in _INIT_FUNCTIONS}
+        try:
+            for name in _INIT_FUNCTIONS:
+                setattr(nn.init, name, lambda tensor, *args, **kwargs: tensor)
+            yield
+        finally:
+            for name, fn in saved.items():
+                setattr(nn.init, name, fn)
+
+
+def cache_path(source_path, precision, cache_dir=None):
+    """缓存文件名带上源模型的修改时间和 torch 版本，任一变化都会重新生成"""
+    name = os.path.basename(os.path.normpath(source_path))
+    mtime = int(os.path.getmtime(source_path))
+    version = torch.__version__.split("+")[0]
+    return os.path.join(cache_dir or CACHE_DIR, f"{name}-{precision}-{mtime}-torch{version}.v2.pt")
+
+
+def load_int8_cached(source_path, load, skeleton, describe=None, cache_dir=None):
+    """
+    int8 模型缓存。缓存里是 {"meta": describe(model), "state": 量化后的 state_dict}，
+    只含张量和基本类型，weights_only 加载，不反序列化任意对象。
+    命中时 skeleton(meta) 建出 fp32 结构（在 skip_init 下，不读 fp32 权重、不随机初始化），
+    Linear 直接换成空的量化 Linear 后载入缓存的权重；
+    没有缓存、或缓存损坏/不兼容时用 quantize_int8(load()) 生成，并写入缓存。
+    meta 放重建结构所需、又不在源模型目录里现成可读的信息（如 whisper 的 ModelDimensions）。
+    """
+    path = cache_path(source_path, "int8", cache_dir)
+    if os.path.exists(path):
+        try:
+            cached = torch.load(path, map_location="cpu", weights_only=True)
+            with skip_init():
+                model = skeleton(cached["meta"])
+            model = _int8_structure(model.eval())
+            model.load_state_dict(cached["state"])
+            return model
+        except Exception as e:
+            print(f"[precision] 缓存 {path} 无法加载，重新生成: {e}")
+    model = quantize_int8(load())
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.part"  # 批量转写的多个进程可能同时生成
+        torch.save({"meta": describe(model) if describe else None,
+                    "state": model.state_dict()}, tmp)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"[precision] 无法写入缓存 {path}: {e}")
+    return model
+
+
+def add_arguments(parser):
+    """各入口共用的 --precision 参数"""
+    parser.add_argument("--precision", choices=PRECISIONS, default=DEFAULT_PRECISION,
+                        help="CPU 推理精度：fp32（默认）、int8 动态量化、bf16（需 CPU 支持）")
+
+
+def autocast(precision):
+    """bf16 模式下的推理上下文；其他精度什么都不做"""
+    if precision == "bf16":
+        return torch.autocast("cpu", dtype=torch.bfloat16)
+    return nullcontext()
+
+
+def model_size_mb(model):
+    """参数与 buffer（含量化后的打包权重）占用的内存，MB"""
+    total = 0
+    for t in list(model.parameters()) + list(model.buffers()):
+        total += t.numel() * t.element_size()
+    for m in model.modules():
+        packed = getattr(m, "_packed_params", None)
+        if packed is not None:
+            w, b = packed._weight_bias()
+            total += w.numel() * w.element_size() + (b.numel() * b.element_size() if b is not None else 0)
+    return total / (1024.0 * 1024.0)
@@ -0,0 +1,218 @@
+# precisionBenchmark.py
+"""
+低精度推理基准：同一组固定语料分别用 fp32 / int8 / bf16 跑一遍，
+比较加载时间、单条耗时、内存，以及输出相对 fp32 的偏差（字符级编辑距离 / 参考长度）。
+每种精度在独立进程中运行，峰值内存互不影响。
+
+    python precisionBenchmark.py --mt helsinki:en-zh --asr whisper:small --audio ../fixtures/meeting_en.wav
+    python precisionBenchmark.py --mt m2m100:zh-en --corpus sentences.txt --precision fp32 --precision int8
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from benchmark import summarize, peak_rss_mb, _git_commit
+from precisionOptions import PRECISIONS
+
+REPEATS = 3   # 每条语料重复次数，取全部耗时做统计（首轮包含在内）
+
+# 固定的翻译语料：长短句、数字、专有名词都有，按源语言选择
+MT_CORPUS = {
+    "en": [
+        "Hello.",
+        "Can you hear me clearly?",
+        "Let's move on to the next item on the agenda.",
+        "The quarterly revenue grew by 12 percent compared to last year.",
+        "I think we should postpone the release until the security review is finished.",
+        "Could you share your screen so everyone can see the latest design?",
+        "Our team in Berlin will take over the integration tests starting Monday.",
+        "If the latency stays below two hundred milliseconds, users will not notice any delay.",
+        "Thank you all for joining, and see you next week.",
+        "The model was trained on more than ten thousand hours of labeled speech.",
+    ],
+    "zh": [
+        "你好。",
+        "你能听清楚我说话吗？",
+        "我们进入下一个议题。",
+        "这个季度的收入比去年同期增长了百分之十二。",
+        "我建议等安全评审结束以后再发布。",
+        "你可以共享一下屏幕吗？大家一起看看最新的设计稿。",
+        "从周一开始，柏林的团队会接手集成测试。",
+        "只要延迟保持在两百毫秒以内，用户基本感觉不到。",
+        "谢谢大家参加，我们下周见。",
+        "这个模型用了一万多小时的标注语音进行训练。",
+    ],
+}
+
+
+def edit_distance(a, b):
+    """字符级 Levenshtein 距离"""
+    if len(a) < len(b):
+        a, b = b, a
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def drift(reference, outputs):
+    """
+    与 fp32 输出的偏差：总编辑距离 / 参考总长度，以及完全一致的比例。
+    空白先归一化，只统计实际内容的差异。
+    """
+    ref = [" ".join(r.split()) for r in reference]
+    out = [" ".join(o.split()) for o in outputs]
+    distance = sum(edit_distance(r, o) for r, o in zip(ref, out))
+    return {
+        "char_error_rate": round(distance / max(sum(len(r) for r in ref), 1), 4),
+        "exact_match": round(sum(r == o for r, o in zip(ref, out)) / max(len(ref), 1), 4),
+    }
+
+
+def _run_items(fn, items, repeats):
+    """逐条执行 repeats 轮，返回 (首轮输出, 全部耗时)"""
+    outputs, seconds = [], []
+    for r in range(repeats):
+        for item in items:
+            start = time.monotonic()
+            out = fn(item)
+            seconds.append(time.monotonic() - start)
+            if r == 0:
+                outputs.append(out)
+    return outputs, seconds
+
+
+def run_precision(precision, mt_spec=None, asr_spec=None, sentences=(), audio=(),
+                  device="cpu", repeats=REPEATS):
+    """在当前进程里用指定精度加载模型并跑完语料，返回结果（含原始输出，用于计算偏差）"""
+    import precision as prec
+    result = {"precision": precision}
+
+    if mt_spec:
+        from translator import Translator
+        backend, pair = mt_spec.split(":", 1)
+        start = time.monotonic()
+        # 关闭缓存，重复轮次也真实计算
+        translator = Translator(backend, pair, cache_size=0, precision=precision)
+        load = time.monotonic() - start
+        translator.warmup()
+        outputs, seconds = _run_items(lambda s: translator.translate_batch([s])[0],
+                                      sentences, repeats)
+        result["mt"] = {
+            "model": mt_spec,
+            "precision": translator.precision,   # 不支持时会退回 fp32
+            "load_seconds": round(load, 3),
+            "model_mb": round(prec.model_size_mb(translator.model), 1),
+            "latency": summarize(seconds),
+            "outputs": outputs,
+        }
+
+    if asr_spec:
+        from transcriberModels import load_asr_model, load_audio
+        series, model_name = asr_spec.split(":", 1)
+        start = time.monotonic()
+        asr = load_asr_model(series, model_name, device, precision)
+        load = time.monotonic() - start
+        asr.warmup()
+        pcms = [load_audio(path) for path in audio]
+        outputs, seconds = _run_items(
+            lambda pcm: "".join(u[0] for u in asr.transcribe_long(pcm)).strip(), pcms, repeats)
+        audio_seconds = sum(len(p) for p in pcms) / 16000.0
+        result["asr"] = {
+            "model": asr_spec,
+            "precision": getattr(asr, "precision", "fp32"),
+            "load_seconds": round(load, 3),
+            "model_mb": round(prec.model_size_mb(asr.model), 1) if series == "whisper" else None,
+            "latency": summarize(seconds),
+            "rtf": round(sum(seconds) / max(audio_seconds * repeats, 1e-6), 4),
+            "outputs": outputs,
+        }
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="fp32 / int8 / bf16 推理速度、内存与输出偏差对比")
+    parser.add_argument("--mt", help="翻译模型 后端:语言对，如 helsinki:en-zh")
+    parser.add_argument("--asr", help="ASR 模型 系列:模型，如 whisper:small")
+    parser.add_argument("--audio", action="append", default=[],
+                        help="ASR 语料录音文件，可重复")
+    parser.add_argument("--corpus", help="翻译语料文件（每行一句），默认按源语言使用内置语料")
+    parser.add_argument("--precision", action="append", choices=PRECISIONS,
+                        help="要比较的精度，可重复；默认全部。fp32 总会运行，作为参考")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help=f"每条语料重复次数，默认 {REPEATS}")
+    parser.add_argument("--device", default="cpu", help="ASR 推理设备，默认 cpu")
+    parser.add_argument("--keep-outputs", action="store_true", help="结果里保留每条输出")
+    parser.add_argument("--output", help="结果 JSON 文件，默认输出到 stdout")
+    args = parser.parse_args()
+
+    if not args.mt and not args.asr:
+        parser.error("至少需要 --mt 或 --asr 之一")
+    if args.asr and not args.audio:
+        parser.error("--asr 需要至少一个 --audio 录音文件")
+    sentences = []
+    if args.mt:
+        if args.corpus:
+            with open(args.corpus, encoding="utf-8") as f:
+                sentences = [line.strip() for line in f if line.strip()]
+        else:
+            src_lang = args.mt.split(":", 1)[1].split("-")[0]
+            if src_lang not in MT_CORPUS:
+                parser.error(f"没有 {src_lang} 的内置语料，请用 --corpus 指定")
+            sentences = MT_CORPUS[src_lang]
+
+    precisions = ["fp32"] + [p for p in (args.precision or PRECISIONS) if p != "fp32"]
+    ctx = multiprocessing.get_context("spawn")
+    runs = []
+    for precision in precisions:
+        print(f"[precision] {precision} ...", file=sys.stderr)
+        with ProcessPoolExecutor(1, mp_context=ctx) as pool:
+            try:
+                runs.append(pool.submit(run_precision, precision, args.mt, args.asr, sentences,
+                                        args.audio, args.device, args.repeats).result())
+            except Exception as e:
+                print(f"[precision] Error: {precision}: {e}", file=sys.stderr)
+                runs.append({"precision": precision, "error": str(e)})
+
+    # 偏差以 fp32 的输出为参考
+    reference = runs[0]
+    for run in runs:
+        for kind in ("mt", "asr"):
+            if kind in run and kind in reference:
+                run[kind]["drift"] = drift(reference[kind]["outputs"], run[kind]["outputs"])
+    if not args.keep_outputs:
+        for run in runs:
+            for kind in ("mt", "asr"):
+                run.get(kind, {}).pop("outputs", None)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sentences": len(sentences),
+            "audio": args.audio,
+            "repeats": args.repeats,
+        },
+        "runs": runs,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
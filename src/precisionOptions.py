@@ -0,0 +1,7 @@
+# precisionOptions.py
+"""
+推理精度的可选值。单独成模块、不依赖 torch，
+benchmark 等只需要解析命令行的主进程可以直接导入。
+"""
+PRECISIONS = ("fp32", "int8", "bf16")
+DEFAULT_PRECISION = "fp32"
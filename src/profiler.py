@@ -0,0 +1,224 @@
+# profiler.py
+"""
+内置采样分析器：按固定频率采样所有（或指定）线程的调用栈，
+停止时每个线程输出一个 collapsed-stack 文件（flamegraph.pl / speedscope 可直接读取）。
+可选记录 ASR / MT 每次调用的 torch 算子耗时，汇总成表格。
+
+命令行 --profile 启动即开始采样；运行中可用 SIGUSR1（POSIX）或界面上的 F9 开关。
+"""
+import atexit
+import os
+import re
+import signal
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+SAMPLE_RATE_HZ = 100
+PROFILE_DIR = "profiles"
+TORCH_TOP_OPS = 30   # 每个分区在报告里列出的算子数
+
+_SAFE_NAME_RE = re.compile(r"[^\w.-]+")
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    # 用函数首行号而不是当前行号，同一函数的样本合并在一起
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+class SamplingProfiler:
+    """
+    后台线程每 1/rate 秒读取 sys._current_frames()，按线程名聚合调用栈。
+    threads 为线程名前缀列表，None 表示除分析器自身外的全部线程。
+    """
+    def __init__(self, rate=SAMPLE_RATE_HZ, out_dir=PROFILE_DIR, threads=None, torch_ops=False):
+        self.rate = rate
+        self.out_dir = out_dir
+        self.threads = tuple(threads) if threads else None
+        self.torch_ops = torch_ops
+        self.stacks = defaultdict(Counter)   # 线程名 -> {collapsed 栈: 样本数}
+        self.samples = 0
+        self._running = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._started_at = None
+        # torch 算子统计：分区 -> 算子名 -> [调用次数, 自身 CPU 时间(us), 总 CPU 时间(us)]
+        self.torch_stats = defaultdict(lambda: defaultdict(lambda: [0, 0.0, 0.0]))
+        self.torch_calls = Counter()
+        self._torch_busy = threading.Lock()
+
+    @property
+    def running(self):
+        return self._running.is_set()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            self.stacks.clear()
+            self.samples = 0
+            self.torch_stats.clear()
+            self.torch_calls.clear()
+            self._started_at = time.time()
+            self._running.set()
+            self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+            self._thread.start()
+        print(f"[profiler] sampling at {self.rate} Hz")
+
+    def stop(self):
+        """停止采样并写出结果，返回输出目录；未在运行时返回 None"""
+        with self._lock:
+            if not self.running:
+                return None
+            self._running.clear()
+            self._thread.join()
+            path = self.write()
+        print(f"[profiler] {self.samples} samples written to {path}")
+        return path
+
+    def toggle(self):
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+
+    def _wanted(self, name):
+        if name.startswith("profiler"):
+            return False
+        return self.threads is None or name.startswith(self.threads)
+
+    def _run(self):
+        interval = 1.0 / self.rate
+        own = threading.get_ident()
+        next_t = time.monotonic()
+        while self._running.is_set():
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident, f"thread-{ident}")
+                if ident == own or not self._wanted(name):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                self.stacks[name][";".join(reversed(stack))] += 1
+            self.samples += 1
+            next_t += interval
+            delay = next_t - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_t = time.monotonic()  # 跟不上时不补采，避免连续忙等
+
+    def write(self):
+        """每个线程一个 <线程名>.collapsed，另附 torch 算子汇总"""
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self._started_at))
+        path = os.path.join(self.out_dir, stamp)
+        os.makedirs(path, exist_ok=True)
+        for name, stacks in self.stacks.items():
+            fname = _SAFE_NAME_RE.sub("_", name) + ".collapsed"
+            with open(os.path.join(path, fname), "w", encoding="utf-8") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+        if self.torch_calls:
+            with open(os.path.join(path, "torch_ops.txt"), "w", encoding="utf-8") as f:
+                f.write(self.torch_report())
+        return path
+
+    # —— torch 算子耗时
+    @contextmanager
+    def torch_section(self, section):
+        """
+        在 torch.profiler 下执行代码块，把算子耗时累加到 section 分区。
+        torch profiler 不能在多个线程同时开启，已有分区在记录时本次直接执行、不记录。
+        """
+        if not (self.running and self.torch_ops) or not self._torch_busy.acquire(blocking=False):
+            yield
+            return
+        try:
+            import torch
+            from torch.profiler import profile, ProfilerActivity
+            activities = [ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(ProfilerActivity.CUDA)
+            with profile(activities=activities) as prof:
+                yield
+            stats = self.torch_stats[section]
+            for evt in prof.key_averages():
+                entry = stats[evt.key]
+                entry[0] += evt.count
+                entry[1] += evt.self_cpu_time_total
+                entry[2] += evt.cpu_time_total
+            self.torch_calls[section] += 1
+        finally:
+            self._torch_busy.release()
+
+    def torch_report(self):
+        lines = []
+        for section, stats in self.torch_stats.items():
+            calls = self.torch_calls[section]
+            total = sum(e[1] for e in stats.values())
+            lines.append(f"== {section}: {calls} calls, self CPU {total / 1000.0:.1f} ms, "
+                         f"{total / 1000.0 / max(calls, 1):.2f} ms/call")
+            lines.append(f"{'op':<48}{'count':>10}{'self ms':>12}{'total ms':>12}{'self %':>8}")
+            top = sorted(stats.items(), key=lambda kv: kv[1][1], reverse=True)[:TORCH_TOP_OPS]
+            for name, (count, self_us, total_us) in top:
+                lines.append(f"{name[:47]:<48}{count:>10}{self_us / 1000.0:>12.2f}"
+                             f"{total_us / 1000.0:>12.2f}{100.0 * self_us / max(total, 1e-9):>7.1f}%")
+            lines.append("")
+        return "\n".join(lines)
+
+
+# 进程内唯一的分析器；ASR / MT 代码通过 torch_section 记录算子时间
+_profiler = None
+
+
+def get_profiler():
+    return _profiler
+
+
+def configure(rate=SAMPLE_RATE_HZ, out_dir=PROFILE_DIR, threads=None, torch_ops=False,
+              start=False):
+    """创建全局分析器并安装 SIGUSR1 开关；退出时若仍在采样则自动写出结果"""
+    global _profiler
+    _profiler = SamplingProfiler(rate, out_dir, threads, torch_ops)
+    if hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR1, lambda *_: threading.Thread(
+            target=_profiler.toggle, name="profiler-toggle", daemon=True).start())
+    atexit.register(_profiler.stop)
+    if start:
+        _profiler.start()
+    return _profiler
+
+
+@contextmanager
+def torch_section(section):
+    """未开启分析时几乎零开销"""
+    if _profiler is None or not _profiler.running:
+        yield
+        return
+    with _profiler.torch_section(section):
+        yield
+
+
+def add_arguments(parser):
+    """main.py / headless.py 共用的命令行参数"""
+    parser.add_argument("--profile", action="store_true",
+                        help="启动即开始采样分析（运行中可用 SIGUSR1 / F9 开关）")
+    parser.add_argument("--profile-rate", type=int, default=SAMPLE_RATE_HZ,
+                        help=f"每秒采样次数，默认 {SAMPLE_RATE_HZ}")
+    parser.add_argument("--profile-dir", default=PROFILE_DIR,
+                        help=f"分析结果输出目录，默认 {PROFILE_DIR}")
+    parser.add_argument("--profile-threads", default=None,
+                        help="只采样这些线程名前缀（逗号分隔），默认全部线程")
+    parser.add_argument("--profile-torch", action="store_true",
+                        help="同时记录 ASR / MT 每次调用的 torch 算子耗时")
+
+
+def configure_from_args(args):
+    threads = args.profile_threads.split(",") if args.profile_threads else None
+    return configure(args.profile_rate, args.profile_dir, threads, args.profile_torch,
+                     start=args.profile)
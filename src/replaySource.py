@@ -0,0 +1,69 @@
+# replaySource.py
+"""
+文件回放音源：把录音文件当作麦克风/扬声器回环，按 1× 或 N× 实时速度送进音频队列，
+接口与 audioRecorder 里的录音器相同（source_name、SAMPLE_RATE、record_into_queue），
+可以在没有声卡的机器上复现同一段输入。
+"""
+import threading
+from datetime import datetime, timezone
+
+import custom_speech_recognition as sr
+from custom_speech_recognition import dsp
+from audioFormat import SAMPLE_RATE
+from captureGate import SpeechGate, HOP_DURATION
+
+
+def load_fixture(path, sample_rate=SAMPLE_RATE):
+    """读取 WAV/AIFF，返回 sample_rate 单声道 float32"""
+    with sr.AudioFile(path) as source:
+        pcm = dsp.to_float32(source.stream.read(-1), source.SAMPLE_WIDTH)
+        rate = source.SAMPLE_RATE
+    return dsp.resample(pcm, rate, sample_rate) if rate != sample_rate else pcm
+
+
+class ReplayRecorder:
+    """
+    与流式录音器相同的路径回放：stream_in_background 读文件，每 hop_duration 秒（媒体时间）一块，
+    经 SpeechGate 重采样、VAD 过滤后入队。
+    时间戳取媒体时间轴（start_time + 偏移），N× 回放时短语间隔判断与 1× 相同；
+    capture_time() 把媒体时间换算回这一块在回放中实际“被采集”的时刻。
+    """
+    SAMPLE_RATE = SAMPLE_RATE
+    SAMPLE_WIDTH = 2
+    channels = 1
+
+    def __init__(self, path, source_name, speed=1.0, vad_backend="energy"):
+        self.path = path
+        self.source_name = source_name
+        self.speed = speed
+        self.pcm = load_fixture(path, self.SAMPLE_RATE)
+        self.duration = len(self.pcm) / float(self.SAMPLE_RATE)
+        self.vad = sr.load_vad(vad_backend)
+        if self.vad:
+            # 相当于录音器启动时的环境噪声校准
+            self.vad.update_noise(self.pcm[:self.SAMPLE_RATE], self.SAMPLE_RATE)
+        self.dropped_phrases = 0
+        self.start_time = None
+        self.done = threading.Event()
+
+    def capture_time(self, t):
+        """媒体时间戳（epoch 秒）→ 回放中对应样本送出的实际时刻"""
+        return self.start_time + (t - self.start_time) / self.speed
+
+    def record_into_queue(self, audio_queue, streaming=True, hop_duration=HOP_DURATION):
+        """后台线程回放整个文件，返回停止函数；放完后 done 被置位"""
+        gate = SpeechGate(self.vad, self.source_name, self.SAMPLE_RATE)
+
+        def on_audio(_, audio, t):
+            if self.start_time is None:
+                self.start_time = t  # 第一块的媒体时间即回放开始的时刻
+            x = gate.process(audio)
+            if x is None:
+                self.dropped_phrases += 1
+                return
+            ts = datetime.fromtimestamp(t, timezone.utc)
+            audio_queue.put((self.source_name, dsp.from_float32(x, self.SAMPLE_WIDTH), ts))
+
+        return sr.Recognizer().stream_in_background(
+            sr.AudioFile(self.path), on_audio, hop_duration=hop_duration, speed=self.speed,
+            on_end=self.done.set, thread_name=f"replay-{self.source_name}")
@@ -0,0 +1,77 @@
+# startup.py
+"""
+启动加速：ASR、MT 模型并行加载，加载完各做一次预热推理（触发算子初始化、
+内存分配和 JIT），首句话不再承担这部分延迟；同时记录各步骤耗时。
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+STARTUP_SECONDS = metrics.gauge("startup_seconds", "启动各步骤耗时", ("step",))
+
+
+class StartupTimer:
+    """记录各启动步骤耗时（线程安全），结束时打印一行明细"""
+    def __init__(self):
+        self.start = time.monotonic()
+        self.steps = {}
+        self.results = {}  # load_models 的 extra_tasks 返回值，{步骤名: 结果}
+        self._lock = threading.Lock()
+
+    def run(self, step, fn, *args, **kwargs):
+        t0 = time.monotonic()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.monotonic() - t0
+            with self._lock:
+                self.steps[step] = elapsed
+            STARTUP_SECONDS.set(elapsed, step=step)
+
+    def total(self):
+        return time.monotonic() - self.start
+
+    def report(self):
+        total = self.total()
+        STARTUP_SECONDS.set(total, step="total")
+        with self._lock:
+            parts = [f"{step} {sec:.2f}s" for step, sec in self.steps.items()]
+        return "[startup] " + " | ".join(parts + [f"total {total:.2f}s"])
+
+
+def _load_and_warm(timer, name, load, warmup):
+    model = timer.run(f"{name}_load", load)
+    if warmup and model is not None:
+        timer.run(f"{name}_warmup", model.warmup)
+    return model
+
+
+def load_models(series, model_name, mt_backend=None, mt_model=None, device=None,
+                warmup=True, timer=None, extra_tasks=None, precision="fp32"):
+    """
+    并行加载 ASR 与（可选的）翻译模型并预热，返回 (asr_model, translator, timer)。
+    precision: CPU 推理精度 fp32 / int8 / bf16，ASR 与 MT 共用。
+    extra_tasks: {步骤名: 无参函数}，与模型加载同时执行（如环境噪声校准），
+    结果放在 timer.results 里。
+    """
+    from transcriberModels import load_asr_model
+    timer = timer or StartupTimer()
+
+    def load_translator():
+        from translator import Translator
+        return Translator(mt_backend, mt_model, precision=precision)
+
+    # 模型加载大部分时间在读文件、反序列化权重和 torch 初始化，多线程可以重叠
+    with ThreadPoolExecutor(max_workers=2 + len(extra_tasks or {}),
+                            thread_name_prefix="startup") as pool:
+        f_asr = pool.submit(_load_and_warm, timer, "asr",
+                            lambda: load_asr_model(series, model_name, device, precision), warmup)
+        f_mt = pool.submit(_load_and_warm, timer, "mt", load_translator, warmup) if mt_backend else None
+        f_extra = {step: pool.submit(timer.run, step, fn)
+                   for step, fn in (extra_tasks or {}).items()}
+        asr_model = f_asr.result()
+        translator = f_mt.result() if f_mt else None
+        timer.results.update((step, f.result()) for step, f in f_extra.items())
+    return asr_model, translator, timer
@@ -0,0 +1,66 @@
+# streamingASR.py
+import re
+
+from audioFormat import SAMPLE_RATE
+
+# 未确认尾部最多保留的秒数；超过后强制确认，单次 ASR 的输入长度因此有上界
+STREAM_WINDOW = 12.0
+
+_NORM_RE = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def _norm(text):
+    """比较假设时忽略大小写、空格和标点"""
+    return _NORM_RE.sub("", text.lower()) or text.strip()
+
+
+class StreamingDecoder:
+    """
+    单个音源的增量识别状态。
+    相邻两次假设中一致的前缀视为稳定并确认（LocalAgreement），
+    确认部分对应的音频从缓存中丢掉，之后只重新解码未确认的尾部。
+    """
+    def __init__(self, asr_model, language="auto", window=STREAM_WINDOW):
+        self.asr_model = asr_model
+        self.language = language
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.committed = ""   # 当前短语中已确认的文本
+        self.tentative = []   # 上一次假设里尚未确认的单元文本
+        self.newly_committed = []  # 最近一次 step 新确认的单元 (文本, 起, 止)，时间相对本次输入
+        self.tentative_units = []  # 未确认的单元，时间相对丢弃后的缓存起点；短语结束时整体确认
+
+    def step(self, pcm):
+        """
+        pcm: 当前未确认部分的音频（16 kHz float32）。
+        返回 (已确认文本, 未确认文本, 可以丢弃的音频秒数)。
+        """
+        duration = len(pcm) / float(SAMPLE_RATE)
+        hyp = self.asr_model.transcribe_words(pcm, SAMPLE_RATE, language=self.language)
+
+        n = 0
+        while (n < len(hyp) and n < len(self.tentative)
+               and _norm(hyp[n][0]) == _norm(self.tentative[n])):
+            n += 1
+
+        if duration > self.window:
+            # 尾部过长：确认窗口前半段内结束的单元，至少推进一个
+            keep_from = duration - self.window / 2
+            while n < len(hyp) and hyp[n][2] <= keep_from:
+                n += 1
+            if n == 0 and hyp:
+                n = max(1, len(hyp) - 1)
+
+        consumed = hyp[n - 1][2] if n else 0.0
+        if duration > self.window and not hyp:
+            consumed = duration - self.window / 2   # 长时间无识别结果，直接丢掉前半段
+        consumed = min(consumed, duration)
+
+        self.committed += "".join(u[0] for u in hyp[:n])
+        self.tentative = [u[0] for u in hyp[n:]]
+        self.newly_committed = hyp[:n]
+        # 丢弃已确认音频后，未确认单元的时间改为相对剩余缓存的起点
+        self.tentative_units = [(t, s - consumed, e - consumed) for t, s, e in hyp[n:]]
+        return self.committed, "".join(self.tentative), consumed
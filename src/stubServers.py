@@ -0,0 +1,191 @@
+# stubServers.py
+"""
+本地桩服务：代替 LLM（OpenAI 兼容的 /v1/chat/completions，支持 "stream": true 的 SSE 输出）
+和 GPT-SoVITS TTS（/tts，支持 streaming_mode=true 的分块 WAV 输出），
+供基准测试和无网络环境驱动 GPTResponder。可配置固定延迟，记录每次请求的耗时。
+"""
+import io
+import json
+import struct
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class _StubServer:
+    """在后台线程里跑一个 ThreadingHTTPServer，端口为 0 时自动分配"""
+    def __init__(self, handler_cls, host="127.0.0.1", port=0, delay=0.0):
+        self.delay = delay
+        self.connections = 0   # 建立过的 TCP 连接数，用于确认客户端复用了连接
+        self.aborted = 0       # 流式输出中途被客户端断开的次数
+        self.requests = 0
+        self._lock = threading.Lock()
+        handler = type(handler_cls.__name__, (handler_cls,), {"stub": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever,
+                                        name=f"stub-{handler_cls.__name__}", daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self):
+        with self._lock:
+            self.requests += 1
+            return self.requests
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # 支持 keep-alive，与真实服务一致
+    stub = None
+
+    def setup(self):
+        super().setup()
+        with self.stub._lock:
+            self.stub.connections += 1
+
+    def log_message(self, format, *args):
+        pass  # 不往 stderr 刷访问日志
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+class _LLMHandler(_Handler):
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        n = self.stub.count()
+        time.sleep(self.stub.delay)
+        content = f"[stub response {n}: {len(payload.get('messages', []))} messages]"
+        if payload.get("stream"):
+            return self._stream(n, payload, content)
+        body = json.dumps({
+            "id": f"stub-{n}",
+            "object": "chat.completion",
+            "model": payload.get("model", "stub"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+        }).encode("utf-8")
+        self._send(200, body, "application/json")
+
+    def _stream(self, n, payload, content):
+        """按词切成多个 chat.completion.chunk 事件，分块传输，词之间间隔 token_delay"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        pieces = [w + " " for w in content.split(" ")]
+        pieces[-1] = pieces[-1].rstrip()
+        try:
+            for i, piece in enumerate(pieces):
+                if i:
+                    time.sleep(self.stub.token_delay)
+                chunk = {
+                    "id": f"stub-{n}",
+                    "object": "chat.completion.chunk",
+                    "model": payload.get("model", "stub"),
+                    "choices": [{"index": 0, "delta": {"content": piece},
+                                 "finish_reason": "stop" if i == len(pieces) - 1 else None}],
+                }
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self._write_chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端中途断开（请求被作废），与真实服务一样停止生成
+            with self.stub._lock:
+                self.stub.aborted += 1
+            self.close_connection = True
+
+
+class _TTSHandler(_Handler):
+    def do_GET(self):
+        self.stub.count()
+        query = parse_qs(urlparse(self.path).query)
+        time.sleep(self.stub.delay)
+        if query.get("streaming_mode", ["false"])[0].lower() == "true":
+            return self._stream()
+        self._send(200, self.stub.wav, "audio/wav")
+
+    def _stream(self):
+        """
+        与 GPT-SoVITS 的流式输出相同：先发长度字段为 0 的 WAV 头，
+        再按 chunk_seconds 分块发 PCM，块之间间隔 chunk_delay 模拟边合成边返回。
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/wav")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        stub = self.stub
+        header = bytearray(stub.wav[:44])
+        header[4:8] = struct.pack("<I", 36)
+        header[40:44] = struct.pack("<I", 0)
+        pcm = stub.wav[44:]
+        step = int(stub.sample_rate * stub.chunk_seconds) * 2
+        try:
+            self._write_chunk(bytes(header))
+            for i in range(0, len(pcm), step):
+                if i:
+                    time.sleep(stub.chunk_delay)
+                self._write_chunk(pcm[i:i + step])
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+
+class StubLLMServer(_StubServer):
+    """
+    OpenAI 兼容的聊天接口，回复中带请求序号和消息条数。
+    delay 为首个 token 之前的延迟，token_delay 为流式输出时相邻两块之间的间隔。
+    """
+    def __init__(self, host="127.0.0.1", port=0, delay=0.0, token_delay=0.0):
+        super().__init__(_LLMHandler, host, port, delay)
+        self.token_delay = token_delay
+
+    @property
+    def url(self):
+        return self.base_url + "/v1/chat/completions"
+
+
+class StubTTSServer(_StubServer):
+    """
+    GPT-SoVITS 风格的 /tts 接口，返回一段固定时长的静音 WAV。
+    delay 为开始返回数据前的延迟；流式模式下每 chunk_seconds 的音频一块，块间隔 chunk_delay。
+    """
+    def __init__(self, host="127.0.0.1", port=0, delay=0.0, audio_seconds=1.0,
+                 sample_rate=32000, chunk_seconds=0.2, chunk_delay=0.0):
+        super().__init__(_TTSHandler, host, port, delay)
+        self.sample_rate = sample_rate
+        self.chunk_seconds = chunk_seconds
+        self.chunk_delay = chunk_delay
+        buf = io.BytesIO()
+        with wave.open(buf, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(sample_rate)
+            wf.writeframes(b"\x00\x00" * int(sample_rate * audio_seconds))
+        self.wav = buf.getvalue()
+
+    @property
+    def url(self):
+        return self.base_url + "/tts"
@@ -1,9 +1,17 @@
 # transcriberModels.py
+import dataclasses
 import os
+import re
 import sys
+import numpy as np
 import torch
 import whisper
+from whisper.tokenizer import get_tokenizer
 from funasr import AutoModel
+
+from custom_speech_recognition.vad import load_vad
+from audioFormat import SAMPLE_RATE
+import precision as prec
 # from funasr.utils.postprocess_utils import rich_transcription_postprocess
 
 def resource_path(relative_path):
@@ -14,28 +22,221 @@ def resource_path(relative_path):
     base_path = getattr(sys, '_MEIPASS', os.path.abspath(os.path.dirname(__file__)))
     return os.path.join(base_path, relative_path)
 
+# 长录音离线识别：按 VAD 切成不超过 LONG_WINDOW 秒的独立窗口，每 LONG_BATCH 个窗口一次前向
+LONG_WINDOW = 30.0
+LONG_BATCH  = 8
+
+# 英文按空格切词，中日文按标点切句；保留前导空格便于直接拼接
+_UNIT_RE = re.compile(r"\s*[^\s。！？，、；,.!?;]+[。！？，、；,.!?;]*")
+
+
+def split_units(text, start, end):
+    """
+    把一段带起止时间的文本切成更细的单元 [(text, start, end)]，
+    单元时间按字符数在 [start, end] 内线性分配。
+    """
+    pieces = _UNIT_RE.findall(text) or ([text] if text.strip() else [])
+    total = sum(len(p) for p in pieces) or 1
+    units, t = [], start
+    for p in pieces:
+        t_end = t + (end - start) * len(p) / total
+        units.append((p, t, t_end))
+        t = t_end
+    return units
+
+
+def load_audio(file_path):
+    """用 ffmpeg 把任意格式的音频文件解码成 16 kHz 单声道 float32"""
+    return whisper.load_audio(file_path, sr=SAMPLE_RATE)
+
+
+def plan_windows(segments, n_samples, max_samples):
+    """
+    把 VAD 语音段 [(start, end)] 打包成不超过 max_samples 的窗口。
+    相邻语音段尽量放进同一窗口（中间的静音一并保留，时间轴不变），
+    单个语音段过长时按 max_samples 硬切。
+    """
+    windows = []
+    for s, e in segments:
+        e = min(e, n_samples)
+        if windows and e - windows[-1][0] <= max_samples:
+            windows[-1][1] = e
+            continue
+        while e - s > max_samples:
+            windows.append([s, s + max_samples])
+            s += max_samples
+        windows.append([s, e])
+    return [(s, e) for s, e in windows if e > s]
+
+
 class BaseASRModel:
     """ASR 模型统一接口"""
-    def transcribe(self, file_path, language="auto"):
+    # transcribe_words_batch 单条输入的最长秒数，None 表示不限
+    max_window = None
+
+    def transcribe(self, file_path, language="auto", vad_windows=False):
+        """
+        识别整个音频文件。vad_windows=True 时改走 transcribe_long：按 VAD 窗口批量解码，
+        速度快，但能量 VAD 判为静音的轻声片段不会被识别。
+        """
+        raise NotImplementedError
+
+    def transcribe_array(self, pcm, sample_rate=SAMPLE_RATE, language="auto"):
+        """
+        直接识别内存中的音频，不落盘、不启动 ffmpeg。
+        pcm: 16 kHz 单声道 float32 的 numpy 数组
+        """
         raise NotImplementedError
 
+    def transcribe_words(self, pcm, sample_rate=SAMPLE_RATE, language="auto"):
+        """
+        带时间戳的识别结果 [(text, start, end)]，时间单位为秒、相对于 pcm 起点。
+        供流式增量识别判断哪些前缀已经稳定。默认整段作为一个单元。
+        """
+        text = self.transcribe_array(pcm, sample_rate, language)
+        return split_units(text, 0.0, len(pcm) / float(sample_rate))
+
+    def transcribe_words_batch(self, pcms, sample_rate=SAMPLE_RATE, language="auto"):
+        """一批片段一起识别，返回与输入一一对应的单元列表；默认逐条识别"""
+        return [self.transcribe_words(p, sample_rate, language) for p in pcms]
+
+    def warmup(self, seconds=1.0):
+        """用一小段低电平噪声跑一次识别，提前完成算子初始化和内存分配，首句不再变慢"""
+        rng = np.random.default_rng(0)
+        pcm = (rng.standard_normal(int(seconds * SAMPLE_RATE)) * 1e-3).astype(np.float32)
+        self.transcribe_words(pcm, SAMPLE_RATE)
+
+    def transcribe_long(self, pcm, sample_rate=SAMPLE_RATE, language="auto",
+                        batch_size=LONG_BATCH, window=LONG_WINDOW, vad=None):
+        """
+        长录音离线识别：VAD 切出互相独立的窗口，每 batch_size 个窗口一起识别，
+        再把各窗口的单元按窗口起点平移回全局时间轴。
+        VAD 判为静音的部分不送进模型，电平很低的语音可能因此漏识。
+        返回 [(text, start, end)]，时间单位为秒、相对于 pcm 起点。
+        """
+        vad = vad or load_vad("energy")
+        vad.update_noise(pcm, sample_rate)
+        segments = vad.speech_segments(pcm, sample_rate)
+        if self.max_window:
+            window = min(window, self.max_window)
+        windows = plan_windows(segments, len(pcm), int(window * sample_rate))
+        units = []
+        for i in range(0, len(windows), batch_size):
+            batch = windows[i:i + batch_size]
+            results = self.transcribe_words_batch([pcm[s:e] for s, e in batch],
+                                                  sample_rate, language)
+            for (s, _), window_units in zip(batch, results):
+                t0 = s / float(sample_rate)
+                units += [(text, t0 + start, t0 + end) for text, start, end in window_units]
+        return units
+
 class WhisperASR(BaseASRModel):
-    def __init__(self, model_name="small", device=None):
+    max_window = 30.0  # 一次 decode 的 mel 固定 30 s
+
+    def __init__(self, model_name="small", device=None, precision="fp32"):
         if device is None:
             device = "cuda:0" if torch.cuda.is_available() else "cpu"
         # 从 models/whisper/*.pt 加载
         model_rel = os.path.join("models", "whisper", f"{model_name}.pt")
         model_path = resource_path(model_rel)
-        self.model = whisper.load_model(model_path, device=device)
+        self.precision = prec.resolve(precision, device)
+        if self.precision == "int8":
+            # 量化后的模型缓存在 models/quantized/，之后启动直接加载
+            # 缓存带上 ModelDimensions，命中时按维度直接建结构，不读 fp32 的 .pt
+            self.model = prec.load_int8_cached(
+                model_path, lambda: whisper.load_model(model_path, device="cpu"),
+                skeleton=lambda dims: whisper.model.Whisper(whisper.model.ModelDimensions(**dims)),
+                describe=lambda model: dataclasses.asdict(model.dims))
+        else:
+            self.model = whisper.load_model(model_path, device=device)
+        if self.precision == "bf16":
+            # 编码器在 autocast 下输出 bf16，decode 要求 fp32 的 audio features
+            self.model.encoder.register_forward_hook(lambda m, i, out: out.float())
+        self.fp16 = self.model.device.type == "cuda"
+
+    def transcribe(self, file_path, language="auto", vad_windows=False):
+        pcm = load_audio(file_path)
+        if vad_windows:
+            # 整个文件按 VAD 窗口批量解码，代替 whisper.transcribe 逐个 30 s 滑窗
+            units = self.transcribe_long(pcm, language=language)
+            return "".join(u[0] for u in units).strip()
+        return self.transcribe_array(pcm, language=language)
 
-    def transcribe(self, file_path, language="auto"):
-        result = self.model.transcribe(file_path, language=language, task="transcribe")
+    def transcribe_array(self, pcm, sample_rate=SAMPLE_RATE, language="auto"):
+        # whisper 只接受 16k 的数组，ndarray 会被 torch.from_numpy 直接复用内存
+        if sample_rate != SAMPLE_RATE:
+            raise ValueError(f"Whisper 需要 {SAMPLE_RATE} Hz 音频，收到 {sample_rate} Hz")
+        with prec.autocast(self.precision):
+            result = self.model.transcribe(
+                pcm,
+                language=None if language == "auto" else language,
+                task="transcribe"
+            )
         return result.get("text", "").strip()
 
+    def transcribe_words(self, pcm, sample_rate=SAMPLE_RATE, language="auto"):
+        return self.transcribe_words_batch([pcm], sample_rate, language)[0]
+
+    def transcribe_words_batch(self, pcms, sample_rate=SAMPLE_RATE, language="auto"):
+        # 流式窗口不超过 30 s，每条补齐到 30 s 后拼成一个 batch，一次 decode 完成；
+        # 省掉 transcribe 的滑窗和回退循环
+        if sample_rate != SAMPLE_RATE:
+            raise ValueError(f"Whisper 需要 {SAMPLE_RATE} Hz 音频，收到 {sample_rate} Hz")
+        limit = int(self.max_window * SAMPLE_RATE)
+        if any(len(p) > limit for p in pcms):
+            # pad_or_trim 会直接截掉 30 s 以后的音频，超长的单独按 VAD 窗口识别
+            short = [p for p in pcms if len(p) <= limit]
+            results = iter(self.transcribe_words_batch(short, sample_rate, language)
+                           if short else [])
+            return [next(results) if len(p) <= limit
+                    else self.transcribe_long(p, sample_rate, language) for p in pcms]
+        mel = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(p)),
+                                        self.model.dims.n_mels)
+            for p in pcms
+        ]).to(self.model.device)
+        options = whisper.DecodingOptions(
+            task="transcribe",
+            language=None if language == "auto" else language,
+            without_timestamps=False,
+            fp16=self.fp16
+        )
+        with prec.autocast(self.precision):
+            results = whisper.decode(self.model, mel, options)
+        return [self._result_units(r, len(p) / SAMPLE_RATE) for r, p in zip(results, pcms)]
+
+    def _result_units(self, result, duration):
+        # 与 whisper.transcribe 相同的静音判定，避免静音段幻觉
+        if result.no_speech_prob > 0.6 and result.avg_logprob < -1.0:
+            return []
+        tokenizer = get_tokenizer(
+            self.model.is_multilingual,
+            num_languages=self.model.num_languages,
+            language=result.language,
+            task="transcribe"
+        )
+        # 时间戳 token 成对出现：<|t0|> 文本 <|t1|>，每格 20 ms
+        units, start, text_tokens = [], None, []
+        for tok in result.tokens:
+            if tok >= tokenizer.timestamp_begin:
+                t = (tok - tokenizer.timestamp_begin) * 0.02
+                if start is not None and text_tokens:
+                    units += split_units(tokenizer.decode(text_tokens), start, min(t, duration))
+                    text_tokens, start = [], None
+                else:
+                    start = t
+            else:
+                text_tokens.append(tok)
+        if text_tokens:  # 最后一段未闭合，结束时间取音频末尾
+            units += split_units(tokenizer.decode(text_tokens), start or 0.0, duration)
+        return units
+
 class FunASR(BaseASRModel):
-    def __init__(self, model_name="paraformer-speech_68m", device=None):
+    def __init__(self, model_name="paraformer-speech_68m", device=None, precision="fp32"):
         if device is None:
             device = "cuda:0" if torch.cuda.is_available() else "cpu"
+        if precision != "fp32":
+            print(f"[precision] FunASR 暂不支持 {precision}，使用 fp32")
         # 模型目录：models/funasr/<model_name>/
         base_rel = os.path.join("models", "funasr", model_name)
         base_path = resource_path(base_rel)
@@ -49,9 +250,39 @@ class FunASR(BaseASRModel):
             trust_remote_code=True
         )
 
-    def transcribe(self, file_path, language="auto"):
-        # funasr 不需要 language 参数，直接 decode
-        res = self.model.generate(input=file_path)
+    def transcribe(self, file_path, language="auto", vad_windows=False):
+        # funasr 不需要 language 参数
+        if vad_windows:
+            # 长文件切成窗口后按列表批量 generate
+            units = self.transcribe_long(load_audio(file_path), language=language)
+            return "".join(u[0] for u in units).strip()
+        return self._result_text(self.model.generate(input=file_path))
+
+    def transcribe_array(self, pcm, sample_rate=SAMPLE_RATE, language="auto"):
+        # funasr 可直接吃 numpy 数组，fs 告诉它采样率
+        res = self.model.generate(input=pcm, fs=sample_rate)
+        return self._result_text(res)
+
+    def transcribe_words(self, pcm, sample_rate=SAMPLE_RATE, language="auto"):
+        return self.transcribe_words_batch([pcm], sample_rate, language)[0]
+
+    def transcribe_words_batch(self, pcms, sample_rate=SAMPLE_RATE, language="auto"):
+        # generate 接受列表输入，结果按输入顺序返回；VAD 切出的每句带毫秒级起止时间
+        res = self.model.generate(input=list(pcms), fs=sample_rate, sentence_timestamp=True)
+        return [self._result_units([r], len(p) / float(sample_rate))
+                for r, p in zip(res, pcms)]
+
+    def _result_units(self, res, duration):
+        sentences = res[0].get("sentence_info")
+        if not sentences:
+            return split_units(self._result_text(res), 0.0, duration)
+        units = []
+        for sent in sentences:
+            units += split_units(sent["text"], sent["start"] / 1000.0, sent["end"] / 1000.0)
+        return units
+
+    @staticmethod
+    def _result_text(res):
         if res and "text" in res[0]:
             text = res[0]["text"].strip()
             # 如果需要后处理：
@@ -59,14 +290,14 @@ class FunASR(BaseASRModel):
             return text
         return ""
 
-def load_asr_model(series, model_name, device=None):
+def load_asr_model(series, model_name, device=None, precision="fp32"):
     """
-    工厂方法：根据系列名加载模型
+    工厂方法：根据系列名加载模型；precision 见 precision.PRECISIONS（仅 CPU 生效）
     """
     series = series.lower()
     if series == "whisper":
-        return WhisperASR(model_name, device)
+        return WhisperASR(model_name, device, precision)
     elif series == "funasr":
-        return FunASR(model_name, device)
+        return FunASR(model_name, device, precision)
     else:
         raise ValueError(f"Unknown ASR series: {series}")
@@ -1,6 +1,16 @@
 # translator.py
 import os
 import sys
+import time
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import metrics
+import precision as prec
+import profiler
+
 import torch
 from transformers import (
     MarianMTModel, MarianTokenizer,
@@ -15,45 +25,226 @@ def resource_path(relative_path):
     return os.path.join(base, relative_path)
 
 
+CACHE_SIZE = 512  # 缓存的译文条数，0 表示关闭缓存
+MAX_BATCH  = 8    # 单次 generate 最多翻译的句子数
+BATCH_WAIT = 0.01 # 微批处理：第一条请求到达后最多再等多久（秒）
+
+MT_SECONDS = metrics.histogram("mt_generate_seconds", "一次 generate 的耗时", ("backend",))
+MT_BATCH = metrics.histogram("mt_batch_size", "一次 generate 翻译的句子数", ("backend",),
+                             buckets=metrics.SIZE_BUCKETS)
+MT_ERRORS = metrics.counter("mt_errors_total", "翻译出错次数", ("backend",))
+MT_CACHE_HITS = metrics.counter("mt_cache_hits_total", "译文缓存命中次数", ("backend",))
+MT_CACHE_MISSES = metrics.counter("mt_cache_misses_total", "译文缓存未命中次数", ("backend",))
+MT_CACHE_HIT_RATE = metrics.gauge("mt_cache_hit_rate", "译文缓存命中率", ("backend",))
+
+
+class TranslationCache:
+    """线程安全的 LRU 译文缓存，带命中/未命中计数"""
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(backend, lang_pair, text):
+        # 只做空白归一化，大小写和标点会影响译文，保留原样
+        return backend, lang_pair, " ".join(text.split())
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+
 class Translator:
-    def __init__(self, mt_backend, mt_model_name):
+    def __init__(self, mt_backend, mt_model_name, cache_size=CACHE_SIZE,
+                 max_batch=MAX_BATCH, precision="fp32"):
         self.mt_backend = mt_backend.lower()
+        self.lang_pair = mt_model_name
+        self.label = f"{self.mt_backend}:{self.lang_pair}"
+        self.cache = TranslationCache(cache_size)
+        self.max_batch = max_batch
+        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.precision = prec.resolve(precision, self.device)
         if self.mt_backend == "helsinki":
             path = resource_path(
                 os.path.join("models", "Helsinki-NLP", f"opus-mt-{mt_model_name}")
             )
             self.tok = MarianTokenizer.from_pretrained(path)
-            self.model = MarianMTModel.from_pretrained(path)
+            model_cls = MarianMTModel
         else:  # m2m100
             self.src_lang, self.tgt_lang = mt_model_name.split("-")
             path = resource_path(os.path.join("models", "m2m100_418M"))
             self.tok = M2M100Tokenizer.from_pretrained(path)
-            self.model = M2M100ForConditionalGeneration.from_pretrained(path)
+            model_cls = M2M100ForConditionalGeneration
 
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        if self.precision == "int8":
+            # 量化后的模型缓存在 models/quantized/，之后启动直接加载
+            # 命中缓存时只按目录里的 config 建结构，不读 fp32 权重
+            self.model = prec.load_int8_cached(
+                path, lambda: model_cls.from_pretrained(path),
+                skeleton=lambda _: model_cls(model_cls.config_class.from_pretrained(path)))
+        else:
+            self.model = model_cls.from_pretrained(path)
         self.model.to(self.device)
         if self.device.type == "cuda":  # 仅 GPU 下启用半精度
             self.model.half()
+        elif self.precision == "bf16":
+            self.model.to(torch.bfloat16)
+
+    def warmup(self):
+        """跑一次不进缓存的 generate，提前完成算子初始化"""
+        self._generate(["Hello."])
 
     def translate(self, text: str) -> str:
         if not text.strip():
             return ""
+        return self.translate_batch([text])[0]
 
-        try:
-            if self.mt_backend == "helsinki":
-                inputs = self.tok([text], return_tensors="pt", padding=True)
-                inputs = {k: v.to(self.device) for k, v in inputs.items()}
-                gen = self.model.generate(**inputs)
-                return self.tok.decode(gen[0], skip_special_tokens=True)
+    def translate_batch(self, texts):
+        """
+        批量翻译，返回与输入一一对应的译文。
+        先查缓存并去重，剩余句子按长度排序分桶，每桶一次带 padding 的 generate。
+        """
+        results = [""] * len(texts)
+        pending = {}  # 缓存 key -> 需要这条译文的下标
+        hits = misses = 0
+        for i, text in enumerate(texts):
+            if not text.strip():
+                continue
+            key = TranslationCache.make_key(self.mt_backend, self.lang_pair, text)
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[i] = cached
+                hits += 1
             else:
-                self.tok.src_lang = self.src_lang
-                inputs = self.tok([text], return_tensors="pt", padding=True)
-                inputs = {k: v.to(self.device) for k, v in inputs.items()}
-                gen = self.model.generate(
-                    **inputs,
-                    forced_bos_token_id=self.tok.get_lang_id(self.tgt_lang)
-                )
-                return self.tok.batch_decode(gen, skip_special_tokens=True)[0]
+                pending.setdefault(key, []).append(i)
+                misses += 1
+        # 直接记录数值，指标不持有 Translator 的引用
+        MT_CACHE_HITS.inc(hits, backend=self.label)
+        MT_CACHE_MISSES.inc(misses, backend=self.label)
+        MT_CACHE_HIT_RATE.set(self.cache.stats()["hit_rate"], backend=self.label)
+
+        # 长度相近的句子放进同一桶，padding 浪费最少
+        keys = sorted(pending, key=lambda k: len(k[2]))
+        for b in range(0, len(keys), self.max_batch):
+            bucket = keys[b:b + self.max_batch]
+            outputs = self._generate([k[2] for k in bucket])
+            for key, out in zip(bucket, outputs):
+                if out:  # 出错时返回空串，不缓存
+                    self.cache.put(key, out)
+                for i in pending[key]:
+                    results[i] = out
+        return results
+
+    def _generate(self, texts):
+        label = self.label
+        MT_BATCH.observe(len(texts), backend=label)
+        start = time.monotonic()
+        try:
+            with profiler.torch_section("mt"):
+                if self.mt_backend == "helsinki":
+                    inputs = self.tok(texts, return_tensors="pt", padding=True)
+                    inputs = {k: v.to(self.device) for k, v in inputs.items()}
+                    gen = self.model.generate(**inputs)
+                else:
+                    self.tok.src_lang = self.src_lang
+                    inputs = self.tok(texts, return_tensors="pt", padding=True)
+                    inputs = {k: v.to(self.device) for k, v in inputs.items()}
+                    gen = self.model.generate(
+                        **inputs,
+                        forced_bos_token_id=self.tok.get_lang_id(self.tgt_lang)
+                    )
+            return self.tok.batch_decode(gen, skip_special_tokens=True)
         except Exception as e:
+            MT_ERRORS.inc(backend=label)
             print("Translation warning:", e)
-            return ""
+            return [""] * len(texts)
+        finally:
+            MT_SECONDS.observe(time.monotonic() - start, backend=label)
+
+
+class TranslationBatcher:
+    """
+    后台微批处理：收集 BATCH_WAIT 内到达的翻译请求，统一交给 translate_batch，
+    调用方阻塞在各自的 Future 上。单进程的界面已由翻译阶段整批调用 translate_batch，
+    只有多个转写器共用一个 Translator 时（asrServer）才需要套一层。
+    """
+    def __init__(self, translator, max_wait=BATCH_WAIT):
+        self.translator = translator
+        self.max_wait = max_wait
+        self.stats = {"batches": 0, "requests": 0}
+        self._requests = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="mt-batcher", daemon=True)
+        self._thread.start()
+
+    @property
+    def max_batch(self):
+        return self.translator.max_batch
+
+    def submit(self, text):
+        fut = Future()
+        self._requests.put((text, fut))
+        return fut
+
+    def translate_batch(self, texts):
+        """与 Translator.translate_batch 相同的接口；多个调用方的句子合进同一次 generate"""
+        futures = [self.submit(t) for t in texts]
+        return [f.result() for f in futures]
+
+    def _collect(self):
+        batch = [self._requests.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.translator.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self.stats["batches"] += 1
+            self.stats["requests"] += len(batch)
+            try:
+                outputs = self.translator.translate_batch([t for t, _ in batch])
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+            else:
+                for (_, fut), out in zip(batch, outputs):
+                    fut.set_result(out)
@@ -0,0 +1,58 @@
+# wavStream.py
+"""
+流式 WAV 解析：边收数据边解析 RIFF 头，头部解析完后直接输出 PCM。
+流式 TTS 的 WAV 头里长度字段通常是占位值（0 或 0xFFFFFFFF），data 块之后的数据一律当作 PCM。
+"""
+import struct
+
+
+class WavStreamParser:
+    """
+    feed(data) 返回这次可以播放的 PCM（整帧，不足一帧的留到下次）；
+    头部还没收全时返回 b""。头部解析完成后 ready 为 True，可读取格式字段。
+    """
+    def __init__(self):
+        self.channels = None
+        self.sample_width = None
+        self.sample_rate = None
+        self.ready = False
+        self._buf = b""
+
+    @property
+    def frame_size(self):
+        return self.sample_width * self.channels
+
+    def feed(self, data):
+        self._buf += data
+        if not self.ready:
+            self._parse_header()
+            if not self.ready:
+                return b""
+        n = len(self._buf) - len(self._buf) % self.frame_size
+        pcm, self._buf = self._buf[:n], self._buf[n:]
+        return pcm
+
+    def _parse_header(self):
+        buf = self._buf
+        if len(buf) < 12:
+            return
+        if buf[:4] != b"RIFF" or buf[8:12] != b"WAVE":
+            raise ValueError("not a WAV stream")
+        pos = 12
+        while len(buf) >= pos + 8:
+            chunk_id, size = buf[pos:pos + 4], struct.unpack("<I", buf[pos + 4:pos + 8])[0]
+            body = pos + 8
+            if chunk_id == b"data":
+                if self.channels is None:
+                    raise ValueError("WAV data chunk before fmt chunk")
+                self._buf = buf[body:]
+                self.ready = True
+                return
+            if len(buf) < body + size + (size & 1):
+                return  # 这个块还没收全
+            if chunk_id == b"fmt ":
+                fmt, channels, rate, _, _, bits = struct.unpack("<HHIIHH", buf[body:body + 16])
+                if fmt not in (1, 0xFFFE):  # PCM / WAVE_FORMAT_EXTENSIBLE
+                    raise ValueError(f"unsupported WAV format {fmt}")
+                self.channels, self.sample_rate, self.sample_width = channels, rate, bits // 8
+            pos = body + size + (size & 1)  # 块按偶数字节对齐
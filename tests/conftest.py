@@ -0,0 +1,6 @@
+# conftest.py
+# 源码按 src 目录下的扁平模块组织（python main.py 在 src 里运行），测试同样从 src 导入
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
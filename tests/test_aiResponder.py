@@ -0,0 +1,147 @@
+# test_aiResponder.py
+import threading
+import time
+
+import pytest
+
+from aiResponder import GPTResponder, INITIAL_RESPONSE
+from stubServers import StubLLMServer, StubTTSServer
+
+
+def wait_for(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def tts():
+    server = StubTTSServer(audio_seconds=0.2).start()
+    yield server
+    server.close()
+
+
+def idle(responder):
+    return not responder._current_in_flight
+
+
+def test_answer_spoken_once_and_not_when_paused(tts):
+    llm = StubLLMServer().start()
+    try:
+        r = GPTResponder(llm_url=llm.url, tts_url=tts.url, play_audio=False)
+        r._start_request("hello", [True])
+        wait_for(lambda: idle(r) and tts.requests == 1)
+        assert r.response.startswith("stub response 1")
+        assert r.prev_response == r.response
+
+        # 暂停发送时只显示，不朗读
+        r._start_request("again", [False])
+        wait_for(lambda: idle(r))
+        assert r.response.startswith("stub response 2")
+        time.sleep(0.1)
+        assert tts.requests == 1
+    finally:
+        llm.close()
+
+
+def test_abandoned_stream_then_failure_restores_response(tts):
+    llm = StubLLMServer(token_delay=0.1).start()
+    try:
+        r = GPTResponder(llm_url=llm.url, tts_url=tts.url, play_audio=False)
+        r._start_request("first", [True])
+        wait_for(lambda: r.response.startswith("stub"))  # 收到半截回复
+
+        r.llm_url = "http://127.0.0.1:1/v1/chat/completions"  # 新请求会失败
+        r._start_request("second", [True])
+        assert r.response == INITIAL_RESPONSE
+        wait_for(lambda: idle(r) and llm.aborted == 1)
+        assert r.response == INITIAL_RESPONSE
+        assert tts.requests == 0
+        assert r.stats["cancelled"] == 1
+    finally:
+        llm.close()
+
+
+class FakeTranscriber:
+    def __init__(self):
+        self.transcript_changed_event = threading.Event()
+        self.text = ""
+
+    def get_transcript(self):
+        return self.text
+
+    def change(self, text):
+        self.text = text
+        self.transcript_changed_event.set()
+
+
+def start_recorded(r, tr):
+    """启动回答线程，返回记录每次请求开始时刻和内容的列表"""
+    starts = []
+    start_request = r._start_request
+
+    def record(transcript, *args):
+        starts.append((time.monotonic(), transcript))
+        start_request(transcript, *args)
+
+    r._start_request = record
+    threading.Thread(target=r.respond_to_transcriber, args=(tr, [True]), daemon=True).start()
+    return starts
+
+
+def test_debounce_is_short_and_interval_spaces_requests(tts):
+    llm = StubLLMServer().start()
+    try:
+        r = GPTResponder(llm_url=llm.url, tts_url=tts.url, play_audio=False, debounce=0.05)
+        r.response_interval = 0.5
+        tr = FakeTranscriber()
+        starts = start_recorded(r, tr)
+        t0 = time.monotonic()
+        tr.change("a")
+        wait_for(lambda: len(starts) == 1)
+        # 第一次请求只等 debounce，不等 response_interval
+        assert starts[0][0] - t0 < 0.4
+        tr.change("ab")
+        wait_for(lambda: len(starts) == 2)
+        assert starts[1][0] - starts[0][0] >= 0.49
+    finally:
+        llm.close()
+
+
+def test_changes_inside_quiet_window_restart_the_wait(tts):
+    llm = StubLLMServer().start()
+    try:
+        r = GPTResponder(llm_url=llm.url, tts_url=tts.url, play_audio=False,
+                         debounce=0.3, max_debounce_wait=5.0)
+        r.response_interval = 0
+        tr = FakeTranscriber()
+        starts = start_recorded(r, tr)
+        for text in ("a", "ab", "abc", "abcd", "abcde"):
+            tr.change(text)
+            time.sleep(0.1)
+        last_change = time.monotonic() - 0.1
+        wait_for(lambda: starts)
+        time.sleep(0.5)
+        assert [t for _, t in starts] == ["abcde"]
+        # 最后一次变化之后安静满 debounce 才发出
+        assert starts[0][0] - last_change >= 0.29
+    finally:
+        llm.close()
+
+
+def test_continuous_changes_are_capped_by_max_wait(tts):
+    llm = StubLLMServer().start()
+    try:
+        r = GPTResponder(llm_url=llm.url, tts_url=tts.url, play_audio=False,
+                         debounce=0.3, max_debounce_wait=0.6)
+        r.response_interval = 0
+        tr = FakeTranscriber()
+        starts = start_recorded(r, tr)
+        t0 = time.monotonic()
+        for i in range(30):  # 1.5 s 内一直在变
+            tr.change("x" * (i + 1))
+            time.sleep(0.05)
+        assert starts and starts[0][0] - t0 < 1.0
+    finally:
+        llm.close()
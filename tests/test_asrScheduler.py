@@ -0,0 +1,59 @@
+# test_asrScheduler.py
+import threading
+import time
+
+import numpy as np
+
+from asrScheduler import BatchASRScheduler, FairASRScheduler, SchedulerClosed
+
+
+class EchoASR:
+    """每个片段返回它的长度，记录每批的大小"""
+    def __init__(self):
+        self.batches = []
+
+    def transcribe_words_batch(self, pcms, sample_rate, language="auto"):
+        self.batches.append(len(pcms))
+        return [[(str(len(p)), 0.0, 0.1)] for p in pcms]
+
+
+def test_single_source_dispatches_without_waiting():
+    asr = EchoASR()
+    sched = BatchASRScheduler(asr, max_wait=1.0, active=lambda: 1)
+    start = time.monotonic()
+    assert sched.transcribe_words(np.zeros(10, dtype=np.float32)) == [("10", 0.0, 0.1)]
+    assert time.monotonic() - start < 0.5
+    sched.close(1.0)
+    assert not sched._thread.is_alive()
+
+
+def test_waits_for_other_active_sources():
+    asr = EchoASR()
+    sched = BatchASRScheduler(asr, max_wait=1.0, active=lambda: 2)
+    results = []
+    first = threading.Thread(target=lambda: results.append(sched.transcribe_words(np.zeros(3))))
+    first.start()
+    time.sleep(0.1)
+    results.append(sched.transcribe_words(np.zeros(5)))
+    first.join()
+    assert asr.batches == [2]
+    sched.close(1.0)
+
+
+def test_submit_after_close_fails():
+    sched = BatchASRScheduler(EchoASR())
+    sched.close(1.0)
+    fut = sched.submit(np.zeros(3))
+    assert isinstance(fut.exception(), SchedulerClosed)
+
+
+def test_fair_scheduler_single_session_and_close():
+    asr = EchoASR()
+    sched = FairASRScheduler(asr, max_wait=1.0)
+    view = sched.session("a")
+    start = time.monotonic()
+    assert view.transcribe_words(np.zeros(7)) == [("7", 0.0, 0.1)]
+    assert time.monotonic() - start < 0.5
+    sched.close_session("a")
+    sched.close(1.0)
+    assert not sched._thread.is_alive()
@@ -0,0 +1,124 @@
+# test_audioTranscriber.py
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from audioTranscriber import AudioTranscriber, PHRASE_TIMEOUT, _merge_chunks
+from custom_speech_recognition import dsp
+
+
+class OneWordASR:
+    def transcribe_words_batch(self, pcms, sample_rate, language="auto"):
+        return [[(" word", 0.0, 0.1)] for _ in pcms]
+
+
+class SlowTranslator:
+    """每批固定耗时，翻译队列一定会积压"""
+    def __init__(self, max_batch, delay):
+        self.max_batch = max_batch
+        self.delay = delay
+
+    def translate_batch(self, texts):
+        time.sleep(self.delay)
+        return [t.upper() for t in texts]
+
+
+class Format:
+    SAMPLE_RATE = 16000
+    SAMPLE_WIDTH = 2
+    channels = 1
+
+
+@pytest.mark.parametrize("max_batch", [1, 4])
+def test_segments_survive_a_backlogged_translator(max_batch):
+    transcriber = AudioTranscriber(None, None, OneWordASR(),
+                                   SlowTranslator(max_batch, 0.01),
+                                   extra_sources={"input": Format})
+    segments = []
+    transcriber.add_segment_listener(segments.append)
+    transcriber.start()
+    chunk = dsp.from_float32(np.zeros(1600, dtype=np.float32))
+    t0 = datetime.now(timezone.utc)
+    phrases = 40
+    for i in range(phrases):
+        # 相邻两块间隔超过 PHRASE_TIMEOUT，每块都是一个新短语
+        transcriber.feed("input", chunk, t0 + timedelta(seconds=i * (PHRASE_TIMEOUT + 1)))
+    transcriber.flush(10.0)
+    transcriber.stop(1.0)
+
+    assert len(segments) == phrases
+    assert all(s["translation"] == "WORD" for s in segments)
+    # 每个短语最终的译文都到了界面条目（最多保留 MAX_PHRASES 条）
+    entries = transcriber.get_transcript_entries()
+    assert entries and all(trans == "WORD" for _, _, trans, _ in entries)
+
+
+def test_clear_resets_phrase_state_on_the_asr_thread():
+    transcriber = AudioTranscriber(None, None, OneWordASR(), extra_sources={"input": Format})
+    transcriber.start()
+    chunk = dsp.from_float32(np.zeros(1600, dtype=np.float32))
+    t0 = datetime.now(timezone.utc)
+    transcriber.feed("input", chunk, t0)
+    assert transcriber.audio_sources["input"]["queue"].join(5.0)
+    # 识别结果还要经过发布阶段才上屏
+    assert transcriber.publish_queue.join(5.0)
+    src = transcriber.audio_sources["input"]
+    assert len(src["buffer"]) > 0 and transcriber.get_transcript_entries()
+
+    transcriber.clear_transcript_data()
+    # 界面立即清空，缓存和解码器留给 ASR 线程重置
+    assert transcriber.get_transcript_entries() == []
+    assert src["reset"].is_set()
+
+    transcriber.feed("input", chunk, t0 + timedelta(seconds=0.1))
+    assert transcriber.audio_sources["input"]["queue"].join(5.0)
+    assert not src["reset"].is_set()
+    assert len(src["buffer"]) == 1600
+    transcriber.flush(5.0)
+    transcriber.stop(1.0)
+    entries = transcriber.get_transcript_entries()
+    assert len(entries) == 1 and entries[0][1] == "word"
+
+
+class RegionASR:
+    """每段连续的非零音频识别成一个词，词名取自振幅，时间为它在输入里的位置"""
+    def transcribe_words_batch(self, pcms, sample_rate, language="auto"):
+        out = []
+        for pcm in pcms:
+            loud = np.concatenate(([0], (np.abs(pcm) > 0.01).astype(np.int8), [0]))
+            edges = np.flatnonzero(np.diff(loud))
+            out.append([(f" a{int(round(pcm[s] * 10))}", s / sample_rate, e / sample_rate)
+                        for s, e in zip(edges[::2], edges[1::2])])
+        return out
+
+
+def test_segment_times_span_vad_dropped_gap():
+    transcriber = AudioTranscriber(None, None, RegionASR(), extra_sources={"input": Format})
+    segments = []
+    transcriber.add_segment_listener(segments.append)
+    transcriber.start()
+    t0 = datetime.now(timezone.utc)
+    # 0-2 s 和 4-6 s 有人声，中间 2 s 静音被 VAD 丢掉（短于 PHRASE_TIMEOUT，仍是同一短语）
+    for start, amp in ((0.0, 0.1), (4.0, 0.3)):
+        for i in range(10):
+            chunk = dsp.from_float32(np.full(3200, amp, dtype=np.float32))
+            transcriber.feed("input", chunk, t0 + timedelta(seconds=start + i * 0.2))
+    transcriber.flush(5.0)
+    transcriber.stop(1.0)
+
+    spans = {s["text"]: (s["start"] - t0.timestamp(), s["end"] - t0.timestamp()) for s in segments}
+    assert set(spans) == {"a1", "a3"}
+    assert spans["a1"] == pytest.approx((0.0, 2.0), abs=0.01)
+    assert spans["a3"] == pytest.approx((4.0, 6.0), abs=0.01)
+    assert len({s["phrase"] for s in segments}) == 1
+
+
+def test_merge_chunks_only_when_contiguous():
+    t0 = datetime.now(timezone.utc)
+    a = (b"\x00" * 6400, t0, 1.0)            # 0.2 s
+    b = (b"\x01" * 6400, t0 + timedelta(seconds=0.2), 2.0)
+    c = (b"\x02" * 6400, t0 + timedelta(seconds=1.0), 3.0)
+    assert _merge_chunks(a, b, bytes_per_second=32000) == (a[0] + b[0], t0, 1.0)
+    assert _merge_chunks(b, c, bytes_per_second=32000) is None
@@ -0,0 +1,51 @@
+# test_captureGate.py
+import numpy as np
+
+from custom_speech_recognition import dsp
+from custom_speech_recognition.audio import AudioData
+from captureGate import SpeechGate
+
+
+class ScriptedVAD:
+    """按顺序返回预设的判定结果"""
+    frame_ms = 30
+
+    def __init__(self, decisions):
+        self.decisions = list(decisions)
+
+    def is_speech(self, x, sample_rate, min_speech_ms=0):
+        return self.decisions.pop(0)
+
+
+def chunk(rate=16000, seconds=0.2, channels=1):
+    x = np.full(int(rate * seconds) * channels, 0.1, dtype=np.float32)
+    return AudioData(dsp.from_float32(x), rate, 2, channels)
+
+
+def test_no_vad_passes_everything():
+    gate = SpeechGate(None, "test")
+    x = gate.process(chunk())
+    assert len(x) == 3200 and gate.dropped == 0
+
+
+def test_hangover_after_last_speech():
+    # 0.2 s 一块，拖尾 0.5 s：人声之后再送 3 块
+    gate = SpeechGate(ScriptedVAD([True] + [False] * 5), "test", hangover=0.5)
+    kept = [gate.process(chunk()) is not None for _ in range(6)]
+    assert kept == [True, True, True, True, False, False]
+    assert gate.dropped == 2
+
+
+def test_speech_restarts_hangover():
+    gate = SpeechGate(ScriptedVAD([True, False, True, False, False, False, False]), "test",
+                      hangover=0.5)
+    kept = [gate.process(chunk()) is not None for _ in range(7)]
+    assert kept == [True, True, True, True, True, True, False]
+
+
+def test_resamples_and_downmixes():
+    gate = SpeechGate(None, "test")
+    out = [gate.process(chunk(rate=48000, channels=2)) for _ in range(5)]
+    # 有状态重采样器首块会扣下几个滤波器抽头，之后每块输出与输入时长一致
+    assert all(x.dtype == np.float32 for x in out)
+    assert 0 <= 5 * 3200 - sum(len(x) for x in out) < 64
@@ -0,0 +1,108 @@
+# test_conversationContext.py
+import threading
+import time
+
+from conversationContext import ConversationContext, estimate_tokens, MESSAGE_OVERHEAD
+
+
+def wait_for(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def total_tokens(messages):
+    return sum(estimate_tokens(m["content"]) + MESSAGE_OVERHEAD for m in messages)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("你好") == 2
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+    assert estimate_tokens("你好abcd") == 3
+
+
+def test_messages_layout():
+    ctx = ConversationContext("sys", budget=1000)
+    ctx.add_turn("q1", "a1")
+    msgs = ctx.messages("q2")
+    assert [m["role"] for m in msgs] == ["system", "user", "assistant", "user"]
+    assert msgs[-1]["content"] == "q2"
+
+
+def test_folds_oldest_turns_to_stay_within_budget():
+    ctx = ConversationContext("sys", budget=60)
+    for i in range(10):
+        ctx.add_turn(f"question {i} " * 4, f"answer {i} " * 4)
+    assert ctx.tokens() <= 60
+    assert ctx.stats["folded_turns"] > 0
+    msgs = ctx.messages("next question " * 4)
+    assert total_tokens(msgs) <= 60
+    # 留下的是最新的轮次
+    assert "answer 9" in msgs[-2]["content"]
+
+
+def test_folded_turns_go_into_summary():
+    calls = []
+
+    def summarize(summary, turns):
+        calls.append(list(turns))
+        return (summary + " " if summary else "") + "+".join(u.split()[1] for u, _ in turns)
+
+    ctx = ConversationContext("sys", budget=60, summarize=summarize)
+    for i in range(6):
+        ctx.add_turn(f"question {i} " * 4, f"answer {i} " * 4)
+    wait_for(lambda: not ctx._summarizing and not ctx._pending)
+    folded = ctx.stats["folded_turns"]
+    assert folded > 0 and calls
+    assert sum(len(c) for c in calls) == folded
+    assert ctx.summary.startswith("0")
+    msgs = ctx.messages()
+    assert msgs[1] == {"role": "system", "content": f"之前对话的摘要：{ctx.summary}"}
+
+
+def test_failed_summary_keeps_turns_for_retry():
+    batches = []
+
+    def summarize(summary, turns):
+        batches.append(len(turns))
+        return None if len(batches) == 1 else "merged"  # 第一次失败
+
+    ctx = ConversationContext("sys", budget=40, summarize=summarize)
+    for i in range(4):
+        ctx.add_turn(f"question {i} " * 4, f"answer {i} " * 4)
+        wait_for(lambda: not ctx._summarizing)
+    assert ctx.stats["summary_errors"] == 1
+    # 失败那批轮次在下一次合并时一起带上
+    assert batches[1] > batches[0]
+    assert ctx.summary == "merged"
+    assert not ctx._pending
+
+
+def test_clear_discards_in_flight_summary():
+    started, release = threading.Event(), threading.Event()
+
+    def summarize(summary, turns):
+        started.set()
+        release.wait(5)
+        return "stale"
+
+    ctx = ConversationContext("sys", budget=40, summarize=summarize)
+    for i in range(3):
+        ctx.add_turn(f"question {i} " * 4, f"answer {i} " * 4)
+    assert started.wait(5)
+    ctx.clear()
+    release.set()
+    wait_for(lambda: not ctx._summarizing)
+    assert ctx.summary == ""
+    assert ctx.messages() == [{"role": "system", "content": "sys"}]
+
+
+def test_summary_is_clipped_to_its_budget():
+    ctx = ConversationContext("sys", budget=40, summarize=lambda s, turns: "摘要" * 100)
+    for i in range(3):
+        ctx.add_turn(f"question {i} " * 4, f"answer {i} " * 4)
+    wait_for(lambda: ctx.summary and not ctx._summarizing)
+    assert estimate_tokens(ctx.summary) <= ctx.summary_budget
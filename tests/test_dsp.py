@@ -0,0 +1,76 @@
+# test_dsp.py
+import numpy as np
+import pytest
+
+from custom_speech_recognition import dsp
+
+
+def sine(freq, rate, seconds=1.0, amp=0.5):
+    t = np.arange(int(rate * seconds)) / float(rate)
+    return (amp * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def peak_freq(x, rate):
+    spectrum = np.abs(np.fft.rfft(x * np.hanning(len(x))))
+    return np.argmax(spectrum) * rate / float(len(x))
+
+
+@pytest.mark.parametrize("width", [1, 2, 3, 4])
+def test_int_roundtrip(width):
+    full = 1 << (8 * width - 1)
+    x = np.array([-full, -1, 0, 1, full - 1], dtype=np.int64)
+    assert list(dsp.to_int(dsp.from_int(x, width), width)) == list(x)
+
+
+def test_float_roundtrip_and_clipping():
+    x = np.array([-1.5, -0.5, 0.0, 0.25, 1.5], dtype=np.float32)
+    y = dsp.to_float32(dsp.from_float32(x))
+    assert np.allclose(y, np.clip(x, -1.0, 32767 / 32768.0), atol=1e-4)
+
+
+def test_rms_matches_definition():
+    x = np.array([3000, -4000, 0, 1000], dtype=np.int16)
+    expected = int(np.sqrt(np.mean(x.astype(np.float64) ** 2)))
+    assert dsp.rms(x.tobytes(), 2) == expected
+    assert dsp.rms(b"", 2) == 0
+
+
+def test_downmix_and_tomono():
+    stereo = np.array([1000, 3000, -2000, 0], dtype=np.int16)
+    assert list(dsp.to_int(dsp.tomono(stereo.tobytes(), 2, 2), 2)) == [2000, -1000]
+
+
+def test_convert_width():
+    x = np.array([0x1234, -0x1234], dtype=np.int16).tobytes()
+    assert list(dsp.to_int(dsp.convert_width(x, 2, 4), 4)) == [0x12340000, -0x12340000]
+
+
+@pytest.mark.parametrize("src,dst", [(48000, 16000), (44100, 16000), (8000, 16000)])
+def test_resample_length_and_frequency(src, dst):
+    x = sine(440, src)
+    y = dsp.resample(x, src, dst)
+    assert len(y) == round(len(x) * dst / float(src))
+    assert abs(peak_freq(y, dst) - 440) < 5
+    # 通带内幅度基本不变（去掉首尾的滤波器过渡）
+    mid = y[len(y) // 4:-len(y) // 4]
+    assert abs(np.max(np.abs(mid)) - 0.5) < 0.02
+
+
+def test_resample_removes_content_above_new_nyquist():
+    y = dsp.resample(sine(12000, 48000), 48000, 16000)
+    assert np.max(np.abs(y[len(y) // 4:-len(y) // 4])) < 0.01
+
+
+def test_streaming_resampler_matches_one_shot():
+    x = sine(440, 48000)
+    r = dsp.Resampler(48000, 16000)
+    pieces = [r.process(x[i:i + 937]) for i in range(0, len(x), 937)]
+    streamed = np.concatenate(pieces + [r.flush()])
+    whole = dsp.resample(x, 48000, 16000)
+    n = len(whole)
+    assert np.allclose(streamed[:n], whole, atol=1e-5)
+
+
+def test_resampler_identity_rate():
+    x = sine(440, 16000)
+    assert np.array_equal(dsp.Resampler(16000, 16000).process(x), x)
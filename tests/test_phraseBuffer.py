@@ -0,0 +1,68 @@
+# test_phraseBuffer.py
+import numpy as np
+
+from phraseBuffer import PhraseBuffer
+
+
+def ramp(start, n):
+    return np.arange(start, start + n, dtype=np.float32)
+
+
+def test_append_and_view_are_contiguous():
+    buf = PhraseBuffer(1.0, sample_rate=10)
+    buf.append(ramp(0, 4))
+    buf.append(ramp(4, 3))
+    assert len(buf) == 7 and buf.free() == 3
+    assert list(buf.view()) == list(range(7))
+
+
+def test_view_stays_contiguous_across_wraparound():
+    buf = PhraseBuffer(1.0, sample_rate=10)
+    buf.append(ramp(0, 8))
+    buf.consume(6)
+    buf.append(ramp(8, 7))   # 写到物理末尾后绕回开头
+    assert list(buf.view()) == list(range(6, 15))
+    assert buf.dropped == 0
+
+
+def test_overflow_drops_oldest_samples():
+    buf = PhraseBuffer(1.0, sample_rate=10)
+    buf.append(ramp(0, 8))
+    buf.append(ramp(8, 5))
+    assert list(buf.view()) == list(range(3, 13))
+    assert buf.dropped == 3
+
+
+def test_chunk_longer_than_capacity_keeps_newest():
+    buf = PhraseBuffer(1.0, sample_rate=10)
+    buf.append(ramp(0, 25))
+    assert list(buf.view()) == list(range(15, 25))
+    assert buf.dropped == 15
+
+
+def test_consume_is_clamped_and_clear_resets():
+    buf = PhraseBuffer(1.0, sample_rate=10)
+    buf.append(ramp(0, 5))
+    buf.consume(100)
+    assert len(buf) == 0
+    buf.append(ramp(0, 3))
+    buf.clear()
+    assert len(buf) == 0 and buf.view().size == 0
+
+
+def test_matches_reference_under_random_use():
+    rng = np.random.default_rng(0)
+    buf = PhraseBuffer(1.0, sample_rate=64)
+    ref, counter = [], 0
+    for _ in range(500):
+        if rng.random() < 0.6:
+            n = int(rng.integers(1, 40))
+            buf.append(ramp(counter, n))
+            ref.extend(range(counter, counter + n))
+            counter += n
+            ref = ref[-64:]
+        else:
+            n = int(rng.integers(0, 30))
+            buf.consume(n)
+            ref = ref[n:]
+        assert list(buf.view()) == ref
@@ -0,0 +1,111 @@
+# test_pipeline.py
+import threading
+import time
+
+from pipeline import StageQueue, Stage, BLOCK, DROP_OLDEST, COALESCE, QUEUE_DEPTH
+
+
+def drain(q):
+    items = []
+    while q.qsize():
+        items.append(q.get())
+        q.task_done()
+    return items
+
+
+def test_drop_oldest_when_full():
+    q = StageQueue(2, DROP_OLDEST)
+    for i in range(4):
+        q.put(i)
+    assert drain(q) == [2, 3]
+    assert q.stats["dropped"] == 2
+    assert q.join(0)
+
+
+def test_coalesce_replaces_latest_item_with_same_key():
+    q = StageQueue(4, COALESCE, key=lambda item: item[0])
+    q.put(("a", 1))
+    q.put(("b", 1))
+    q.put(("a", 2))
+    assert drain(q) == [("a", 2), ("b", 1)]
+    assert q.stats["coalesced"] == 1
+
+
+def test_coalesce_with_merge_refusal_appends():
+    q = StageQueue(4, COALESCE, key=lambda item: item[0],
+                   merge=lambda old, new: None if new[1] > 5 else (old[0], old[1] + new[1]))
+    q.put(("a", 1))
+    q.put(("a", 2))
+    q.put(("a", 9))
+    assert drain(q) == [("a", 3), ("a", 9)]
+
+
+def test_overflow_skips_items_that_must_not_be_dropped():
+    q = StageQueue(3, COALESCE, key=lambda item: item[0],
+                   droppable=lambda item: item[1] == "interim")
+    q.put(("s1", "final"))
+    q.put(("h", "interim"))
+    q.put(("s2", "final"))
+    q.put(("s3", "final"))  # 挤掉唯一可丢弃的假设
+    assert [item[0] for item in drain(q)] == ["s1", "s2", "s3"]
+    assert q.stats["dropped"] == 1
+
+
+def test_overflow_blocks_when_nothing_is_droppable():
+    q = StageQueue(1, DROP_OLDEST, droppable=lambda item: False)
+    q.put("keep")
+    done = threading.Event()
+    t = threading.Thread(target=lambda: (q.put("next"), done.set()))
+    t.start()
+    assert not done.wait(0.1)
+    assert q.get() == "keep"
+    q.task_done()
+    assert done.wait(1.0)
+    assert drain(q) == ["next"]
+    assert q.stats["dropped"] == 0
+
+
+def test_block_policy_waits_for_space_and_close_releases():
+    q = StageQueue(1, BLOCK)
+    q.put(1)
+    t = threading.Thread(target=q.put, args=(2,))
+    t.start()
+    time.sleep(0.05)
+    assert q.qsize() == 1
+    q.close()
+    t.join(1.0)
+    assert not t.is_alive()
+
+
+def test_batched_stage_passes_lists_even_with_batch_size_one():
+    q = StageQueue()
+    seen = []
+    stage = Stage("test", q, seen.append, batch_size=1, batched=True)
+    stage.start()
+    q.put("a")
+    q.put("b")
+    assert q.join(1.0)
+    stage.stop(1.0)
+    assert seen == [["a"], ["b"]]
+
+
+def test_unbatched_stage_passes_single_items():
+    q = StageQueue()
+    seen = []
+    stage = Stage("test", q, seen.append)
+    stage.start()
+    q.put("a")
+    assert q.join(1.0)
+    stage.stop(1.0)
+    assert seen == ["a"]
+
+
+def test_close_unregisters_depth_gauge():
+    def depth_series():
+        return [key for _, key, _ in QUEUE_DEPTH.samples() if "test-depth" in key]
+
+    q = StageQueue(name="test-depth")
+    q.put(1)
+    assert depth_series()
+    q.close()
+    assert not depth_series()
@@ -0,0 +1,79 @@
+# test_streamingASR.py
+import numpy as np
+
+from audioFormat import SAMPLE_RATE
+from streamingASR import StreamingDecoder
+
+
+class ScriptedASR:
+    """按顺序返回预设的假设 [(文本, 起, 止)]，记录每次收到的音频长度"""
+    def __init__(self, hypotheses):
+        self.hypotheses = list(hypotheses)
+        self.calls = []
+
+    def transcribe_words(self, pcm, sample_rate, language="auto"):
+        self.calls.append(len(pcm) / float(sample_rate))
+        return self.hypotheses.pop(0)
+
+
+def pcm(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def test_commits_prefix_agreed_by_two_hypotheses():
+    asr = ScriptedASR([
+        [(" hello", 0.0, 0.4), (" wor", 0.4, 0.6)],
+        [(" hello", 0.0, 0.4), (" world", 0.4, 0.8), (" again", 0.8, 1.0)],
+    ])
+    dec = StreamingDecoder(asr)
+
+    committed, tentative, consumed = dec.step(pcm(0.6))
+    assert committed == "" and tentative == " hello wor" and consumed == 0.0
+
+    committed, tentative, consumed = dec.step(pcm(1.0))
+    assert committed == " hello"
+    assert tentative == " world again"
+    assert consumed == 0.4
+    assert dec.newly_committed == [(" hello", 0.0, 0.4)]
+    # 未确认单元的时间改为相对丢弃后的缓存起点
+    assert dec.tentative_units == [(" world", 0.0, 0.4), (" again", 0.4, 0.6)]
+
+
+def test_agreement_ignores_case_and_punctuation():
+    asr = ScriptedASR([[(" Hello,", 0.0, 0.5)], [(" hello", 0.0, 0.5), (" there", 0.5, 0.9)]])
+    dec = StreamingDecoder(asr)
+    dec.step(pcm(0.5))
+    committed, _, consumed = dec.step(pcm(0.9))
+    assert committed == " hello"
+    assert consumed == 0.5
+
+
+def test_long_tail_is_force_committed():
+    units = [(f" w{i}", i * 1.0, i * 1.0 + 1.0) for i in range(14)]
+    # 每次假设都不一样，靠窗口上限推进
+    asr = ScriptedASR([units])
+    dec = StreamingDecoder(asr, window=12.0)
+    committed, _, consumed = dec.step(pcm(14.0))
+    # 结束于 14 - 12/2 = 8 秒之前的单元被确认
+    assert committed == "".join(u[0] for u in units[:8])
+    assert consumed == 8.0
+
+
+def test_long_silence_drops_first_half_of_window():
+    asr = ScriptedASR([[]])
+    dec = StreamingDecoder(asr, window=12.0)
+    committed, tentative, consumed = dec.step(pcm(13.0))
+    assert (committed, tentative) == ("", "")
+    assert consumed == 7.0
+
+
+def test_reset_clears_phrase_state():
+    asr = ScriptedASR([[(" a", 0.0, 0.2)], [(" a", 0.0, 0.2)], [(" b", 0.0, 0.2)]])
+    dec = StreamingDecoder(asr)
+    dec.step(pcm(0.2))
+    dec.step(pcm(0.2))
+    assert dec.committed == " a"
+    dec.reset()
+    assert dec.committed == "" and dec.tentative == [] and dec.tentative_units == []
+    committed, tentative, _ = dec.step(pcm(0.2))
+    assert committed == "" and tentative == " b"
@@ -0,0 +1,87 @@
+# test_wavStream.py
+import io
+import struct
+import wave
+
+import pytest
+
+from wavStream import WavStreamParser
+
+
+def make_wav(frames, channels=1, width=2, rate=32000):
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(width)
+        wf.setframerate(rate)
+        wf.writeframes(frames)
+    return buf.getvalue()
+
+
+def chunk(chunk_id, body):
+    pad = b"\x00" if len(body) & 1 else b""
+    return chunk_id + struct.pack("<I", len(body)) + body + pad
+
+
+def fmt_chunk(channels=1, rate=16000, width=2):
+    return chunk(b"fmt ", struct.pack("<HHIIHH", 1, channels, rate, rate * channels * width,
+                                      channels * width, width * 8))
+
+
+def riff(*chunks, size=None):
+    body = b"WAVE" + b"".join(chunks)
+    return b"RIFF" + struct.pack("<I", len(body) if size is None else size) + body
+
+
+def test_whole_file():
+    pcm = bytes(range(200))
+    p = WavStreamParser()
+    assert p.feed(make_wav(pcm, channels=2, rate=22050)) == pcm
+    assert (p.channels, p.sample_width, p.sample_rate) == (2, 2, 22050)
+
+
+def test_byte_by_byte_yields_whole_frames():
+    pcm = bytes(range(120))
+    p = WavStreamParser()
+    out = []
+    for b in make_wav(pcm, channels=2):
+        data = p.feed(bytes([b]))
+        assert len(data) % 4 == 0
+        out.append(data)
+    assert p.ready
+    assert b"".join(out) == pcm
+
+
+def test_placeholder_sizes():
+    # 流式 TTS 的头里 RIFF 与 data 长度都是占位值，data 之后的数据都是 PCM
+    for size in (0, 0xFFFFFFFF):
+        header = riff(fmt_chunk(), size=size) + b"data" + struct.pack("<I", size)
+        p = WavStreamParser()
+        assert p.feed(header) == b""
+        assert p.ready
+        assert p.feed(b"\x01\x02\x03") == b"\x01\x02"
+        assert p.feed(b"\x04") == b"\x03\x04"
+
+
+def test_odd_sized_chunk_is_padded():
+    header = riff(fmt_chunk(), chunk(b"LIST", b"abc")) + b"data" + struct.pack("<I", 0)
+    p = WavStreamParser()
+    assert p.feed(header[:30]) == b""
+    assert p.feed(header[30:] + b"\x05\x06") == b"\x05\x06"
+    assert p.sample_rate == 16000
+
+
+def test_not_wav():
+    with pytest.raises(ValueError):
+        WavStreamParser().feed(b"ID3\x03" + b"\x00" * 20)
+
+
+def test_data_before_fmt():
+    with pytest.raises(ValueError):
+        WavStreamParser().feed(riff() + b"data" + struct.pack("<I", 0))
+
+
+def test_unsupported_format():
+    body = struct.pack("<HHIIHH", 3, 1, 16000, 64000, 4, 32)  # IEEE float
+    with pytest.raises(ValueError):
+        WavStreamParser().feed(riff(chunk(b"fmt ", body)))